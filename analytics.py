@@ -0,0 +1,73 @@
+"""Price and category figures per canteen, kept in the `price_summary` collection.
+
+One document per (canteen, category):
+
+    {"canteenId", "category", "count", "minPrice", "maxPrice", "meanPrice",
+     "medianPrice", "refreshedAt"}
+
+with a unique index on (canteenId, category). The pipeline below groups the
+`food_items` collection and `$merge`s the groups into it; repository.py runs
+it for the canteens and categories a write touched, so the dashboard only
+reads the summary. Refreshes may overlap; a row is only ever replaced by
+one with a later `refreshedAt`.
+"""
+
+SUMMARY_COLLECTION = "price_summary"
+
+
+def _middle(offset):
+    # Element `offset` of the sorted prices, counted from the middle (floor or ceil)
+    return {"$arrayElemAt": ["$prices", {offset: {"$divide": [{"$subtract": [{"$size": "$prices"}, 1]}, 2]}}]}
+
+
+def summary_pipeline(match: dict, refreshed_at) -> list[dict]:
+    """Summary rows for the menu items matching `match` (canteenId and/or category).
+
+    Ends without the `$merge` stage so backends without it can write the rows themselves.
+    """
+    return [
+        {"$match": match},
+        {"$project": {"canteenId": True, "category": True, "price": True}},
+        {"$sort": {"price": 1}},
+        {"$group": {
+            "_id": {"canteenId": "$canteenId", "category": "$category"},
+            "count": {"$sum": 1},
+            "minPrice": {"$min": "$price"},
+            "maxPrice": {"$max": "$price"},
+            "meanPrice": {"$avg": "$price"},
+            "prices": {"$push": "$price"},
+        }},
+        {"$project": {
+            "_id": False,
+            "canteenId": "$_id.canteenId",
+            "category": "$_id.category",
+            "count": True,
+            "minPrice": True,
+            "maxPrice": True,
+            "meanPrice": True,
+            "medianPrice": {"$avg": [_middle("$floor"), _middle("$ceil")]},
+            "refreshedAt": {"$literal": refreshed_at},
+        }},
+    ]
+
+
+def summary_keys_pipeline(match: dict) -> list[dict]:
+    """The (canteenId, category) pairs `summary_pipeline(match, ...)` has a row for."""
+    return [
+        {"$match": match},
+        {"$group": {"_id": {"canteenId": "$canteenId", "category": "$category"}}},
+    ]
+
+
+def merge_stage() -> dict:
+    return {"$merge": {
+        "into": SUMMARY_COLLECTION,
+        "on": ["canteenId", "category"],
+        # A slower refresh that started earlier must not overwrite a newer row
+        "whenMatched": [{"$replaceWith": {"$cond": [
+            {"$gte": ["$$new.refreshedAt", "$refreshedAt"]},
+            {"$mergeObjects": ["$$ROOT", "$$new"]},
+            "$$ROOT",
+        ]}}],
+        "whenNotMatched": "insert",
+    }}
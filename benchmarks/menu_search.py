@@ -0,0 +1,100 @@
+"""Benchmark of menu search latency as the number of menu items grows.
+
+Seeds synthetic Thai menu names into a separate database (never
+canteen_info), builds the bigram entries with repository.reindex_menu_search()
+and times repository.search_menu() for whole names, name fragments and
+misspellings. The query cache is cleared before every query.
+
+    python -m benchmarks.menu_search --uri mongodb://localhost:27017
+    python -m benchmarks.menu_search --backend memory --sizes 1000 10000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from bson.objectid import ObjectId
+
+import repository
+from query_cache import shared_cache
+
+DATABASE_NAME = "canteen_bench_menu_search"
+QUERIES = 200
+ITEMS_PER_STORE = 25
+
+BASES = ["ข้าวผัด", "ข้าวมันไก่", "ก๋วยเตี๋ยว", "ผัดซีอิ๊ว", "ต้มยำ", "แกงเขียวหวาน", "ข้าวขาหมู", "สุกี้", "ราดหน้า", "ข้าวหมูแดง"]
+TOPPINGS = ["กะเพรา", "หมูสับ", "ไก่", "กุ้ง", "ทะเล", "หมูกรอบ", "ไข่ดาว", "เนื้อ", "ปลาหมึก", "ผักรวม"]
+STYLES = ["", "พิเศษ", "ธรรมดา", "ใส่ไข่", "ไม่เผ็ด"]
+
+
+def _random_name():
+    return random.choice(BASES) + random.choice(TOPPINGS) + random.choice(STYLES)
+
+
+def seed(db, item_count, canteen_count=20):
+    for collection in ("canteens", "stores", "food_items", "menu_search"):
+        db[collection].delete_many({})
+    canteen_ids = db.canteens.insert_many(
+        [{"name": f"bench canteen {i}", "busyPeriods": []} for i in range(canteen_count)]
+    ).inserted_ids
+    stores, items = [], []
+    for i in range(0, item_count, ITEMS_PER_STORE):
+        store = {"_id": ObjectId(), "name": f"bench store {i}", "canteenId": random.choice(canteen_ids)}
+        names = {_random_name() for _ in range(ITEMS_PER_STORE)}
+        items += [
+            {"storeId": store["_id"], "canteenId": store["canteenId"], "name": name, "price": random.randint(30, 120), "category": "MAIN"}
+            for name in names
+        ]
+        stores.append({**store, "menuCount": len(names)})
+    db.stores.insert_many(stores)
+    db.food_items.insert_many(items)
+    return repository.reindex_menu_search()
+
+
+def _queries():
+    name = _random_name()
+    misspelt = list(name)
+    misspelt.insert(random.randrange(len(misspelt)), random.choice("กขคงจ"))
+    return {"whole": name, "fragment": random.choice(TOPPINGS), "misspelt": "".join(misspelt)}
+
+
+def run(sizes, limit):
+    db = repository.get_database()
+    results = []
+    for size in sizes:
+        indexed = seed(db, size)
+        timings = {"whole": [], "fragment": [], "misspelt": []}
+        for _ in range(QUERIES):
+            for kind, query in _queries().items():
+                shared_cache.clear()
+                started = time.perf_counter()
+                repository.search_menu(query, limit)
+                timings[kind].append((time.perf_counter() - started) * 1000)
+        result = {"menu_items": indexed}
+        for kind, values in timings.items():
+            result[f"{kind}_ms_median"] = statistics.median(values)
+            result[f"{kind}_ms_p95"] = statistics.quantiles(values, n=20)[-1]
+        results.append(result)
+        print(json.dumps(result), flush=True)
+    for collection in ("canteens", "stores", "food_items", "menu_search"):
+        db[collection].delete_many({})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--limit", type=int, default=repository.PAGE_SIZE, help="results per query")
+    repository.add_connection_arguments(parser)
+    args = parser.parse_args()
+    uri = args.uri or repository.secret("mongo_uri", "")
+    backend = args.backend or "mongodb"
+    repository.use_client(repository.create_client(uri, backend=backend), backend=backend, database_name=DATABASE_NAME)
+    repository.ensure_indexes(repository.get_database())
+    run(args.sizes, args.limit)
+
+
+if __name__ == "__main__":
+    main()
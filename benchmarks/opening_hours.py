@@ -0,0 +1,114 @@
+"""Benchmark of "open at T" lookups as the number of stores grows.
+
+Seeds synthetic stores into a separate database (never canteen_info), then
+times random point and range queries through repository.find_open_stores().
+On a real server it also reports keys and documents examined from explain(),
+which is where sub-linear behaviour shows: they track the number of matching
+stores, not the collection size.
+
+    python -m benchmarks.opening_hours --uri mongodb://localhost:27017
+    python -m benchmarks.opening_hours --backend memory --sizes 1000 10000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+import repository
+from opening_hours import open_query
+from schema import DAYS_OF_WEEK
+
+DATABASE_NAME = "canteen_bench_opening_hours"
+QUERIES = 200
+
+
+def _random_time(low_hour, high_hour):
+    return f"{random.randint(low_hour, high_hour):02d}:{random.choice([0, 15, 30, 45]):02d}"
+
+
+def seed(db, store_count, canteen_count=50, batch_size=5000):
+    db.stores.delete_many({})
+    db.canteens.delete_many({})
+    canteen_ids = db.canteens.insert_many(
+        [repository.with_time_ranges({"name": f"bench canteen {i}", "busyPeriods": [{"start": "11:30", "end": "13:00"}]})
+         for i in range(canteen_count)]
+    ).inserted_ids
+    for start in range(0, store_count, batch_size):
+        stores = []
+        for i in range(start, min(start + batch_size, store_count)):
+            # Short shifts so a given minute matches only a fraction of the stores
+            opening_hours = []
+            for day in random.sample(DAYS_OF_WEEK, random.randint(1, 5)):
+                start_hour = random.randint(6, 18)
+                minute = random.choice([0, 15, 30, 45])
+                opening_hours.append({
+                    "dayOfWeek": day,
+                    "start": f"{start_hour:02d}:{minute:02d}",
+                    "end": f"{start_hour + random.randint(1, 3):02d}:{minute:02d}",
+                })
+            stores.append(repository.with_time_ranges({
+                "name": f"bench store {i}",
+                "description": "synthetic",
+                "canteenId": random.choice(canteen_ids),
+                "openingHours": opening_hours,
+                "menuCount": 0,
+            }))
+        db.stores.insert_many(stores)
+
+
+def _explain(db, query, limit):
+    try:
+        stats = db.stores.find(query).sort("_id", 1).limit(limit).explain()["executionStats"]
+    except AttributeError:
+        return None  # in-memory backends have no explain()
+    return {"keysExamined": stats["totalKeysExamined"], "docsExamined": stats["totalDocsExamined"], "returned": stats["nReturned"]}
+
+
+def run(sizes, limit):
+    db = repository.get_database()
+    results = []
+    for size in sizes:
+        seed(db, size)
+        point_ms, range_ms, busy_ms, explains = [], [], [], []
+        for _ in range(QUERIES):
+            day = random.choice(DAYS_OF_WEEK)
+            at = _random_time(7, 19)
+            until = f"{min(int(at[:2]) + 1, 23):02d}:{at[3:]}"
+            for timings, kwargs in ((point_ms, {}), (range_ms, {"end": until}), (busy_ms, {"exclude_busy": True})):
+                started = time.perf_counter()
+                repository.find_open_stores(day, at, limit=limit, **kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+            explains.append(_explain(db, open_query(day, at), limit))
+        result = {
+            "stores": size,
+            "point_ms_median": statistics.median(point_ms),
+            "range_ms_median": statistics.median(range_ms),
+            "exclude_busy_ms_median": statistics.median(busy_ms),
+        }
+        if explains[0] is not None:
+            result["keys_examined_median"] = statistics.median(e["keysExamined"] for e in explains)
+            result["docs_examined_median"] = statistics.median(e["docsExamined"] for e in explains)
+            result["matches_median"] = statistics.median(e["returned"] for e in explains)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+    db.stores.delete_many({})
+    db.canteens.delete_many({})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--limit", type=int, default=repository.PAGE_SIZE, help="page size of each query")
+    repository.add_connection_arguments(parser)
+    args = parser.parse_args()
+    uri = args.uri or repository.secret("mongo_uri", "")
+    backend = args.backend or "mongodb"
+    repository.use_client(repository.create_client(uri, backend=backend), backend=backend, database_name=DATABASE_NAME)
+    run(args.sizes, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Benchmark of the pages' script runs as the data grows, driven by Streamlit AppTest.
+
+Seeds synthetic canteens, stores and menus with Thai names into a separate
+database (never canteen_info), in the shape the forms write, then runs
+canteen.py, pages/stores.py and pages/food_items.py through
+streamlit.testing for common flows: load, select a canteen, add a menu item
+and edit a store. Each measured script run records its time and, on a real
+server, the number of commands and the BSON bytes sent and received, counted
+by a pymongo CommandListener (the memory backend sends no commands, so those
+are null there). One JSON object per flow and scale is printed as it
+finishes; --output writes the whole run, with versions, for comparing runs.
+
+    python -m benchmarks.pages --uri mongodb://localhost:27017
+    python -m benchmarks.pages --backend memory --scales tiny small
+    python -m benchmarks.pages --size 50 2000 40000 --repeat 10 --output bench.json
+"""
+
+import argparse
+import json
+import pathlib
+import platform
+import random
+import statistics
+import threading
+import time
+import uuid
+
+import bson
+import pymongo
+import streamlit
+from bson.objectid import ObjectId
+from pymongo import monitoring
+from streamlit.testing.v1 import AppTest
+
+import repository
+from benchmarks.menu_search import BASES, STYLES, TOPPINGS
+from query_cache import shared_cache
+from schema import CATEGORIES, DAYS_OF_WEEK, SCHEMA_VERSIONS
+
+DATABASE_NAME = "canteen_bench_pages"
+APP_ROOT = pathlib.Path(__file__).resolve().parent.parent
+# AppTest gives up on a script run after this long; the large scale needs it
+RUN_TIMEOUT_SECONDS = 600
+
+# Name -> (canteens, stores, menu items)
+SCALES = {
+    "tiny": (10, 100, 1_000),
+    "small": (100, 2_000, 20_000),
+    "medium": (1_000, 20_000, 200_000),
+    "large": (5_000, 100_000, 1_000_000),
+}
+
+FACULTIES = ["วิศวะ", "อักษร", "บัญชี", "ครุศาสตร์", "สถาปัตย์", "นิเทศ", "รัฐศาสตร์", "วิทยาศาสตร์", "แพทย์", "นิติศาสตร์"]
+OWNERS = ["ป้าแดง", "ลุงชัย", "พี่นก", "เจ๊หมวย", "ป้าศรี", "น้าเล็ก", "ยายทองคำ", "พี่ต้อม", "เฮียเปา", "แม่มาลัย"]
+SPECIALTIES = ["ข้าวแกง", "ก๋วยเตี๋ยว", "อาหารตามสั่ง", "ข้าวมันไก่", "ส้มตำ", "เครื่องดื่ม", "ขนมหวาน", "สุกี้"]
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands and the BSON bytes of their requests and replies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.commands = 0
+            self.failures = 0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "commands": self.commands,
+                "failures": self.failures,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+            }
+
+    def started(self, event):
+        size = len(bson.encode(event.command))
+        with self._lock:
+            self.commands += 1
+            self.bytes_sent += size
+
+    def succeeded(self, event):
+        size = len(bson.encode(event.reply))
+        with self._lock:
+            self.bytes_received += size
+
+    def failed(self, event):
+        with self._lock:
+            self.failures += 1
+
+
+# --- Synthetic data ---
+
+def _stamped(collection, doc):
+    # What add_canteen() / add_store() write for a form's fields
+    if collection == "stores":
+        doc = repository.with_name_key(doc)
+    return {
+        **repository.with_time_ranges(doc),
+        "version": 1,
+        "schemaVersion": SCHEMA_VERSIONS[collection],
+        "updatedAt": repository.now(),
+    }
+
+
+def _time(hour, minute=0):
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _canteen(i):
+    start = random.randint(10, 12)
+    return _stamped("canteens", {
+        "name": f"โรงอาหาร{random.choice(FACULTIES)} {i + 1}",
+        "busyPeriods": [{"start": _time(start, 30), "end": _time(start + 2)}],
+        "withAirConditioning": random.random() < 0.3,
+    })
+
+
+def _menu(store, item_count):
+    names = set()
+    # BASES x TOPPINGS x STYLES has 500 names, more than any store needs
+    while len(names) < min(item_count, len(BASES) * len(TOPPINGS) * len(STYLES)):
+        names.add(random.choice(BASES) + random.choice(TOPPINGS) + random.choice(STYLES))
+    return [
+        {
+            "storeId": store["_id"],
+            "canteenId": store["canteenId"],
+            **repository.with_name_key({"name": name}),
+            "price": float(random.randrange(25, 125, 5)),
+            "category": random.choices(list(CATEGORIES), weights=[6] + [1] * (len(CATEGORIES) - 1))[0],
+            "schemaVersion": SCHEMA_VERSIONS["food_items"],
+        }
+        for name in names
+    ]
+
+
+def _store(i, canteen_id, item_count):
+    # The store and its food_items documents
+    if random.random() < 0.5:
+        start, end = random.choice([(7, 15), (8, 17), (10, 14)])
+        opening_hours = [{"dayOfWeek": day, "start": _time(start), "end": _time(end)} for day in DAYS_OF_WEEK]
+    else:
+        opening_hours = [
+            {"dayOfWeek": day, "start": _time(random.randint(6, 10)), "end": _time(random.randint(13, 19))}
+            for day in sorted(random.sample(DAYS_OF_WEEK, random.randint(2, 5)), key=DAYS_OF_WEEK.index)
+        ]
+    store = _stamped("stores", {
+        "_id": ObjectId(),
+        "name": f"ร้าน{random.choice(OWNERS)}{random.choice(SPECIALTIES)} {i + 1}",
+        "description": f"{random.choice(SPECIALTIES)} ราคานักศึกษา",
+        "canteenId": canteen_id,
+        "openingHours": opening_hours,
+    })
+    menu = _menu(store, item_count)
+    return {**store, "menuCount": len(menu)}, menu
+
+
+def _clear(db):
+    for collection in ("canteens", "stores", "food_items", "menu_search", "price_summary"):
+        db[collection].delete_many({})
+
+
+def seed(db, canteen_count, store_count, item_count, batch_size=2000):
+    """Fills the benchmark database; menu items are spread evenly over the stores."""
+    _clear(db)
+    canteen_ids = []
+    for start in range(0, canteen_count, batch_size):
+        batch = [_canteen(i) for i in range(start, min(start + batch_size, canteen_count))]
+        canteen_ids += db.canteens.insert_many(batch).inserted_ids
+    per_store, extra = divmod(item_count, max(store_count, 1))
+    for start in range(0, store_count, batch_size):
+        stores, items = [], []
+        for i in range(start, min(start + batch_size, store_count)):
+            store, menu = _store(i, canteen_ids[i % len(canteen_ids)], per_store + (i < extra))
+            stores.append(store)
+            items += menu
+        db.stores.insert_many(stores)
+        if items:
+            db.food_items.insert_many(items)
+    shared_cache.clear()
+
+
+# --- Flows ---
+# Each flow gets a fresh AppTest, does its setup runs, and returns the
+# script run to measure as a zero-argument callable.
+
+def _app(page):
+    at = AppTest.from_file(str(APP_ROOT / "canteen.py"), default_timeout=RUN_TIMEOUT_SECONDS)
+    if page != "canteen.py":
+        at.switch_page(page)
+    at.secrets["password"] = "benchmark"
+    at.session_state["password_correct"] = True
+    return at
+
+
+def _button(at, label=None, key_prefix=None):
+    for button in at.button:
+        if (label is None or button.label == label) and (key_prefix is None or (button.key or "").startswith(key_prefix)):
+            return button
+    raise LookupError(f"no button {label or key_prefix!r} on the page")
+
+
+def _canteen_index(at):
+    return random.randrange(len(at.selectbox[0].options))
+
+
+def load_canteens_flow():
+    at = _app("canteen.py")
+    return at.run
+
+
+def load_stores_flow():
+    at = _app("pages/stores.py")
+    return at.run
+
+
+def load_food_items_flow():
+    at = _app("pages/food_items.py")
+    return at.run
+
+
+def select_canteen_flow():
+    at = _app("pages/stores.py").run()
+    return lambda: at.selectbox[0].select_index(_canteen_index(at)).run()
+
+
+def add_menu_item_flow():
+    at = _app("pages/food_items.py").run()
+    at.selectbox(key="canteen_select").select_index(_canteen_index(at)).run()
+    next(w for w in at.text_input if w.label == "ชื่ออาหาร").input(f"เมนูทดสอบ {uuid.uuid4().hex[:8]}")
+    at.number_input[0].set_value(float(random.randrange(25, 125, 5))).run()
+    return lambda: _button(at, label="เพิ่มรายการอาหาร").click().run()
+
+
+def edit_store_flow():
+    at = _app("pages/stores.py").run()
+    at.selectbox[0].select_index(_canteen_index(at)).run()
+    _button(at, key_prefix="edit_store_").click().run()
+    at.text_area[0].input(f"แก้ไขโดย benchmark {uuid.uuid4().hex[:8]}").run()
+    return lambda: _button(at, label="บันทึกการเปลี่ยนแปลง").click().run()
+
+
+FLOWS = {
+    "canteen.load": load_canteens_flow,
+    "stores.load": load_stores_flow,
+    "stores.select_canteen": select_canteen_flow,
+    "stores.edit_store": edit_store_flow,
+    "food_items.load": load_food_items_flow,
+    "food_items.add_item": add_menu_item_flow,
+}
+
+
+def measure(flow, counter, repeat):
+    """Runs `flow` `repeat` times, each from a cold query cache."""
+    timings, counts = [], []
+    for _ in range(repeat):
+        shared_cache.clear()
+        measured_run = flow()
+        counter.reset()
+        started = time.perf_counter()
+        at = measured_run()
+        timings.append((time.perf_counter() - started) * 1000)
+        counts.append(counter.snapshot())
+        if at.exception:
+            raise RuntimeError(f"{flow.__name__}: {at.exception[0].message}")
+    result = {"runs": repeat, "ms_median": statistics.median(timings), "ms_max": max(timings)}
+    for name in ("commands", "bytes_sent", "bytes_received"):
+        values = [c[name] for c in counts]
+        # Nothing is counted on backends that do not speak the wire protocol
+        result[f"{name}_median"] = statistics.median(values) if any(values) else None
+    return result
+
+
+def run(sizes, flows, counter, repeat):
+    db = repository.get_database()
+    results = []
+    for canteen_count, store_count, item_count in sizes:
+        started = time.perf_counter()
+        seed(db, canteen_count, store_count, item_count)
+        seed_seconds = time.perf_counter() - started
+        for name in flows:
+            result = {
+                "canteens": canteen_count,
+                "stores": store_count,
+                "menu_items": item_count,
+                "seed_seconds": round(seed_seconds, 1),
+                "flow": name,
+                **measure(FLOWS[name], counter, repeat),
+            }
+            results.append(result)
+            print(json.dumps(result), flush=True)
+    _clear(db)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=["tiny", "small", "medium"])
+    parser.add_argument(
+        "--size", type=int, nargs=3, action="append", metavar=("CANTEENS", "STORES", "ITEMS"),
+        help="a custom scale instead of --scales; may be repeated",
+    )
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--repeat", type=int, default=5, help="measured runs per flow")
+    parser.add_argument("--seed", type=int, default=0, help="random seed, so runs compare like for like")
+    parser.add_argument("--output", help="also write all results, with versions, to this JSON file")
+    repository.add_connection_arguments(parser)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    uri = args.uri or repository.secret("mongo_uri", "")
+    backend = args.backend or "mongodb"
+    counter = CommandCounter()
+    client = repository.create_client(uri, backend=backend, event_listeners=[counter])
+    repository.use_client(client, backend=backend, database_name=DATABASE_NAME)
+
+    sizes = args.size or [SCALES[name] for name in args.scales]
+    results = run(sizes, args.flows, counter, args.repeat)
+    if args.output:
+        report = {
+            "backend": backend,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "pymongo": pymongo.version,
+            "results": results,
+        }
+        pathlib.Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,27 @@
 import streamlit as st
-import pymongo
 import datetime
-import hmac
-from bson.objectid import ObjectId
 
-from pymongo.server_api import ServerApi
+from pymongo.errors import DuplicateKeyError
+
+from layout import check_password, sidebar
+from pagination import PAGE_SIZE_OPTIONS, page_navigation, page_start
+from repository import (
+    add_canteen,
+    cache_stats,
+    changed_fields,
+    database_init,
+    delete_canteen,
+    load_canteen,
+    load_canteens_page,
+    update_canteen,
+)
 
 st.set_page_config(page_title="ข้อมูลโรงอาหาร", page_icon="🍽️")
 
-def check_password():
-    """Returns `True` if the user had the correct password."""
-
-    def password_entered():
-        """Checks whether a password entered by the user is correct."""
-        if hmac.compare_digest(st.session_state["password"], st.secrets["password"]):
-            st.session_state["password_correct"] = True
-            del st.session_state["password"]  # Don't store the password.
-        else:
-            st.session_state["password_correct"] = False
-
-    # Return True if the password is validated.
-    if st.session_state.get("password_correct", False):
-        return True
-
-    # Show input for password.
-    st.text_input(
-        "Password", type="password", on_change=password_entered, key="password"
-    )
-    if "password_correct" in st.session_state:
-        st.error("😕 Password incorrect")
-    return False
-
 if not check_password():
     st.stop()  # Do not continue if check_password is not True.
 
-st.sidebar.header("MUGE100 C10-297 Data Entry")
-st.sidebar.markdown("Implementation by Chanakan Moongthin")
-st.sidebar.page_link("canteen.py", label="ข้อมูลโรงอาหาร", icon="🍽️")
-st.sidebar.page_link("pages/stores.py", label="ข้อมูลร้านค้า", icon="🏪")
-st.sidebar.page_link("pages/food_items.py", label="ข้อมูลรายการอาหาร", icon="🍲")
-
-@st.cache_resource()
-def database_init():
-    return pymongo.MongoClient(st.secrets['mongo_uri'], server_api=ServerApi('1'))
+sidebar("canteen")
 
 mongo = database_init()
 
@@ -50,30 +29,10 @@ if not mongo:
     st.error('Cannot Access Data Storage')
     st.stop()
 
-st.title("🍽️ ข้อมูลโรงอาหาร")
-
-# --- Database Operations ---
-canteen_collection = mongo.canteen_info.canteens  # Changed to match the schema
+stats = cache_stats()
+st.sidebar.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses")
 
-# Function to load canteen data from MongoDB
-def load_canteens() -> list:
-    data = canteen_collection.find()
-    return list(data)
-
-# Function to add a new canteen to MongoDB
-def add_canteen(canteen_data):
-    canteen_collection.insert_one(canteen_data)
-
-# Function to update an existing canteen in MongoDB
-def update_canteen(canteen_id, canteen_data):
-    canteen_collection.update_one(
-        {"_id": ObjectId(canteen_id)},
-        {"$set": canteen_data}
-    )
-
-# Function to delete a canteen from MongoDB
-def delete_canteen(canteen_id):
-    canteen_collection.delete_one({"_id": ObjectId(canteen_id)})
+st.title("🍽️ ข้อมูลโรงอาหาร")
 
 # --- Session State Initialization ---
 if "canteen_name" not in st.session_state:
@@ -84,6 +43,22 @@ if "with_airconditioning" not in st.session_state:
     st.session_state.with_airconditioning = False
 if "editing_id" not in st.session_state:
     st.session_state.editing_id = None
+if "editing_canteen" not in st.session_state:
+    st.session_state.editing_canteen = None  # The canteen as loaded, with its version
+
+
+# Function to start editing a canteen from its current, saved state
+def start_editing(canteen_id):
+    canteen = load_canteen(canteen_id)
+    if canteen is None:
+        st.session_state.editing_id = None
+        st.session_state.editing_canteen = None
+        return
+    st.session_state.editing_id = canteen_id
+    st.session_state.editing_canteen = canteen
+    st.session_state.canteen_name = canteen["name"]
+    st.session_state.busy_periods = list(canteen["busyPeriods"])
+    st.session_state.with_airconditioning = canteen["withAirConditioning"]
 
 # --- Input Form ---
 st.header("เพิ่ม/แก้ไข ข้อมูลโรงอาหาร")
@@ -93,26 +68,33 @@ st.header("เพิ่ม/แก้ไข ข้อมูลโรงอาห
 st.session_state.canteen_name = st.text_input("กรอกชื่อโรงอาหาร", value=st.session_state.canteen_name)
 
 # Busy periods (multiple)
-st.write("**ช่วงเวลาที่มีลูกค้าเยอะ** (ระบุแค่ช่วงเวลา)")
-busy_periods_col1, busy_periods_col2 = st.columns(2)
-new_start_time = busy_periods_col1.time_input("เวลาเริ่มต้น", value=datetime.time(11, 0), key="new_start")
-new_end_time = busy_periods_col2.time_input("เวลาสิ้นสุด", value=datetime.time(13, 0), key="new_end")
-if new_end_time < new_start_time:
-    st.error("เวลาสิ้นสุดต้องมากกว่าเวลาเริ่มต้น")
-
-if st.button("เพิ่มช่วงเวลา", key="add_busy_period"):
-    if new_end_time > new_start_time:
-        st.session_state.busy_periods.append({
-            "start": new_start_time.strftime("%H:%M"),
-            "end": new_end_time.strftime("%H:%M")
-        })
-
-# Display added busy periods
-for i, period in enumerate(st.session_state.busy_periods):
-    st.write(f"- {period['start']} ถึง {period['end']}")
-    if st.button("ลบ", key=f"delete_period_{i}"):
-        st.session_state.busy_periods.pop(i)
-        st.rerun()
+# A fragment, so adding or removing a period reruns only this editor: no
+# password check, sidebar or canteen listing. The periods live in session
+# state, where the submit buttons below read them.
+@st.fragment
+def busy_period_editor():
+    st.write("**ช่วงเวลาที่มีลูกค้าเยอะ** (ระบุแค่ช่วงเวลา)")
+    busy_periods_col1, busy_periods_col2 = st.columns(2)
+    new_start_time = busy_periods_col1.time_input("เวลาเริ่มต้น", value=datetime.time(11, 0), key="new_start")
+    new_end_time = busy_periods_col2.time_input("เวลาสิ้นสุด", value=datetime.time(13, 0), key="new_end")
+    if new_end_time <= new_start_time:
+        st.error("เวลาสิ้นสุดต้องมากกว่าเวลาเริ่มต้น")
+
+    if st.button("เพิ่มช่วงเวลา", key="add_busy_period"):
+        if new_end_time > new_start_time:
+            st.session_state.busy_periods.append({
+                "start": new_start_time.strftime("%H:%M"),
+                "end": new_end_time.strftime("%H:%M")
+            })
+
+    # Display added busy periods
+    for i, period in enumerate(st.session_state.busy_periods):
+        st.write(f"- {period['start']} ถึง {period['end']}")
+        # Removed in the callback, before the fragment reruns, so no st.rerun() is needed
+        st.button("ลบ", key=f"delete_period_{i}", on_click=st.session_state.busy_periods.pop, args=(i,))
+
+
+busy_period_editor()
 
 # With air conditioning
 st.session_state.with_airconditioning = st.checkbox(
@@ -123,11 +105,7 @@ st.session_state.with_airconditioning = st.checkbox(
 if st.session_state.editing_id is None:
     button_label = "เพิ่มข้อมูล"
     if st.button(button_label):
-        canteens = load_canteens()
-        canteen_names = [entry["name"].lower() for entry in canteens]
-        if st.session_state.canteen_name.lower() in canteen_names:
-            st.error("มีชื่อโรงอาหารนี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
-        elif not st.session_state.canteen_name:
+        if not st.session_state.canteen_name:
             st.error("กรุณากรอกชื่อโรงอาหาร")
         else:
             # Create a dictionary for the new entry, using the schema
@@ -135,50 +113,71 @@ if st.session_state.editing_id is None:
                 "name": st.session_state.canteen_name,
                 "busyPeriods": st.session_state.busy_periods,
                 "withAirConditioning": st.session_state.with_airconditioning,
-                "stores": [],  # Initialize with empty stores array, as per schema
             }
 
-            add_canteen(entry)
-            st.success("เพิ่มข้อมูลโรงอาหารเรียบร้อยแล้ว!")
-            # Reset input values
-            st.session_state.canteen_name = ""
-            st.session_state.busy_periods = []
-            st.session_state.with_airconditioning = False
-            st.rerun()
+            # The unique index on name rejects duplicates, ignoring case
+            try:
+                add_canteen(entry)
+            except DuplicateKeyError:
+                st.error("มีชื่อโรงอาหารนี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
+            else:
+                st.success("เพิ่มข้อมูลโรงอาหารเรียบร้อยแล้ว!")
+                # Reset input values
+                st.session_state.canteen_name = ""
+                st.session_state.busy_periods = []
+                st.session_state.with_airconditioning = False
+                st.rerun()
 else:
     button_label = "บันทึกการแก้ไข"
     if st.button(button_label):
-        canteens = load_canteens()
         if not st.session_state.canteen_name:
             st.error("กรุณากรอกชื่อโรงอาหาร")
         else:
-            canteen_names = [entry["name"].lower() for entry in canteens if entry["_id"] != ObjectId(st.session_state.editing_id)]
-            if st.session_state.canteen_name.lower() in canteen_names:
+            entry = {
+                "name": st.session_state.canteen_name,
+                "busyPeriods": st.session_state.busy_periods,
+                "withAirConditioning": st.session_state.with_airconditioning
+            }
+
+            original = st.session_state.editing_canteen
+            try:
+                saved = update_canteen(st.session_state.editing_id, changed_fields(original, entry), original["version"])
+            except DuplicateKeyError:
                 st.error("มีชื่อโรงอาหารนี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
             else:
-                entry = {
-                    "name": st.session_state.canteen_name,
-                    "busyPeriods": st.session_state.busy_periods,
-                    "withAirConditioning": st.session_state.with_airconditioning
-                    # Stores are not updated here, as per the schema
-                }
-
-                update_canteen(st.session_state.editing_id, entry)
-                st.success("แก้ไขข้อมูลโรงอาหารเรียบร้อยแล้ว!")
-
-                # Reset input values and editing state
-                st.session_state.canteen_name = ""
-                st.session_state.busy_periods = []
-                st.session_state.with_airconditioning = False
-                st.session_state.editing_id = None
-                st.rerun()
+                if not saved:
+                    st.session_state.canteen_save_conflict = True
+                else:
+                    st.success("แก้ไขข้อมูลโรงอาหารเรียบร้อยแล้ว!")
+
+                    # Reset input values and editing state
+                    st.session_state.canteen_name = ""
+                    st.session_state.busy_periods = []
+                    st.session_state.with_airconditioning = False
+                    st.session_state.editing_id = None
+                    st.session_state.editing_canteen = None
+                    st.rerun()
+
+    # Someone else saved this canteen after it was loaded into the form
+    if st.session_state.get("canteen_save_conflict"):
+        st.error("ข้อมูลโรงอาหารนี้ถูกแก้ไขโดยผู้อื่นหลังจากที่คุณเปิดแก้ไข กรุณาโหลดข้อมูลใหม่แล้วแก้ไขอีกครั้ง")
+        if st.button("โหลดข้อมูลใหม่", key="reload_canteen"):
+            st.session_state.canteen_save_conflict = False
+            start_editing(st.session_state.editing_id)
+            st.rerun()
 
 # --- Display, Edit, and Delete ---
 st.header("ข้อมูลโรงอาหารปัจจุบัน")
 
-canteens = load_canteens()
+filter_col, page_size_col = st.columns([3, 1])
+canteen_name_filter = filter_col.text_input("ค้นหาชื่อโรงอาหาร", key="canteen_name_filter")
+page_size = page_size_col.selectbox("ต่อหน้า", PAGE_SIZE_OPTIONS, index=1, key="canteen_page_size")
+
+# One extra row tells whether there is a next page
+after_id = page_start("canteens", (canteen_name_filter, page_size))
+canteens = load_canteens_page(after_id, page_size + 1, canteen_name_filter)
 
-for entry in canteens:
+for entry in canteens[:page_size]:
     col1, col2, col3 = st.columns([3, 1, 1])
     # Convert ObjectId to string for display
     entry_id_str = str(entry['_id'])
@@ -192,18 +191,22 @@ for entry in canteens:
             "**มีเครื่องปรับอากาศ:** "
             + ("ใช่" if entry["withAirConditioning"] else "ไม่ใช่")
         )
-        st.write(f"**จำนวนร้านค้า:** {len(entry.get('stores', []))}")
+        st.write(f"**จำนวนร้านค้า:** {entry['storeCount']}")
+        st.write(f"**จำนวนรายการอาหาร:** {entry['menuItemCount']}")
 
     with col2:
         if st.button("แก้ไข", key=f"edit_{entry_id_str}"):
-            st.session_state.editing_id = entry_id_str
-            st.session_state.canteen_name = entry["name"]
-            st.session_state.busy_periods = entry["busyPeriods"]
-            st.session_state.with_airconditioning = entry["withAirConditioning"]
+            st.session_state.canteen_save_conflict = False
+            start_editing(entry_id_str)
             st.rerun()
 
     with col3:
         if st.button("ลบ", key=f"delete_{entry_id_str}"):
-            delete_canteen(entry_id_str)
+            # Deletes the canteen's stores with it
+            deleted_stores = delete_canteen(entry_id_str)
+            st.toast(f"ลบ {entry['name']} และร้านค้า {deleted_stores} ร้านเรียบร้อยแล้ว")
             st.session_state.editing_id = None
-            st.rerun()
\ No newline at end of file
+            st.session_state.editing_canteen = None
+            st.rerun()
+
+page_navigation("canteens", canteens, page_size)
@@ -0,0 +1,195 @@
+"""Which canteens and stores changed, for sessions that have them open.
+
+Every write in this process is published here straight away (in-process
+pub/sub). Writes from other processes arrive through a background thread
+that follows a MongoDB change stream or, where there is none (standalone
+servers, the memory backend), polls `updatedAt` past a high-water mark.
+Changes from elsewhere invalidate only the cached queries they affect, so
+the next rerun refetches just those.
+
+A change stream that fails once it is running (a failover, a dropped
+connection) is opened again after its last event; if that point is lost,
+it starts from the present and everything cached is treated as changed.
+
+Polling cannot see deletes made by other processes; their cached results
+expire with the query cache TTL instead.
+"""
+
+import datetime
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from bson.objectid import ObjectId
+from pymongo.errors import ConfigurationError, OperationFailure, PyMongoError
+
+from query_cache import shared_cache
+
+COLLECTIONS = ["canteens", "stores"]
+# Polled changes are read with this much overlap, for clock skew between app servers
+POLL_OVERLAP = datetime.timedelta(seconds=2)
+# A change this process published is expected back from the server once, within this time
+ECHO_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class Change:
+    sequence: int
+    collection: str
+    document_id: ObjectId | None  # None when many documents changed at once (imports)
+    canteen_id: ObjectId | None  # the store's canteen, when known
+    operation: str  # "insert", "update" or "delete"
+
+
+class ChangeFeed:
+    def __init__(self, max_changes=1000):
+        self.source = "in-process"
+        self._changes = deque(maxlen=max_changes)
+        self._sequence = 0
+        self._published = {}  # (collection, document_id) -> monotonic times of local publishes
+        self._lock = threading.Lock()
+        self._thread = None
+        self._listeners = []
+        self._resume_token = None  # of the last change stream event seen
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def publish(self, collection, document_id=None, canteen_id=None, operation="update", local=True) -> int | None:
+        """Records a change and returns its sequence number (None for an echo of our own write)."""
+        with self._lock:
+            now = time.monotonic()
+            if local:
+                self._published.setdefault((collection, document_id), []).append(now)
+            else:
+                # Swallow the echo of our own write, but only one per write
+                published = [t for t in self._published.pop((collection, document_id), []) if now - t < ECHO_SECONDS]
+                if published:
+                    if published[1:]:
+                        self._published[(collection, document_id)] = published[1:]
+                    return None
+            self._sequence += 1
+            change = Change(self._sequence, collection, document_id, canteen_id, operation)
+            self._changes.append(change)
+            if len(self._published) > self._changes.maxlen:
+                self._forget_old_publishes()
+            sequence = self._sequence
+        if not local:
+            # Local writers have already invalidated what they touched
+            _invalidate(collection, document_id, canteen_id)
+            for listener in self._listeners:
+                listener(change)
+        return sequence
+
+    def add_listener(self, listener) -> None:
+        """Calls `listener(change)` for every change made by another process."""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def _forget_old_publishes(self):
+        now = time.monotonic()
+        self._published = {
+            key: times for key, times in self._published.items() if now - times[-1] < ECHO_SECONDS
+        }
+
+    def changes_since(self, sequence: int) -> list[Change] | None:
+        """Changes after `sequence`, or None if they are older than what is kept (reload everything)."""
+        with self._lock:
+            if self._changes and self._changes[0].sequence > sequence + 1:
+                return None
+            return [change for change in self._changes if change.sequence > sequence]
+
+    def start(self, db, poll_seconds=5.0):
+        """Starts following changes made by other processes, once per process."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(db, poll_seconds), name="change-feed", daemon=True)
+        self._thread.start()
+
+    def _run(self, db, poll_seconds):
+        # Change streams need a replica set; the memory backend has none at all
+        if hasattr(type(db), "watch"):
+            while True:
+                try:
+                    self._watch(db)
+                except (OperationFailure, ConfigurationError):
+                    if self.source != "change stream":
+                        break  # the server has no change streams: poll instead
+                    # Typically the resume point fell off the oplog; what happened since is unknown
+                    self._resume_token = None
+                    for collection in COLLECTIONS:
+                        self.publish(collection, local=False)
+                except PyMongoError:
+                    pass  # failover or network error: resume after the last event
+                time.sleep(poll_seconds)
+        self._poll(db, poll_seconds)
+
+    def _watch(self, db):
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": COLLECTIONS}}},
+            {"$project": {"ns": True, "documentKey": True, "operationType": True, "fullDocument.canteenId": True}},
+        ]
+        # updateLookup only to learn a store's canteen; the projection keeps the rest on the server
+        with db.watch(pipeline, full_document="updateLookup", resume_after=self._resume_token) as stream:
+            self.source = "change stream"
+            for event in stream:
+                self._resume_token = stream.resume_token
+                operation = event["operationType"]
+                self.publish(
+                    event["ns"]["coll"],
+                    event["documentKey"]["_id"],
+                    (event.get("fullDocument") or {}).get("canteenId"),
+                    operation if operation in ("insert", "delete") else "update",
+                    local=False,
+                )
+
+    def _poll(self, db, poll_seconds):
+        self.source = "polling"
+        high_water = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        seen = set()
+        while True:
+            time.sleep(poll_seconds)
+            since = high_water - POLL_OVERLAP
+            try:
+                for collection in COLLECTIONS:
+                    cursor = db[collection].find({"updatedAt": {"$gt": since}}, {"updatedAt": True, "canteenId": True})
+                    for doc in cursor:
+                        updated_at = _naive_utc(doc["updatedAt"])
+                        key = (collection, doc["_id"], updated_at)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        high_water = max(high_water, updated_at)
+                        self.publish(collection, doc["_id"], doc.get("canteenId"), local=False)
+            except PyMongoError:
+                continue  # try again next round from the same high-water mark
+            seen = {key for key in seen if key[2] > high_water - POLL_OVERLAP}
+
+
+def _naive_utc(value):
+    # pymongo returns naive UTC datetimes unless the client is tz_aware
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _invalidate(collection, document_id, canteen_id):
+    if collection == "canteens":
+        shared_cache.invalidate(("canteens",), ("menu_search",), ("price_summary",))
+        return
+    shared_cache.invalidate(
+        ("store", str(document_id)) if document_id else ("store",),
+        ("menu", str(document_id)) if document_id else ("menu",),
+        ("stores", str(canteen_id)) if canteen_id else ("stores",),
+        ("canteens", "page"),
+        ("menu_search",),
+        ("price_summary",),
+    )
+
+
+# Module-level so every page and session in the Streamlit process shares it
+shared_feed = ChangeFeed()
@@ -0,0 +1,120 @@
+"""Fail fast while the database is unreachable.
+
+Repository functions run through `shared_breaker.guarded`. Connection
+failures (server selection timeouts, dropped connections, network timeouts)
+are counted; after `failure_threshold` of them in a row the breaker opens.
+While it is open every guarded call raises `CircuitOpenError` at once
+instead of waiting out the server selection timeout, and database_init()
+returns None so pages show their "Cannot Access Data Storage" state. A
+background thread pings the server every `reset_seconds` and closes the
+breaker on the first ping that succeeds.
+
+Errors the server answers with (duplicate keys, validation) say nothing
+about reachability and are not counted.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+
+# Inside a guarded call, nested guarded calls neither check nor count again
+_guarding = contextvars.ContextVar("guarding", default=False)
+
+
+class CircuitOpenError(ConnectionFailure):
+    """The database was unreachable recently; the call was not attempted."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, reset_seconds=15.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None  # monotonic time the breaker opened, None while closed
+        self._probe = None
+        self._prober = None
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold=3, reset_seconds=15.0, probe=None):
+        """`probe` is called to test the connection while open; it raises when the server is still down."""
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.reset_seconds = reset_seconds
+            if probe is not None:
+                self._probe = probe
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def check(self) -> None:
+        if self.is_open:
+            raise CircuitOpenError("database unreachable; retrying in the background")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self) -> None:
+        """Opens the breaker straight away (a failed startup health check)."""
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        if self.opened_at is None:
+            self.opened_at = time.monotonic()
+        if self._prober is None:
+            self._prober = threading.Thread(target=self._probe_until_closed, name="circuit-probe", daemon=True)
+            self._prober.start()
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.reset_seconds)
+            probe = self._probe
+            if probe is None:
+                continue
+            try:
+                probe()
+            except Exception:
+                # Not only connection errors: a restarting server can also fail
+                # auth or commands for a while, and the probe must outlive that
+                continue
+            with self._lock:
+                self.failures = 0
+                self.opened_at = None
+                self._prober = None
+            return
+
+    def guarded(self, fn):
+        """Decorator: fail fast while open, and count the connection failures of `fn`."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _guarding.get():
+                return fn(*args, **kwargs)
+            self.check()
+            token = _guarding.set(True)
+            try:
+                result = fn(*args, **kwargs)
+            except CircuitOpenError:
+                raise
+            except (ConnectionFailure, ExecutionTimeout):
+                self.record_failure()
+                raise
+            finally:
+                _guarding.reset(token)
+            self.record_success()
+            return result
+        return wrapper
+
+
+# Module-level so every page and session shares one view of the database's health
+shared_breaker = CircuitBreaker()
@@ -0,0 +1,256 @@
+"""Streaming export of the collected data for analysis.
+
+Formats:
+
+- jsonl:    one line per canteen, store and food item document (`"collection"` tells which)
+- csv:      flat, one row per menu item joined to its store and canteen
+- parquet:  the same rows as csv (needs pyarrow)
+- snapshot: nested JSON in the `canteen_data.json` shape, which importer.py reads back
+
+Cursors are read in fixed-size batches, so memory stays bounded however large
+the collections are. Only the canteen names and busy periods are held for the
+whole run, to join them onto store rows.
+
+With --incremental only documents whose `updatedAt` is newer than the last
+successful export (kept in --state-file) are written. Deletions are not
+exported incrementally; take a full export or snapshot for those.
+
+    python exporter.py csv menus.csv
+    python exporter.py jsonl changes.jsonl --incremental
+    python exporter.py snapshot canteen_data.json
+"""
+
+import argparse
+import csv
+import datetime
+import json
+from itertools import islice
+
+from bson.objectid import ObjectId
+
+import repository
+from schema import CSV_COLUMNS, format_busy_periods, format_opening_hours
+
+BATCH_SIZE = 1000
+STATE_FILE = ".export_state.json"
+
+# Flat rows carry the document ids in front of the columns importer.py reads
+FLAT_COLUMNS = ["canteen_id", "store_id", "item_id"] + CSV_COLUMNS
+
+
+def batches(cursor, batch_size=BATCH_SIZE):
+    cursor = cursor.batch_size(batch_size)
+    while batch := list(islice(cursor, batch_size)):
+        yield batch
+
+
+def _plain(value):
+    """BSON values as plain JSON: ObjectId -> str, datetime -> ISO 8601."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _changed_since(since):
+    return {"updatedAt": {"$gt": since}} if since else {}
+
+
+def _menus(db, stores) -> dict:
+    """The food items of `stores`, as lists keyed by storeId, in _id order."""
+    menus = {}
+    items = db.food_items.find({"storeId": {"$in": [store["_id"] for store in stores]}}).sort("_id", 1)
+    for item in items:
+        menus.setdefault(item["storeId"], []).append(item)
+    return menus
+
+
+# --- JSON Lines ---
+
+def export_jsonl(out, since=None, batch_size=BATCH_SIZE) -> int:
+    db = repository.get_database()
+    count = 0
+    for collection in ("canteens", "stores", "food_items"):
+        for batch in batches(db[collection].find(_changed_since(since)).sort("_id", 1), batch_size):
+            for doc in batch:
+                out.write(json.dumps({"collection": collection, **_plain(doc)}, ensure_ascii=False) + "\n")
+            count += len(batch)
+    return count
+
+
+# --- Flat rows (csv, parquet) ---
+
+def flat_rows(since=None, batch_size=BATCH_SIZE):
+    """Yields lists of flat rows, one list per store batch."""
+    db = repository.get_database()
+    canteens = {
+        c["_id"]: c
+        for c in db.canteens.find({}, {"name": True, "busyPeriods": True, "withAirConditioning": True})
+    }
+    if since:
+        # A changed canteen changes every row that repeats its fields
+        changed_canteens = [c["_id"] for c in db.canteens.find(_changed_since(since), {"_id": True})]
+        query = {"$or": [_changed_since(since), {"canteenId": {"$in": changed_canteens}}]}
+    else:
+        changed_canteens = list(canteens)
+        query = {}
+
+    canteens_with_stores = set()
+    for batch in batches(db.stores.find(query).sort("_id", 1), batch_size):
+        menus = _menus(db, batch)
+        rows = []
+        for store in batch:
+            canteen = canteens.get(store["canteenId"])
+            if canteen is None:
+                continue  # orphaned store
+            canteens_with_stores.add(canteen["_id"])
+            for item in menus.get(store["_id"]) or [None]:
+                rows.append(_flat_row(canteen, store, item))
+        yield rows
+
+    # Every store of a changed canteen was read above, so the rest have no stores;
+    # they still get one row each
+    remaining = [cid for cid in changed_canteens if cid not in canteens_with_stores]
+    for start in range(0, len(remaining), batch_size):
+        yield [_flat_row(canteens[cid], None, None) for cid in remaining[start:start + batch_size]]
+
+
+def _flat_row(canteen, store, item):
+    store = store or {}
+    item = item or {}
+    return {
+        "canteen_id": str(canteen["_id"]),
+        "store_id": str(store["_id"]) if store else "",
+        "item_id": str(item.get("_id", "")),
+        "canteen_name": canteen["name"],
+        "canteen_with_air_conditioning": bool(canteen.get("withAirConditioning")),
+        "canteen_busy_periods": format_busy_periods(canteen.get("busyPeriods", [])),
+        "store_name": store.get("name", ""),
+        "store_description": store.get("description", ""),
+        "store_opening_hours": format_opening_hours(store.get("openingHours", [])),
+        "item_name": item.get("name", ""),
+        "item_price": item.get("price"),
+        "item_category": item.get("category", ""),
+    }
+
+
+def export_csv(out, since=None, batch_size=BATCH_SIZE) -> int:
+    writer = csv.DictWriter(out, fieldnames=FLAT_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for rows in flat_rows(since, batch_size):
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def export_parquet(path, since=None, batch_size=BATCH_SIZE) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from e
+
+    schema = pa.schema(
+        [(column, pa.string()) for column in FLAT_COLUMNS if column not in ("canteen_with_air_conditioning", "item_price")]
+        + [("canteen_with_air_conditioning", pa.bool_()), ("item_price", pa.float64())]
+    )
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in flat_rows(since, batch_size):
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                count += len(rows)
+    return count
+
+
+# --- Snapshot ---
+
+def export_snapshot(out, batch_size=BATCH_SIZE) -> int:
+    """Writes every canteen with its stores and menus nested, as in canteen_data.json."""
+    db = repository.get_database()
+    count = 0
+    out.write("[")
+    for batch in batches(db.canteens.find().sort("_id", 1), batch_size):
+        stores = {}
+        canteen_stores = list(db.stores.find({"canteenId": {"$in": [c["_id"] for c in batch]}}).sort("_id", 1))
+        menus = _menus(db, canteen_stores)
+        for store in canteen_stores:
+            stores.setdefault(store["canteenId"], []).append({
+                "name": store["name"],
+                "description": store.get("description", ""),
+                "openingHours": store.get("openingHours", []),
+                "menu": [
+                    {"name": item["name"], "price": item["price"], "category": item["category"]}
+                    for item in menus.get(store["_id"], [])
+                ],
+            })
+        for canteen in batch:
+            entry = {
+                "name": canteen["name"],
+                "busyPeriods": canteen.get("busyPeriods", []),
+                "withAirConditioning": canteen.get("withAirConditioning", False),
+                "stores": stores.get(canteen["_id"], []),
+            }
+            out.write(("\n" if count == 0 else ",\n") + json.dumps(entry, ensure_ascii=False))
+            count += 1
+    out.write("\n]\n" if count else "]\n")
+    return count
+
+
+# --- Incremental state ---
+
+def load_last_export(state_file=STATE_FILE):
+    try:
+        with open(state_file, encoding="utf-8") as f:
+            return datetime.datetime.fromisoformat(json.load(f)["lastExportAt"])
+    except FileNotFoundError:
+        return None
+
+
+def save_last_export(started_at, state_file=STATE_FILE):
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump({"lastExportAt": started_at.isoformat()}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export canteens, stores and menus.")
+    parser.add_argument("format", choices=["jsonl", "csv", "parquet", "snapshot"])
+    parser.add_argument("path")
+    parser.add_argument("--incremental", action="store_true", help="only documents changed since the last export")
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat, help="only documents changed after this time")
+    parser.add_argument("--state-file", default=STATE_FILE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    repository.add_connection_arguments(parser)
+    args = parser.parse_args()
+    repository.connect(args)
+
+    since = args.since or (load_last_export(args.state_file) if args.incremental else None)
+    if since and since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    # Taken before reading so writes made during the export are picked up next time
+    started_at = repository.now()
+
+    if args.format == "parquet":
+        count = export_parquet(args.path, since, args.batch_size)
+    else:
+        with open(args.path, "w", encoding="utf-8", newline="") as out:
+            if args.format == "jsonl":
+                count = export_jsonl(out, since, args.batch_size)
+            elif args.format == "csv":
+                count = export_csv(out, since, args.batch_size)
+            else:
+                count = export_snapshot(out, args.batch_size)
+
+    if args.incremental:
+        save_last_export(started_at, args.state_file)
+    print(f"Exported {count} {'canteens' if args.format == 'snapshot' else 'rows'} to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
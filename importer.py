@@ -0,0 +1,208 @@
+"""Bulk import of canteens, their stores and menus.
+
+Accepted formats:
+
+- json:  an array of canteens as in `canteen_data.json`, each with nested
+         `stores`, each store with a nested `menu`
+- jsonl: the same canteen objects, one per line (streamed)
+- csv:   the flat layout in `schema.CSV_COLUMNS`, one row per menu item (streamed)
+
+Rows are validated against the shape the entry forms write and written in
+unordered `bulk_write` batches that upsert by name, so importing the same
+file twice leaves the data unchanged.
+
+    python importer.py canteen_data.json
+    python importer.py menus.csv --chunk-size 2000 --uri mongodb://localhost:27017
+"""
+
+import argparse
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from pymongo.errors import BulkWriteError
+
+import repository
+from schema import (
+    ValidationError,
+    parse_busy_periods,
+    parse_opening_hours,
+    validate_canteen,
+    validate_menu_item,
+    validate_store,
+)
+
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    canteens: int = 0
+    stores: int = 0
+    menu_items: int = 0
+    rejected: list = field(default_factory=list)  # {"row": ..., "reason": ...}
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def detect_format(filename: str) -> str:
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}.get(filename.rsplit(".", 1)[-1].lower(), "json")
+
+
+# --- Readers: every format becomes (row number, canteen, store or None, item or None) ---
+
+def _nested(parent, field):
+    # Anything that is not an object is passed on as it is, for the validators to reject with its row
+    if not isinstance(parent, dict):
+        return []
+    children = parent.get(field) or []
+    return children if isinstance(children, list) else [children]
+
+
+def _flatten_canteen(number, canteen):
+    stores = _nested(canteen, "stores")
+    if not stores:
+        yield number, canteen, None, None
+    for store in stores:
+        menu = _nested(store, "menu")
+        if not menu:
+            yield number, canteen, store, None
+        for item in menu:
+            yield number, canteen, store, item
+
+
+def read_json(stream):
+    # A JSON array has to be parsed whole; use jsonl for files that do not fit in memory
+    canteens = json.load(stream)
+    if not isinstance(canteens, list):
+        raise ValidationError(f"expected an array of canteens, got {type(canteens).__name__}")
+    for number, canteen in enumerate(canteens, start=1):
+        yield from _flatten_canteen(number, canteen)
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, start=1):
+        if line.strip():
+            yield from _flatten_canteen(number, json.loads(line))
+
+
+def _csv_bool(value):
+    return (value or "").strip().lower() in ("1", "true", "yes", "y", "ใช่")
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        canteen = {
+            "name": row.get("canteen_name"),
+            "withAirConditioning": _csv_bool(row.get("canteen_with_air_conditioning")),
+            "busyPeriods": parse_busy_periods(row.get("canteen_busy_periods")),
+        }
+        store = None
+        if row.get("store_name"):
+            store = {
+                "name": row["store_name"],
+                "description": row.get("store_description"),
+                "openingHours": parse_opening_hours(row.get("store_opening_hours")),
+            }
+        item = None
+        if store and row.get("item_name"):
+            item = {"name": row["item_name"], "price": row.get("item_price"), "category": row.get("item_category")}
+        yield reader.line_num, canteen, store, item
+
+
+READERS = {"json": read_json, "jsonl": read_jsonl, "csv": read_csv}
+
+
+# --- Writing ---
+
+def _write_chunk(rows, report):
+    canteens, stores, items = {}, {}, []
+    for number, canteen, store, item in rows:
+        try:
+            canteen = validate_canteen(canteen)
+            store = validate_store(store) if store is not None else None
+            item = validate_menu_item(item) if item is not None else None
+        except (ValidationError, AttributeError, TypeError) as e:
+            report.rejected.append({"row": number, "reason": str(e)})
+            continue
+        canteen_key = canteen["name"].casefold()
+        canteens[canteen_key] = canteen
+        if store is not None:
+            stores[(canteen_key, store["name"].casefold())] = store
+            if item is not None:
+                items.append((canteen_key, store["name"], item))
+
+    canteen_ids = repository.upsert_canteens(list(canteens.values()))
+    report.canteens += len(canteens)
+    report.stores += repository.upsert_stores(
+        [{**store, "canteenId": canteen_ids[canteen_key]} for (canteen_key, _), store in stores.items()]
+    )
+    report.menu_items += repository.upsert_menu_items(
+        [(canteen_ids[canteen_key], store_name, item) for canteen_key, store_name, item in items]
+    )
+
+
+def import_stream(stream, file_format, chunk_size=CHUNK_SIZE, on_progress=None) -> ImportReport:
+    """Imports a text stream; `on_progress(report)` is called after every chunk."""
+    report = ImportReport()
+    rows = READERS[file_format](stream)
+    started = time.perf_counter()
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            report.rows += len(chunk)
+            try:
+                _write_chunk(chunk, report)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    report.rejected.append({"row": None, "reason": error.get("errmsg", str(error))})
+            report.seconds = time.perf_counter() - started
+            if on_progress:
+                on_progress(report)
+    except (json.JSONDecodeError, csv.Error, UnicodeDecodeError, ValidationError) as e:
+        report.rejected.append({"row": None, "reason": f"could not read file: {e}"})
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def import_file(path, file_format=None, chunk_size=CHUNK_SIZE, on_progress=None) -> ImportReport:
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        return import_stream(stream, file_format or detect_format(path), chunk_size, on_progress)
+
+
+def import_upload(uploaded_file, chunk_size=CHUNK_SIZE, on_progress=None) -> ImportReport:
+    """Imports a Streamlit `UploadedFile` without reading it into a string first."""
+    stream = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+    return import_stream(stream, detect_format(uploaded_file.name), chunk_size, on_progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import canteens, stores and menus.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(READERS), help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    repository.add_connection_arguments(parser)
+    args = parser.parse_args()
+    repository.connect(args)
+
+    def progress(report):
+        print(f"{report.rows} rows, {report.rows_per_second:.0f} rows/s", flush=True)
+
+    report = import_file(args.path, args.format, args.chunk_size, progress)
+    print(
+        f"Imported {report.rows} rows in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s): "
+        f"{report.canteens} canteens, {report.stores} stores written, {report.menu_items} menu item updates"
+    )
+    for rejected in report.rejected:
+        print(f"rejected row {rejected['row']}: {rejected['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""MongoDB commands per script run, from pymongo command monitoring.
+
+database_init() registers `shared_monitor` on the client and layout.sidebar()
+starts a run at the top of every page's script run. Each command the run
+sends is recorded with its latency and the documents and bytes it returned.
+A run is finished by the session's next script run, or by the sidebar's
+stats fragment a few seconds after it ends, whichever comes first. Finished
+runs are appended to a JSON-lines log and to a window of the last N runs that
+the percentiles are taken from. Commands slower than the threshold are logged
+as soon as they return.
+
+A command is attributed to the run whose context sends it: the script
+thread's, and the prefetch workers' (run_reads.py), which read in a copy of
+that context. Commands from other threads (the change feed, the replica
+sync) belong to no run, and the memory backend sends none at all.
+"""
+
+import contextvars
+import datetime
+import json
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+import bson
+from pymongo import monitoring
+
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+@dataclass(frozen=True)
+class CommandStat:
+    name: str
+    collection: str | None
+    ms: float
+    documents: int
+    bytes: int
+
+
+@dataclass
+class RunStats:
+    page: str
+    started_at: datetime.datetime
+    commands: list[CommandStat] = field(default_factory=list)
+    failures: int = 0
+    finished: bool = False
+
+    def totals(self) -> dict:
+        return {
+            "commands": len(self.commands),
+            "failures": self.failures,
+            "ms": sum(c.ms for c in self.commands),
+            "documents": sum(c.documents for c in self.commands),
+            "bytes": sum(c.bytes for c in self.commands),
+        }
+
+
+def _percentile(values, p):
+    # Nearest rank, so small windows report values that actually occurred
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))]
+
+
+def _documents(reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    # Writes report how many documents they touched
+    return reply.get("n", 0)
+
+
+class CommandMonitor(monitoring.CommandListener):
+    def __init__(self, slow_ms=100.0, log_path=None, window=200):
+        self._lock = threading.Lock()
+        self._pending = {}  # request_id -> (run, command name, collection)
+        self.configure(slow_ms, log_path, window)
+
+    def configure(self, slow_ms=100.0, log_path=None, window=200):
+        """`log_path` None turns the log off; `window` is how many runs the percentiles cover."""
+        with self._lock:
+            self.slow_ms = slow_ms
+            self.log_path = log_path
+            self.recent = deque(getattr(self, "recent", ()), maxlen=window)
+
+    def start_run(self, page: str) -> RunStats:
+        """Attributes the commands of the calling script run to a new RunStats."""
+        run = RunStats(page, datetime.datetime.now(datetime.timezone.utc))
+        _current_run.set(run)
+        return run
+
+    def current_run(self) -> RunStats | None:
+        return _current_run.get()
+
+    def finish_run(self, run: RunStats) -> None:
+        """Logs `run` and adds it to the recent window, once."""
+        with self._lock:
+            if run.finished:
+                return
+            run.finished = True
+            self.recent.append({"page": run.page, **run.totals(), "command_ms": [c.ms for c in run.commands]})
+        self._log({"type": "run", "page": run.page, "startedAt": run.started_at.isoformat(), **run.totals()})
+
+    def percentiles(self, points=(50, 90, 99)) -> dict:
+        """Percentiles of the per-run totals, and of single command latency, over the recent window."""
+        with self._lock:
+            runs = list(self.recent)
+        if not runs:
+            return {}
+        stats = {
+            metric: {f"p{p}": _percentile([r[metric] for r in runs], p) for p in points}
+            for metric in ("commands", "ms", "documents", "bytes")
+        }
+        command_ms = [ms for r in runs for ms in r["command_ms"]]
+        if command_ms:
+            stats["command_ms"] = {f"p{p}": _percentile(command_ms, p) for p in points}
+        return stats
+
+    # --- CommandListener ---
+
+    def started(self, event):
+        run = _current_run.get()
+        if run is None or run.finished:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        with self._lock:
+            self._pending[event.request_id] = (run, event.command_name, collection if isinstance(collection, str) else None)
+
+    def succeeded(self, event):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        run, name, collection = pending
+        stat = CommandStat(name, collection, event.duration_micros / 1000, _documents(event.reply), len(bson.encode(event.reply)))
+        with self._lock:
+            run.commands.append(stat)
+        if stat.ms >= self.slow_ms:
+            self._log({"type": "slow_command", "page": run.page, "at": _now_iso(), **asdict(stat)})
+
+    def failed(self, event):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+            if pending is not None:
+                pending[0].failures += 1
+
+    def _log(self, record: dict) -> None:
+        if not self.log_path:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as log:
+                    log.write(line + "\n")
+            except OSError:
+                pass  # an unwritable log must never break a page
+
+
+def _now_iso():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+# Module-level so every session's runs land in the same window and log
+shared_monitor = CommandMonitor()
@@ -0,0 +1,134 @@
+import hmac
+
+import streamlit as st
+
+from change_feed import shared_feed
+from instrumentation import shared_monitor
+from read_replica import shared_replica
+from repository import secret
+from run_reads import shared_reads
+
+# How often an open page asks the change feed whether others changed something
+CHANGE_CHECK_SECONDS = 5
+
+PERCENTILE_LABELS = {
+    "commands": "คำสั่งต่อรอบ",
+    "ms": "ms ต่อรอบ",
+    "documents": "เอกสารต่อรอบ",
+    "bytes": "ไบต์ต่อรอบ",
+    "command_ms": "ms ต่อคำสั่ง",
+}
+
+
+def check_password():
+    """Returns `True` if the user had the correct password."""
+
+    def password_entered():
+        """Checks whether a password entered by the user is correct."""
+        if hmac.compare_digest(st.session_state["password"], st.secrets["password"]):
+            st.session_state["password_correct"] = True
+            del st.session_state["password"]  # Don't store the password.
+        else:
+            st.session_state["password_correct"] = False
+
+    # Return True if the password is validated.
+    if st.session_state.get("password_correct", False):
+        return True
+
+    # Show input for password.
+    st.text_input(
+        "Password", type="password", on_change=password_entered, key="password"
+    )
+    if "password_correct" in st.session_state:
+        st.error("😕 Password incorrect")
+    return False
+
+
+def sidebar(page: str):
+    st.sidebar.header("MUGE100 C10-297 Data Entry")
+    st.sidebar.markdown("Implementation by Chanakan Moongthin")
+    st.sidebar.page_link("canteen.py", label="ข้อมูลโรงอาหาร", icon="🍽️")
+    st.sidebar.page_link("pages/stores.py", label="ข้อมูลร้านค้า", icon="🏪")
+    st.sidebar.page_link("pages/food_items.py", label="ข้อมูลรายการอาหาร", icon="🍲")
+    st.sidebar.page_link("pages/analytics.py", label="สรุปราคาและหมวดหมู่", icon="📊")
+    st.sidebar.page_link("pages/import_data.py", label="นำเข้าข้อมูล", icon="📥")
+
+    # Changes up to here are already on this page
+    st.session_state.change_sequence = shared_feed.sequence
+    st.session_state.own_changes = set()
+    # Commands from here on belong to this run of `page`; the previous run is over
+    if st.session_state.get("db_run") is not None:
+        shared_monitor.finish_run(st.session_state.db_run)
+    st.session_state.db_run = shared_monitor.start_run(page)
+    # Reads are sent at most once per run (see run_reads.py)
+    shared_reads.start_run()
+
+    with st.sidebar:
+        change_notice()
+        command_stats()
+
+
+@st.fragment(run_every=CHANGE_CHECK_SECONDS)
+def change_notice():
+    """Reruns the page when another session changed canteens or stores.
+
+    Those changes have already dropped the affected cached queries, so the
+    rerun refetches only what changed.
+    """
+    own_changes = st.session_state.get("own_changes", set())
+    changes = shared_feed.changes_since(st.session_state.get("change_sequence", shared_feed.sequence))
+    if changes is not None:
+        changes = [change for change in changes if change.sequence not in own_changes]
+    if changes is None or changes:
+        stores = sum(1 for change in changes or [] if change.collection == "stores")
+        canteens = sum(1 for change in changes or [] if change.collection == "canteens")
+        st.toast(f"ข้อมูลถูกแก้ไขโดยผู้ใช้อื่น (โรงอาหาร {canteens}, ร้านค้า {stores}) กำลังโหลดใหม่")
+        st.rerun()
+    st.caption(f"ติดตามการเปลี่ยนแปลง: {shared_feed.source}")
+
+    # Listings come from the local read replica while it is fresh (see read_replica.py)
+    age = shared_replica.age_seconds()
+    if shared_replica.is_fresh():
+        st.caption(f"รายการอ่านจากสำเนาในเครื่อง อัปเดตเมื่อ {age:.0f} วินาทีที่แล้ว")
+    elif age is not None:
+        st.warning(f"สำเนาในเครื่องไม่ได้อัปเดตมา {age:.0f} วินาที กำลังอ่านจากฐานข้อมูลโดยตรง")
+    elif shared_replica.enabled:
+        st.caption("กำลังสร้างสำเนาข้อมูลในเครื่อง อ่านจากฐานข้อมูลโดยตรงไปก่อน")
+
+
+@st.fragment(run_every=CHANGE_CHECK_SECONDS)
+def command_stats():
+    """Finishes the session's last script run and, if `command_stats_panel` is set, shows its commands."""
+    run = st.session_state.get("db_run")
+    if run is None:
+        return
+    if shared_monitor.current_run() is run:
+        # Still inside that run (the full rerun); its numbers come with the next fragment run
+        return
+    shared_monitor.finish_run(run)
+    if not secret("command_stats_panel", False):
+        return
+
+    totals = run.totals()
+    with st.expander("คำสั่งฐานข้อมูล (รอบล่าสุด)"):
+        st.caption(
+            f"{run.page}: {totals['commands']} คำสั่ง, {totals['ms']:.1f} ms, "
+            f"{totals['documents']} เอกสาร, {totals['bytes'] / 1024:.1f} KB"
+        )
+        if run.commands:
+            st.dataframe(
+                [
+                    {"คำสั่ง": c.name, "collection": c.collection, "ms": c.ms, "เอกสาร": c.documents, "ไบต์": c.bytes}
+                    for c in run.commands
+                ],
+                hide_index=True,
+                column_config={"ms": st.column_config.NumberColumn(format="%.1f")},
+            )
+        percentiles = shared_monitor.percentiles()
+        if percentiles:
+            st.caption(f"{len(shared_monitor.recent)} รอบล่าสุดของทุกผู้ใช้")
+            st.dataframe(
+                [{"": PERCENTILE_LABELS[metric], **values} for metric, values in percentiles.items()],
+                hide_index=True,
+                column_config={column: st.column_config.NumberColumn(format="%.1f") for column in ("p50", "p90", "p99")},
+            )
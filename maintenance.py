@@ -0,0 +1,229 @@
+"""Housekeeping commands for the canteen database.
+
+    python maintenance.py purge-orphans --dry-run
+    python maintenance.py purge-orphans --batch-size 200
+    python maintenance.py rebuild-search-index
+    python maintenance.py refresh-analytics
+    python maintenance.py dedupe-names --dry-run
+"""
+
+import argparse
+from dataclasses import dataclass
+
+import bson
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+import repository
+from name_keys import name_key
+from query_cache import shared_cache
+
+BATCH_SIZE = 100
+
+
+@dataclass
+class PurgeReport:
+    orphaned_canteen_ids: int = 0
+    orphaned_store_ids: int = 0
+    documents: int = 0
+    bytes: int = 0
+
+
+def _missing_ids(db, collection, referenced) -> list:
+    """The ids in `referenced` that have no document in `collection`."""
+    existing = set()
+    for start in range(0, len(referenced), BATCH_SIZE):
+        batch = referenced[start:start + BATCH_SIZE]
+        existing.update(d["_id"] for d in db[collection].find({"_id": {"$in": batch}}, {"_id": True}))
+    return [doc_id for doc_id in referenced if doc_id not in existing]
+
+
+def find_orphaned_canteen_ids(db) -> list:
+    """canteenIds referenced by stores that no longer exist in canteens.
+
+    Both reads are bounded by the number of canteens, not stores: distinct()
+    walks the canteenId index and the existence check is an _id lookup.
+    """
+    return _missing_ids(db, "canteens", db.stores.distinct("canteenId"))
+
+
+def find_orphaned_store_ids(db) -> list:
+    """storeIds referenced by menu items that no longer exist in stores."""
+    return _missing_ids(db, "stores", db.food_items.distinct("storeId"))
+
+
+def _measure(db, collection, query) -> tuple[int, int]:
+    """(documents, bytes) of `collection` matching `query`, measured on the server where it can."""
+    try:
+        totals = list(db[collection].aggregate([
+            {"$match": query},
+            {"$group": {"_id": None, "documents": {"$sum": 1}, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+        ]))
+    except OperationFailure:
+        # $bsonSize needs MongoDB 4.4+; older servers pay for the transfer instead
+        sizes = [len(bson.encode(doc)) for doc in db[collection].find(query)]
+        return len(sizes), sum(sizes)
+    return (totals[0]["documents"], totals[0]["bytes"]) if totals else (0, 0)
+
+
+def _purge(db, report, collections, query, dry_run):
+    """Counts, and unless `dry_run` deletes, the documents of `collections` matching `query`.
+
+    Only the first two collections (stores, menu items) go into the report;
+    the rest are derived data. The children are deleted before their parents
+    so an interrupted purge can be run again.
+    """
+    for collection in collections[:2]:
+        documents, size = _measure(db, collection, query)
+        report.documents += documents
+        report.bytes += size
+    if not dry_run:
+        for collection in reversed(collections):
+            db[collection].delete_many(query)
+
+
+def purge_orphans(batch_size=BATCH_SIZE, dry_run=False, on_progress=None) -> PurgeReport:
+    """Deletes stores whose canteen is gone and menu items whose store is gone."""
+    db = repository.get_database()
+    report = PurgeReport()
+    orphaned = find_orphaned_canteen_ids(db)
+    report.orphaned_canteen_ids = len(orphaned)
+    for start in range(0, len(orphaned), batch_size):
+        query = {"canteenId": {"$in": orphaned[start:start + batch_size]}}
+        _purge(db, report, ["stores", "food_items", "menu_search", "price_summary"], query, dry_run)
+        if on_progress:
+            on_progress(report)
+    # Left behind by store deletes from before the cascade ran children first
+    orphaned = find_orphaned_store_ids(db)
+    report.orphaned_store_ids = len(orphaned)
+    for start in range(0, len(orphaned), batch_size):
+        query = {"storeId": {"$in": orphaned[start:start + batch_size]}}
+        _purge(db, report, ["food_items", "menu_search"], query, dry_run)
+        if on_progress:
+            on_progress(report)
+    if not dry_run and report.documents:
+        shared_cache.invalidate(
+            ("stores",), ("store",), ("menu",), ("canteens", "page"), ("menu_search",), ("price_summary",)
+        )
+    return report
+
+
+# --- Duplicate names ---
+# The unique name indexes (repository.ensure_indexes) cannot be built while
+# the data already repeats a name, which the first versions of the app never
+# checked. The oldest document of each name keeps it; the others get a
+# numbered name that is free in the same scope.
+
+# Collection -> the field names are unique within (None: the whole collection)
+NAME_SCOPES = {"canteens": None, "stores": "canteenId", "food_items": "storeId"}
+
+
+@dataclass
+class DuplicateName:
+    collection: str
+    scope_id: ObjectId | None
+    name: str
+    kept_id: ObjectId
+    renames: list[tuple[ObjectId, str]]  # (_id, new name)
+
+
+def find_duplicate_names(db) -> list[DuplicateName]:
+    """Names used more than once within their scope, ignoring case, with the renames that fix them."""
+    duplicates = []
+    for collection, scope in NAME_SCOPES.items():
+        groups = db[collection].aggregate([
+            {"$group": {
+                "_id": {"scope": f"${scope}" if scope else None, "name": {"$toLower": "$name"}},
+                "ids": {"$push": "$_id"},
+                "names": {"$push": "$name"},
+                "count": {"$sum": 1},
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+        for group in groups:
+            scope_id = group["_id"]["scope"]
+            docs = sorted(zip(group["ids"], group["names"]))
+            taken = {
+                doc["name"].casefold()
+                for doc in db[collection].find({scope: scope_id} if scope else {}, {"name": True})
+            }
+            renames = []
+            for doc_id, name in docs[1:]:
+                number = 2
+                while f"{name} ({number})".casefold() in taken:
+                    number += 1
+                taken.add(f"{name} ({number})".casefold())
+                renames.append((doc_id, f"{name} ({number})"))
+            duplicates.append(DuplicateName(collection, scope_id, docs[0][1], docs[0][0], renames))
+    return duplicates
+
+
+def dedupe_names(dry_run=False) -> list[DuplicateName]:
+    """Renames all but the oldest document of every duplicate name, then builds the unique indexes."""
+    db = repository.get_database()
+    duplicates = find_duplicate_names(db)
+    if dry_run:
+        return duplicates
+    for collection in NAME_SCOPES:
+        operations = []
+        for duplicate in duplicates:
+            if duplicate.collection != collection:
+                continue
+            for doc_id, new_name in duplicate.renames:
+                update = {"$set": {"name": new_name, "nameKey": name_key(new_name), "updatedAt": repository.now()}}
+                if collection != "food_items":
+                    # Editors that loaded the old name must reload before saving
+                    update["$inc"] = {"version": 1}
+                operations.append(UpdateOne({"_id": doc_id}, update))
+        if operations:
+            db[collection].bulk_write(operations, ordered=False)
+    renamed_menus = [d.scope_id for d in duplicates if d.collection == "food_items"]
+    if renamed_menus:
+        repository.reindex_menu_search({"_id": {"$in": renamed_menus}})
+    repository.ensure_indexes(db)
+    shared_cache.clear()
+    return duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Canteen database maintenance.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    purge = commands.add_parser("purge-orphans", help="delete stores and menu items whose parent no longer exists")
+    purge.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="canteen or store ids per delete_many")
+    purge.add_argument("--dry-run", action="store_true", help="only count what would be deleted")
+    commands.add_parser("rebuild-search-index", help="rebuild the menu search entries from food_items")
+    commands.add_parser("refresh-analytics", help="recompute the price summary of every canteen")
+    dedupe = commands.add_parser("dedupe-names", help="rename repeated names so the unique name indexes can be built")
+    dedupe.add_argument("--dry-run", action="store_true", help="only list the duplicates and their new names")
+    repository.add_connection_arguments(parser)
+    args = parser.parse_args()
+    # Duplicate names are what stops the indexes from being built, so this command connects without them
+    repository.connect(args, build_indexes=args.command != "dedupe-names")
+
+    if args.command == "purge-orphans":
+        report = purge_orphans(args.batch_size, args.dry_run)
+        verb = "Would delete" if args.dry_run else "Deleted"
+        print(
+            f"{verb} {report.documents} orphaned stores and menu items ({report.bytes / 1024:.1f} KiB) "
+            f"belonging to {report.orphaned_canteen_ids} missing canteens and {report.orphaned_store_ids} missing stores"
+        )
+    elif args.command == "rebuild-search-index":
+        print(f"Indexed {repository.reindex_menu_search()} menu items")
+    elif args.command == "refresh-analytics":
+        repository.refresh_price_summary()
+        print(f"Price summary has {len(repository.load_price_summary())} canteen/category rows")
+    elif args.command == "dedupe-names":
+        duplicates = dedupe_names(args.dry_run)
+        verb = "Would rename" if args.dry_run else "Renamed"
+        for duplicate in duplicates:
+            for doc_id, new_name in duplicate.renames:
+                print(f"{verb} {duplicate.collection} {doc_id} to {new_name!r} (same name as {duplicate.kept_id})")
+        if not duplicates:
+            print("No duplicate names")
+        elif not args.dry_run:
+            print("Built the unique name indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Menu item search by character bigrams, which works for Thai where word-based text indexes do not.
+
+Every menu item has an entry in the `menu_search` collection:
+
+    {"_id": item id, "storeId", "canteenId", "name", "price", "category",
+     "key": normalized name, "grams": [bigrams of key]}
+
+indexed on `key` and (multikey) on `grams`. A query is normalized and split
+the same way; names starting with it are fetched first, then names holding
+all of its bigrams, then names holding some, and the candidates are ranked
+here.
+repository.py keeps the entries in step with every menu write.
+"""
+
+import unicodedata
+
+GRAM_SIZE = 2
+# Upper bound on entries read per query, whatever the collection size
+CANDIDATE_LIMIT = 500
+# A partial match must share at least this fraction of the query's bigrams
+MIN_PARTIAL_OVERLAP = 0.5
+
+_IGNORED = {"\u200b", "\u200c", "\u200d", "\ufeff"}  # zero-width characters pasted along with Thai text
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return "".join(ch for ch in text if not ch.isspace() and ch not in _IGNORED)
+
+
+def ngrams(text: str) -> list[str]:
+    key = normalize(text)
+    if len(key) < GRAM_SIZE:
+        return []
+    return sorted({key[i:i + GRAM_SIZE] for i in range(len(key) - GRAM_SIZE + 1)})
+
+
+def search_entry(item: dict) -> dict:
+    """The entry of a `food_items` document."""
+    return {
+        "_id": item["_id"],
+        "storeId": item["storeId"],
+        "canteenId": item["canteenId"],
+        "name": item["name"],
+        "price": item["price"],
+        "category": item["category"],
+        "key": normalize(item["name"]),
+        "grams": ngrams(item["name"]),
+    }
+
+
+def rank(query: str, candidates: list[dict], limit: int) -> list[dict]:
+    """Candidates ordered best first, each with a `score` between 0 and 1.
+
+    Exact names come first, then names starting with the query, then names
+    containing it, then partial matches; within each group by bigram overlap.
+    """
+    key = normalize(query)
+    query_grams = set(ngrams(query))
+    ranked = []
+    for entry in candidates:
+        grams = set(entry["grams"])
+        shared = len(query_grams & grams)
+        if shared < MIN_PARTIAL_OVERLAP * len(query_grams):
+            continue
+        if entry["key"] == key:
+            tier = 3
+        elif entry["key"].startswith(key):
+            tier = 2
+        elif key in entry["key"]:
+            tier = 1
+        else:
+            tier = 0
+        result = {k: v for k, v in entry.items() if k not in ("grams", "key")}
+        result["score"] = (tier + shared / len(query_grams | grams)) / 4
+        ranked.append(result)
+    ranked.sort(key=lambda e: (-e["score"], len(e["name"]), e["name"]))
+    return ranked[:limit]
@@ -0,0 +1,228 @@
+"""Versioned schema migrations.
+
+Every canteen, store and food item carries `schemaVersion`. Documents written by the
+current code already have the latest version; older ones are upgraded here
+in `_id` order, one `bulk_write` per batch. A step may also write other
+collections for its batch first (stores v3 moves menus into food_items).
+After each batch the last `_id` is checkpointed in the `migrations`
+collection, so an interrupted run picks up where it stopped. The app
+reads only the current shape and will not start while any document is
+older (repository.outdated_collections).
+
+    python migrations.py --dry-run    # how many documents each step would change
+    python migrations.py
+"""
+
+import argparse
+from dataclasses import dataclass
+from typing import Callable
+
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import repository
+from name_keys import name_key
+from opening_hours import busy_minutes, opening_minutes
+from query_cache import shared_cache
+from schema import SCHEMA_VERSIONS
+
+BATCH_SIZE = 500
+
+
+@dataclass
+class Migration:
+    collection: str
+    version: int
+    description: str
+    upgrade: Callable[[dict], dict]  # document -> update spec
+    # (db, batch) -> None, run before the batch's updates; must be safe to repeat
+    before_batch: Callable | None = None
+
+    @property
+    def checkpoint_id(self):
+        return f"{self.collection}:{self.version}"
+
+
+# --- Steps ---
+
+def _canteen_v1(canteen):
+    # The embedded stores array was never maintained; counts come from the stores collection
+    busy_periods = canteen.get("busyPeriods") or []
+    return {
+        "$set": {
+            "busyPeriods": busy_periods,
+            "busyMinutes": busy_minutes(busy_periods),
+            "withAirConditioning": bool(canteen.get("withAirConditioning", False)),
+        },
+        "$unset": {"stores": ""},
+    }
+
+
+def _store_v1(store):
+    opening_hours = store.get("openingHours") or []
+    return {
+        "$set": {
+            "description": store.get("description") or "",
+            "openingHours": opening_hours,
+            "openingMinutes": opening_minutes(opening_hours),
+            "menu": [item if "_id" in item else {"_id": ObjectId(), **item} for item in store.get("menu") or []],
+        },
+    }
+
+
+def _version_counter(doc):
+    # Edits are conditional on the version the editor loaded
+    return {"$set": {"version": doc.get("version", 1)}}
+
+
+def _copy_menus(db, stores):
+    # Replaced by _id, so a batch interrupted after this step copies the same items again
+    operations = [
+        ReplaceOne(
+            {"_id": item["_id"]},
+            {**item, "storeId": store["_id"], "canteenId": store["canteenId"], "updatedAt": repository.now()},
+            upsert=True,
+        )
+        for store in stores
+        for item in store.get("menu") or []
+    ]
+    if not operations:
+        return
+    try:
+        db.food_items.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # A store's items may differ only in case, which the unique (storeId, name) index
+        # does not allow; the first one is kept
+        if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+
+def _store_v3(store):
+    # Counted like the unique index compares names, so duplicates dropped above are not counted
+    return {
+        "$set": {"menuCount": len({item["name"].casefold() for item in store.get("menu") or []})},
+        "$unset": {"menu": ""},
+    }
+
+
+def _name_key(doc):
+    # Near-duplicate name warnings look documents up by this key
+    return {"$set": {"nameKey": name_key(doc["name"])}}
+
+
+MIGRATIONS = [
+    Migration("canteens", 1, "drop the stale stores array, add busyMinutes and defaults", _canteen_v1),
+    Migration("stores", 1, "add missing description/menu, menu item ids and openingMinutes", _store_v1),
+    Migration("canteens", 2, "add the version counter", _version_counter),
+    Migration("stores", 2, "add the version counter", _version_counter),
+    Migration("stores", 3, "move the embedded menu into food_items, keep menuCount", _store_v3, _copy_menus),
+    Migration("stores", 4, "add nameKey", _name_key),
+    # After stores v3, which copies the embedded menus in without a schemaVersion
+    Migration("food_items", 1, "add nameKey", _name_key),
+    # name_key() stopped collapsing repeated digits ("500ml" was "50ml")
+    Migration("stores", 5, "recompute nameKey", _name_key),
+    Migration("food_items", 2, "recompute nameKey", _name_key),
+]
+
+# New documents are written at the latest version, so the last step must reach it
+assert all(
+    max(m.version for m in MIGRATIONS if m.collection == collection) == version
+    for collection, version in SCHEMA_VERSIONS.items()
+)
+
+
+# --- Runner ---
+
+def _outdated(version):
+    # Also matches documents that have no schemaVersion at all
+    return {"schemaVersion": {"$not": {"$gte": version}}}
+
+
+def _ready(version):
+    # Documents exactly one step behind, so no step is ever skipped
+    if version == 1:
+        return {"schemaVersion": {"$exists": False}}
+    return {"schemaVersion": version - 1}
+
+
+@dataclass
+class MigrationResult:
+    migration: str
+    pending: int = 0
+    migrated: int = 0
+    resumed_after: ObjectId | None = None
+
+
+def run_migration(db, migration, batch_size=BATCH_SIZE, dry_run=False, on_progress=None) -> MigrationResult:
+    collection = db[migration.collection]
+    result = MigrationResult(migration.checkpoint_id, pending=collection.count_documents(_outdated(migration.version)))
+    if dry_run or not result.pending:
+        return result
+
+    checkpoint = db.migrations.find_one({"_id": migration.checkpoint_id}) or {}
+    last_id = result.resumed_after = checkpoint.get("lastId")
+    while True:
+        query = _ready(migration.version)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(collection.find(query).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        if migration.before_batch:
+            migration.before_batch(db, batch)
+        operations = []
+        for doc in batch:
+            update = migration.upgrade(doc)
+            update.setdefault("$set", {})["schemaVersion"] = migration.version
+            # Skip documents someone upgraded (or rewrote) since we read them
+            operations.append(UpdateOne({"_id": doc["_id"], **_ready(migration.version)}, update))
+        result.migrated += collection.bulk_write(operations, ordered=False).modified_count
+        last_id = batch[-1]["_id"]
+        db.migrations.update_one(
+            {"_id": migration.checkpoint_id},
+            {"$set": {"lastId": last_id, "updatedAt": repository.now()}, "$inc": {"migrated": len(batch)}},
+            upsert=True,
+        )
+        if on_progress:
+            on_progress(result)
+
+    # A finished pass forgets its position, so documents restored later are not skipped
+    db.migrations.update_one(
+        {"_id": migration.checkpoint_id},
+        {"$set": {"finishedAt": repository.now()}, "$unset": {"lastId": ""}},
+        upsert=True,
+    )
+    return result
+
+
+def migrate(batch_size=BATCH_SIZE, dry_run=False, on_progress=None) -> list[MigrationResult]:
+    db = repository.get_database()
+    results = [run_migration(db, m, batch_size, dry_run, on_progress) for m in MIGRATIONS]
+    if not dry_run:
+        shared_cache.clear()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade canteen, store and food item documents to the current schema.")
+    parser.add_argument("--dry-run", action="store_true", help="only count the documents each step would change")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    repository.add_connection_arguments(parser)
+    args = parser.parse_args()
+    repository.connect(args)
+
+    def progress(result):
+        print(f"{result.migration}: {result.migrated}/{result.pending}", flush=True)
+
+    descriptions = {m.checkpoint_id: m.description for m in MIGRATIONS}
+    for result in migrate(args.batch_size, args.dry_run, progress):
+        if args.dry_run:
+            print(f"{result.migration} ({descriptions[result.migration]}): {result.pending} documents to upgrade")
+        else:
+            resumed = f", resumed after {result.resumed_after}" if result.resumed_after else ""
+            print(f"{result.migration}: upgraded {result.migrated} of {result.pending} documents{resumed}")
+
+
+if __name__ == "__main__":
+    main()
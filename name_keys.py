@@ -0,0 +1,60 @@
+"""Keys that near-duplicate store and menu item names share.
+
+Operators enter the same dish twice with small differences: a trailing
+space, a missing or doubled tone mark, punctuation, Latin case or accents,
+Thai or Arabic digits. Every store and food item is stored with
+`nameKey = name_key(name)`, indexed per canteen and per store, so the forms
+can warn about likely duplicates with one equality lookup instead of
+comparing against every name.
+
+The key is the menu search normalization (NFKC, case folding, no
+whitespace or zero-width characters), then without punctuation, symbols,
+Thai tone marks or Latin accents, with digits as ASCII and runs of one
+character other than a digit collapsed ("500" and "50" are different
+sizes, not a typo). It only warns; the unique name indexes still decide
+what is rejected.
+"""
+
+import unicodedata
+from itertools import groupby
+
+from menu_search import normalize
+
+# Mai taikhu, the four tone marks, thanthakhat and yamakkan: often typed
+# twice, left out or in the wrong order. Not nikhahit, which NFKC makes
+# part of every sara am.
+_THAI_MARKS = {"\u0e47", "\u0e48", "\u0e49", "\u0e4a", "\u0e4b", "\u0e4c", "\u0e4e"}
+
+
+def _is_thai(ch):
+    return "\u0e00" <= ch <= "\u0e7f"
+
+
+def _fold(ch):
+    if ch in _THAI_MARKS:
+        return ""
+    category = unicodedata.category(ch)
+    if category[0] in "PS":
+        return ""
+    # Accents of other scripts; Thai vowels above and below are marks too and stay
+    if category == "Mn" and not _is_thai(ch):
+        return ""
+    if category == "Nd":
+        return str(unicodedata.digit(ch))
+    return ch
+
+
+def name_key(name: str) -> str:
+    # NFKD splits Latin accents off their letters
+    folded = "".join(_fold(ch) for ch in unicodedata.normalize("NFKD", normalize(name)))
+    return "".join("".join(run) if ch.isdigit() else ch for ch, run in groupby(folded))
+
+
+def similar_name_groups(names) -> list[list[str]]:
+    """Groups of two or more distinct `names` that share a key, in first-seen order."""
+    groups = {}
+    for name in names:
+        key = name_key(name)
+        if key and name not in groups.setdefault(key, []):
+            groups[key].append(name)
+    return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,77 @@
+"""Opening hours and busy periods as integer minute ranges, so "open at T" is an index lookup.
+
+Stores keep their form-shaped `openingHours` and, next to it, `openingMinutes`:
+a list of `{"start": int, "end": int}` half-open ranges in minutes of the week,
+Monday 00:00 = 0. Canteens get `busyMinutes` the same way, in minutes of the
+day, because busy periods apply to every day.
+"""
+
+import datetime
+from zoneinfo import ZoneInfo
+
+from schema import DAYS_OF_WEEK
+
+MINUTES_PER_DAY = 24 * 60
+
+# Opening hours are entered in the canteens' local time
+LOCAL_TIMEZONE = ZoneInfo("Asia/Bangkok")
+
+
+def minute_of_day(value) -> int:
+    """Minutes since midnight for "HH:MM" or a datetime.time."""
+    if isinstance(value, str):
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def minute_of_week(day: str, value) -> int:
+    return DAYS_OF_WEEK.index(day) * MINUTES_PER_DAY + minute_of_day(value)
+
+
+def opening_minutes(opening_hours: list[dict]) -> list[dict]:
+    """`openingHours` entries -> minute-of-week ranges.
+
+    An entry that ends at or before its start runs past midnight into the
+    next day.
+    """
+    ranges = []
+    for entry in opening_hours:
+        if entry.get("dayOfWeek") not in DAYS_OF_WEEK:
+            continue
+        start = minute_of_week(entry["dayOfWeek"], entry["start"])
+        end = minute_of_week(entry["dayOfWeek"], entry["end"])
+        if end <= start:
+            end += MINUTES_PER_DAY
+        ranges.append({"start": start, "end": end})
+    return ranges
+
+
+def busy_minutes(busy_periods: list[dict]) -> list[dict]:
+    return [
+        {"start": minute_of_day(p["start"]), "end": minute_of_day(p["end"])}
+        for p in busy_periods
+        if minute_of_day(p["end"]) > minute_of_day(p["start"])
+    ]
+
+
+def open_query(day: str, start, end=None) -> dict:
+    """Filter for stores open at `start`, or for the whole of `start`-`end`, on `day`."""
+    start_minute = minute_of_week(day, start)
+    end_minute = minute_of_week(day, end) if end is not None else start_minute + 1
+    return {"openingMinutes": {"$elemMatch": {"start": {"$lte": start_minute}, "end": {"$gte": end_minute}}}}
+
+
+def busy_query(start, end=None) -> dict:
+    """Filter for canteens with a busy period overlapping `start`-`end` (or the minute `start`)."""
+    start_minute = minute_of_day(start)
+    end_minute = minute_of_day(end) if end is not None else start_minute + 1
+    return {"busyMinutes": {"$elemMatch": {"start": {"$lt": end_minute}, "end": {"$gt": start_minute}}}}
+
+
+def current_day_and_time(now: datetime.datetime | None = None):
+    """(day name, time) for now, or None on weekends when no store opens."""
+    now = now or datetime.datetime.now(LOCAL_TIMEZONE)
+    if now.weekday() >= len(DAYS_OF_WEEK):
+        return None
+    return DAYS_OF_WEEK[now.weekday()], now.time()
@@ -0,0 +1,93 @@
+import streamlit as st
+
+from layout import check_password, sidebar
+from repository import (
+    cache_stats,
+    database_init,
+    load_canteens,
+    load_price_summary,
+    refresh_price_summary,
+)
+from schema import CATEGORIES
+
+st.set_page_config(page_title="สรุปราคาและหมวดหมู่", page_icon="📊")
+
+if not check_password():
+    st.stop()  # Do not continue if check_password is not True.
+
+sidebar("analytics")
+
+mongo = database_init()
+
+if not mongo:
+    st.error("Cannot Access Data Storage")
+    st.stop()
+
+stats = cache_stats()
+st.sidebar.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses")
+
+st.title("📊 สรุปราคาและหมวดหมู่")
+
+# --- Load Summary ---
+# Both reads go out together (see run_reads.py)
+load_canteens.prefetch()
+summary = load_price_summary()
+canteen_names = {c["_id"]: c["name"] for c in load_canteens()}
+
+if st.button("คำนวณใหม่ทั้งหมด", help="ปกติสรุปจะอัปเดตเองเมื่อแก้ไขรายการอาหาร"):
+    with st.spinner("กำลังคำนวณ..."):
+        refresh_price_summary()
+    st.rerun()
+
+if not summary:
+    st.write("ยังไม่มีข้อมูลรายการอาหาร")
+    st.stop()
+
+# --- Item Counts per Canteen and Category ---
+st.header("จำนวนรายการอาหาร")
+counts = {}
+for row in summary:
+    counts.setdefault(row["canteenId"], dict.fromkeys(CATEGORIES, 0))[row["category"]] = row["count"]
+st.dataframe(
+    [
+        {
+            "โรงอาหาร": canteen_names.get(canteen_id, str(canteen_id)),
+            **{label: per_category.get(code, 0) for code, label in CATEGORIES.items()},
+            "รวม": sum(per_category.values()),
+        }
+        for canteen_id, per_category in counts.items()
+    ],
+    hide_index=True,
+)
+
+# --- Prices per Canteen and Category ---
+st.header("ราคา (บาท)")
+canteen_filter = st.selectbox(
+    "โรงอาหาร",
+    options=[None, *counts],
+    format_func=lambda x: "ทั้งหมด" if x is None else canteen_names.get(x, str(x)),
+    key="analytics_canteen",
+)
+st.dataframe(
+    [
+        {
+            "โรงอาหาร": canteen_names.get(row["canteenId"], str(row["canteenId"])),
+            "หมวดหมู่": CATEGORIES.get(row["category"], row["category"]),
+            "จำนวน": row["count"],
+            "ต่ำสุด": row["minPrice"],
+            "สูงสุด": row["maxPrice"],
+            "เฉลี่ย": row["meanPrice"],
+            "มัธยฐาน": row["medianPrice"],
+        }
+        for row in summary
+        if canteen_filter is None or row["canteenId"] == canteen_filter
+    ],
+    hide_index=True,
+    column_config={
+        column: st.column_config.NumberColumn(format="%.2f")
+        for column in ("ต่ำสุด", "สูงสุด", "เฉลี่ย", "มัธยฐาน")
+    },
+)
+
+refreshed_at = max(row["refreshedAt"] for row in summary)
+st.caption(f"อัปเดตล่าสุด {refreshed_at:%Y-%m-%d %H:%M} UTC")
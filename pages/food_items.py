@@ -1,46 +1,31 @@
 import streamlit as st
-import pymongo
-from pymongo.server_api import ServerApi
-import hmac
-from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
 
-st.set_page_config(page_title="ข้อมูลรายการอาหาร", page_icon="🍲")
-
-def check_password():
-    """Returns `True` if the user had the correct password."""
-
-    def password_entered():
-        """Checks whether a password entered by the user is correct."""
-        if hmac.compare_digest(st.session_state["password"], st.secrets["password"]):
-            st.session_state["password_correct"] = True
-            del st.session_state["password"]  # Don't store the password.
-        else:
-            st.session_state["password_correct"] = False
-
-    # Return True if the password is validated.
-    if st.session_state.get("password_correct", False):
-        return True
+from layout import check_password, sidebar
+from name_keys import similar_name_groups
+from pagination import PAGE_SIZE_OPTIONS, current_page_start, page_navigation, page_start
+from repository import (
+    add_menu_item,
+    cache_stats,
+    database_init,
+    delete_menu_item,
+    find_similar_menu_items,
+    load_canteens,
+    load_menu,
+    load_menu_page,
+    load_stores,
+    save_menu_changes,
+    search_menu,
+    update_menu_item,
+)
+from schema import CATEGORIES
 
-    # Show input for password.
-    st.text_input(
-        "Password", type="password", on_change=password_entered, key="password"
-    )
-    if "password_correct" in st.session_state:
-        st.error("😕 Password incorrect")
-    return False
+st.set_page_config(page_title="ข้อมูลรายการอาหาร", page_icon="🍲")
 
 if not check_password():
     st.stop()  # Do not continue if check_password is not True.
 
-st.sidebar.header("MUGE100 C10-297 Data Entry")
-st.sidebar.markdown("Implementation by Chanakan Moongthin")
-st.sidebar.page_link("canteen.py", label="ข้อมูลโรงอาหาร", icon="🍽️")
-st.sidebar.page_link("pages/stores.py", label="ข้อมูลร้านค้า", icon="🏪")
-st.sidebar.page_link("pages/food_items.py", label="ข้อมูลรายการอาหาร", icon="🍲")
-
-@st.cache_resource()
-def database_init():
-    return pymongo.MongoClient(st.secrets["mongo_uri"], server_api=ServerApi("1"))
+sidebar("food_items")
 
 mongo = database_init()
 
@@ -48,27 +33,53 @@ if not mongo:
     st.error("Cannot Access Data Storage")
     st.stop()
 
-st.title("🍲 ข้อมูลรายการอาหาร")
-
-# --- Database Operations ---
-canteen_collection = mongo.canteen_info.canteens
-store_collection = mongo.canteen_info.stores
-
-# Function to load canteen data from MongoDB
-def load_canteens():
-    data = canteen_collection.find()
-    return list(data)
+stats = cache_stats()
+st.sidebar.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses")
 
-def load_stores():
-    data = store_collection.find()
-    return list(data)
+st.title("🍲 ข้อมูลรายการอาหาร")
 
-def update_store(store_id, updated_store):
-    store_collection.update_one({"_id": ObjectId(store_id)}, {"$set": updated_store})
+# --- Search Across All Canteens ---
+menu_query = st.text_input("🔍 ค้นหาเมนูจากทุกโรงอาหาร", key="menu_search_query", placeholder="เช่น ข้าวผัดกะเพรา")
+if menu_query.strip():
+    results = search_menu(menu_query)
+    if results:
+        st.dataframe(
+            [
+                {
+                    "ชื่ออาหาร": r["name"],
+                    "ราคา": r["price"],
+                    "หมวดหมู่": CATEGORIES.get(r["category"], r["category"]),
+                    "ร้านค้า": r["storeName"],
+                    "โรงอาหาร": r["canteenName"],
+                }
+                for r in results
+            ],
+            hide_index=True,
+            column_config={"ราคา": st.column_config.NumberColumn(format="%.2f บาท")},
+        )
+    elif len(menu_query.strip()) < 2:
+        st.caption("พิมพ์อย่างน้อย 2 ตัวอักษร")
+    else:
+        st.write("ไม่พบรายการอาหารที่ตรงกัน")
 
 # --- Load and Extract Data ---
+# The canteen list, the selected canteen's stores and the selected store's
+# menu do not depend on each other, so they go out together (see
+# run_reads.py); the calls below wait for these results
+load_canteens.prefetch()
+prefetch_canteen_id = st.session_state.get("canteen_select", st.session_state.get("selected_canteen_id"))
+if prefetch_canteen_id:
+    load_stores.prefetch(prefetch_canteen_id)
+prefetch_store_id = st.session_state.get("store_select", st.session_state.get("selected_store_id"))
+if prefetch_store_id and st.session_state.get("menu_entry_mode", "ทีละรายการ") == "ทีละรายการ":
+    load_menu_page.prefetch(
+        prefetch_store_id,
+        st.session_state.get("menu_sort", "category"),
+        current_page_start("menu"),
+        st.session_state.get("menu_page_size", PAGE_SIZE_OPTIONS[1]) + 1,
+    )
 canteens = load_canteens()
-stores = load_stores()
+stores = []
 
 # --- Session State Initialization ---
 if "selected_canteen_id" not in st.session_state:
@@ -81,6 +92,12 @@ if "food_item_price" not in st.session_state:
     st.session_state.food_item_price = 0.0
 if "food_item_category" not in st.session_state:
     st.session_state.food_item_category = "MAIN"
+if "editing_food_item_id" not in st.session_state:
+    st.session_state.editing_food_item_id = None
+if "menu_grid" not in st.session_state:
+    st.session_state.menu_grid = None  # {"store_id", "menu"}: the menu as loaded into the grid
+if "menu_grid_revision" not in st.session_state:
+    st.session_state.menu_grid_revision = 0  # Bumped after a save so the grid drops its edits
 
 # --- Dropdowns to Select Canteen and Store ---
 canteen_options = {str(c["_id"]): c["name"] for c in canteens}
@@ -93,7 +110,8 @@ st.session_state.selected_canteen_id = st.selectbox(
 )
 
 if st.session_state.selected_canteen_id:
-    store_options = {str(s["_id"]): s["name"] for s in stores if str(s["canteenId"]) == st.session_state.selected_canteen_id}
+    stores = load_stores(st.session_state.selected_canteen_id)
+    store_options = {str(s["_id"]): s["name"] for s in stores}
     st.session_state.selected_store_id = st.selectbox(
         "เลือกร้านค้า",
         options=store_options.keys(),
@@ -102,73 +120,203 @@ if st.session_state.selected_canteen_id:
         key="store_select"
     )
 
+
+# Function to read a grid cell; empty cells of new rows come back as None or NaN
+def grid_cell(row, column, default):
+    value = row.get(column)
+    return default if value is None or value != value or value == "" else value
+
+
+entry_mode = st.radio("วิธีกรอกข้อมูล", ["ทีละรายการ", "ตาราง"], horizontal=True, key="menu_entry_mode")
+
+# --- Editable Grid of the Whole Menu ---
+if st.session_state.selected_store_id and entry_mode == "ตาราง":
+    store_id = st.session_state.selected_store_id
+    # The grid keeps its edits relative to the rows it was given, so those stay fixed until saved
+    if st.session_state.menu_grid is None or st.session_state.menu_grid["store_id"] != store_id:
+        st.session_state.menu_grid = {"store_id": store_id, "menu": load_menu(store_id)}
+    original_menu = st.session_state.menu_grid["menu"]
+
+    st.header("แก้ไขรายการอาหารแบบตาราง")
+    st.caption("เพิ่มแถวที่ท้ายตาราง เลือกแถวแล้วกด Delete เพื่อลบ แล้วกดบันทึกครั้งเดียว")
+    edited_rows = st.data_editor(
+        [
+            {"_id": str(item["_id"]), "name": item["name"], "price": float(item["price"]), "category": item["category"]}
+            for item in original_menu
+        ],
+        num_rows="dynamic",
+        hide_index=True,
+        key=f"menu_grid_{store_id}_{st.session_state.menu_grid_revision}",
+        column_order=["name", "price", "category"],
+        column_config={
+            "name": st.column_config.TextColumn("ชื่ออาหาร", required=True),
+            "price": st.column_config.NumberColumn("ราคา", min_value=0.0, format="%.2f", required=True),
+            "category": st.column_config.SelectboxColumn(
+                "หมวดหมู่",
+                options=list(CATEGORIES),
+                format_func=lambda x: CATEGORIES.get(x, x),
+                default="MAIN",
+                required=True,
+            ),
+        },
+    )
+
+    # The grid holds the whole menu, so near-duplicates are found among its own rows
+    for group in similar_name_groups(str(grid_cell(row, "name", "")).strip() for row in edited_rows):
+        st.warning("ชื่ออาหารคล้ายกัน: " + ", ".join(group))
+
+    if st.button("บันทึกตาราง"):
+        rows = [
+            {
+                "_id": grid_cell(row, "_id", None),
+                "name": str(grid_cell(row, "name", "")).strip(),
+                "price": float(grid_cell(row, "price", 0.0)),
+                "category": grid_cell(row, "category", "MAIN"),
+            }
+            for row in edited_rows
+        ]
+        names = [row["name"].casefold() for row in rows]
+        if any(not row["name"] or row["price"] == 0.0 for row in rows):
+            st.error("กรุณากรอกชื่ออาหารและราคาให้ครบทุกแถว")
+        elif len(set(names)) != len(names):
+            st.error("มีชื่ออาหารซ้ำกันในตาราง กรุณาใช้ชื่ออื่น")
+        else:
+            rejected = save_menu_changes(st.session_state.selected_canteen_id, store_id, original_menu, rows)
+            st.session_state.menu_grid = None
+            st.session_state.menu_grid_revision += 1
+            if rejected:
+                st.session_state.menu_grid_rejected = rejected
+            st.rerun()
+
+    if st.session_state.get("menu_grid_rejected"):
+        st.error(
+            "บันทึกไม่ได้ เพราะมีชื่ออาหารนี้ในร้านค้านี้อยู่แล้ว: "
+            + ", ".join(st.session_state.pop("menu_grid_rejected"))
+        )
+    st.stop()
+
 # --- Input Form for Food Item ---
 if st.session_state.selected_store_id:
-    st.header("เพิ่มรายการอาหาร")
+    st.header("เพิ่มรายการอาหาร" if st.session_state.editing_food_item_id is None else "แก้ไขรายการอาหาร")
 
     st.session_state.food_item_name = st.text_input("ชื่ออาหาร", value=st.session_state.food_item_name)
+    # Names that differ only in spacing, tone marks, punctuation or case; saving is still allowed
+    similar_items = find_similar_menu_items(
+        st.session_state.selected_store_id, st.session_state.food_item_name, st.session_state.editing_food_item_id
+    )
+    if similar_items:
+        st.warning("ร้านค้านี้มีรายการอาหารที่ชื่อคล้ายกันอยู่แล้ว: " + ", ".join(similar_items))
     st.session_state.food_item_price = st.number_input("ราคา", min_value=0.0, format="%.2f", value=st.session_state.food_item_price)
     st.session_state.food_item_category = st.selectbox(
         "หมวดหมู่",
-        options=["MAIN", "SIDE", "DRINK", "VEGETARIAN"],
-        index=["MAIN", "SIDE", "DRINK", "VEGETARIAN"].index(st.session_state.food_item_category),
-        format_func=lambda x: {
-            "MAIN": "อาหารจานหลัก",
-            "SIDE": "กับข้าว",
-            "DRINK": "เครื่องดื่ม",
-            "VEGETARIAN": "มังสวิรัติ"
-        }.get(x, x)
+        options=list(CATEGORIES),
+        index=list(CATEGORIES).index(st.session_state.food_item_category),
+        format_func=lambda x: CATEGORIES.get(x, x)
     )
 
-    if st.button("เพิ่มรายการอาหาร"):
-        if not st.session_state.food_item_name or st.session_state.food_item_price == 0.0:
-            st.error("กรุณากรอกชื่ออาหารและราคา")
-        else:
-            new_food_item = {
-                "name": st.session_state.food_item_name,
-                "price": st.session_state.food_item_price,
-                "category": st.session_state.food_item_category,
-            }
+    if st.session_state.editing_food_item_id is None:
+        if st.button("เพิ่มรายการอาหาร"):
+            if not st.session_state.food_item_name or st.session_state.food_item_price == 0.0:
+                st.error("กรุณากรอกชื่ออาหารและราคา")
+            else:
+                new_food_item = {
+                    "name": st.session_state.food_item_name,
+                    "price": st.session_state.food_item_price,
+                    "category": st.session_state.food_item_category,
+                }
 
-            # Find the selected store and update its menu
-            selected_store = store_collection.find_one({"_id": ObjectId(st.session_state.selected_store_id)})
-            if selected_store:
-                if "menu" not in selected_store:
-                    selected_store["menu"] = []
+                added = add_menu_item(
+                    st.session_state.selected_canteen_id,
+                    st.session_state.selected_store_id,
+                    new_food_item
+                )
+                if not added:
+                    st.error("มีชื่ออาหารนี้ในร้านค้านี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
+                else:
+                    st.success(f"เพิ่มรายการอาหาร '{st.session_state.food_item_name}' เรียบร้อยแล้ว")
 
-                # Append the new food item to the menu
-                selected_store["menu"].append(new_food_item)
-                
-                # Update the store in the database
-                update_store(st.session_state.selected_store_id, selected_store)
+                    # Reset input values
+                    st.session_state.food_item_name = ""
+                    st.session_state.food_item_price = 0.0
+                    st.session_state.food_item_category = "MAIN"
+                    st.rerun()
+    else:
+        if st.button("บันทึกการแก้ไข"):
+            if not st.session_state.food_item_name or st.session_state.food_item_price == 0.0:
+                st.error("กรุณากรอกชื่ออาหารและราคา")
+            else:
+                updated_food_item = {
+                    "name": st.session_state.food_item_name,
+                    "price": st.session_state.food_item_price,
+                    "category": st.session_state.food_item_category,
+                }
 
-                st.success(f"เพิ่มรายการอาหาร '{st.session_state.food_item_name}' เรียบร้อยแล้ว")
+                try:
+                    updated = update_menu_item(
+                        st.session_state.selected_canteen_id,
+                        st.session_state.selected_store_id,
+                        st.session_state.editing_food_item_id,
+                        updated_food_item
+                    )
+                except DuplicateKeyError:
+                    st.error("มีชื่ออาหารนี้ในร้านค้านี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
+                else:
+                    if not updated:
+                        # Deleted since it was loaded; the form keeps its values so they can be added again
+                        st.error("รายการอาหารนี้ถูกลบไปแล้ว กดเพิ่มรายการอาหารหากต้องการเพิ่มใหม่")
+                        st.session_state.editing_food_item_id = None
+                    else:
+                        st.success(f"แก้ไขรายการอาหาร '{st.session_state.food_item_name}' เรียบร้อยแล้ว")
 
-                # Reset input values
-                st.session_state.food_item_name = ""
-                st.session_state.food_item_price = 0.0
-                st.session_state.food_item_category = "MAIN"
-                st.rerun()
+                        # Reset input values and editing state
+                        st.session_state.food_item_name = ""
+                        st.session_state.food_item_price = 0.0
+                        st.session_state.food_item_category = "MAIN"
+                        st.session_state.editing_food_item_id = None
+                        st.rerun()
 
     # --- Display Existing Menu Items ---
     st.header("รายการอาหารที่มีอยู่")
-    selected_store = next((s for s in stores if str(s["_id"]) == st.session_state.selected_store_id), None)
-    if selected_store and "menu" in selected_store:
-        for i, item in enumerate(selected_store["menu"]):
+    sort_col, page_size_col = st.columns([3, 1])
+    menu_sort = sort_col.radio(
+        "เรียงตาม",
+        ["category", "price"],
+        format_func={"category": "หมวดหมู่", "price": "ราคา"}.get,
+        horizontal=True,
+        key="menu_sort",
+    )
+    page_size = page_size_col.selectbox("ต่อหน้า", PAGE_SIZE_OPTIONS, index=1, key="menu_page_size")
+
+    # Sorted and paged on the server; one extra row tells whether there is a next page
+    after = page_start("menu", (st.session_state.selected_store_id, menu_sort, page_size))
+    menu_items = load_menu_page(st.session_state.selected_store_id, menu_sort, after, page_size + 1)
+    if menu_items:
+        for item in menu_items[:page_size]:
+            item_id_str = str(item["_id"])
             st.write(f"**ชื่อ:** {item['name']}")
             st.write(f"**ราคา:** {item['price']:.2f} บาท")
             st.write(f"**หมวดหมู่:** {item['category']}")
 
-            col1, col2 = st.columns([1, 5])
-            
-            if col1.button("ลบ", key=f"delete_item_{i}"):
-                # Remove the item from the menu
-                selected_store["menu"].pop(i)
-                
-                # Update the store in the database
-                update_store(st.session_state.selected_store_id, selected_store)
+            col1, col2, col3 = st.columns([1, 1, 4])
+
+            if col1.button("แก้ไข", key=f"edit_item_{item_id_str}"):
+                st.session_state.editing_food_item_id = item_id_str
+                st.session_state.food_item_name = item["name"]
+                st.session_state.food_item_price = float(item["price"])
+                st.session_state.food_item_category = item["category"]
+                st.rerun()
+
+            if col2.button("ลบ", key=f"delete_item_{item_id_str}"):
+                delete_menu_item(
+                    st.session_state.selected_canteen_id,
+                    st.session_state.selected_store_id,
+                    item_id_str
+                )
+                if st.session_state.editing_food_item_id == item_id_str:
+                    st.session_state.editing_food_item_id = None
                 st.rerun()
-            
+
             st.markdown("---")  # Add a separator between items
     else:
-        st.write("ยังไม่มีรายการอาหารสำหรับร้านค้านี้")
\ No newline at end of file
+        st.write("ยังไม่มีรายการอาหารสำหรับร้านค้านี้")
+    page_navigation("menu", menu_items, page_size, row_key=lambda item: (item[menu_sort], str(item["_id"])))
@@ -0,0 +1,48 @@
+import streamlit as st
+
+from importer import CHUNK_SIZE, import_upload
+from layout import check_password, sidebar
+from repository import database_init
+
+st.set_page_config(page_title="นำเข้าข้อมูล", page_icon="📥")
+
+if not check_password():
+    st.stop()  # Do not continue if check_password is not True.
+
+sidebar("import_data")
+
+mongo = database_init()
+
+if not mongo:
+    st.error("Cannot Access Data Storage")
+    st.stop()
+
+st.title("📥 นำเข้าข้อมูล")
+
+st.write(
+    "นำเข้าโรงอาหาร ร้านค้า และรายการอาหารจากไฟล์ JSON (รูปแบบเดียวกับ `canteen_data.json`), "
+    "JSON Lines หรือ CSV (หนึ่งแถวต่อหนึ่งรายการอาหาร) ข้อมูลที่มีชื่อซ้ำกับของเดิมจะถูกอัปเดตแทนการเพิ่มใหม่"
+)
+
+uploaded_file = st.file_uploader("เลือกไฟล์", type=["json", "jsonl", "ndjson", "csv"])
+chunk_size = st.number_input("จำนวนแถวต่อชุด", min_value=100, max_value=10000, value=CHUNK_SIZE, step=100)
+
+if uploaded_file and st.button("นำเข้าข้อมูล"):
+    progress = st.empty()
+
+    def show_progress(report):
+        progress.write(f"นำเข้าแล้ว {report.rows} แถว ({report.rows_per_second:.0f} แถว/วินาที)")
+
+    report = import_upload(uploaded_file, int(chunk_size), show_progress)
+    progress.empty()
+
+    st.success(f"นำเข้า {report.rows} แถว ใน {report.seconds:.2f} วินาที")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("แถว/วินาที", f"{report.rows_per_second:.0f}")
+    col2.metric("โรงอาหาร", report.canteens)
+    col3.metric("ร้านค้า", report.stores)
+    col4.metric("รายการอาหาร", report.menu_items)
+
+    if report.rejected:
+        st.warning(f"ข้ามไป {len(report.rejected)} แถวที่ข้อมูลไม่ถูกต้อง")
+        st.dataframe(report.rejected, use_container_width=True)
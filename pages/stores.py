@@ -1,47 +1,33 @@
 import streamlit as st
-import pymongo
-from pymongo.server_api import ServerApi
+from pymongo.errors import DuplicateKeyError
+import copy
 import datetime
-import hmac
 from bson.objectid import ObjectId
 
-st.set_page_config(page_title="ข้อมูลร้านค้า", page_icon="🏪")
-
-def check_password():
-    """Returns True if the user had the correct password."""
-
-    def password_entered():
-        """Checks whether a password entered by the user is correct."""
-        if hmac.compare_digest(st.session_state["password"], st.secrets["password"]):
-            st.session_state["password_correct"] = True
-            del st.session_state["password"]  # Don't store the password.
-        else:
-            st.session_state["password_correct"] = False
-
-    # Return True if the password is validated.
-    if st.session_state.get("password_correct", False):
-        return True
+from layout import check_password, sidebar
+from opening_hours import current_day_and_time
+from pagination import PAGE_SIZE_OPTIONS, current_page_start, page_navigation, page_start
+from repository import (
+    add_store,
+    cache_stats,
+    changed_fields,
+    database_init,
+    delete_store,
+    find_open_stores,
+    find_similar_stores,
+    load_canteens,
+    load_store,
+    load_stores_page,
+    update_store,
+)
+from schema import DAYS_OF_WEEK
 
-    # Show input for password.
-    st.text_input(
-        "Password", type="password", on_change=password_entered, key="password"
-    )
-    if "password_correct" in st.session_state:
-        st.error("😕 Password incorrect")
-    return False
+st.set_page_config(page_title="ข้อมูลร้านค้า", page_icon="🏪")
 
 if not check_password():
     st.stop()  # Do not continue if check_password is not True.
 
-st.sidebar.header("MUGE100 C10-297 Data Entry")
-st.sidebar.markdown("Implementation by Chanakan Moongthin")
-st.sidebar.page_link("canteen.py", label="ข้อมูลโรงอาหาร", icon="🍽️")
-st.sidebar.page_link("pages/stores.py", label="ข้อมูลร้านค้า", icon="🏪")
-st.sidebar.page_link("pages/food_items.py", label="ข้อมูลรายการอาหาร", icon="🍲")
-
-@st.cache_resource()
-def database_init():
-    return pymongo.MongoClient(st.secrets["mongo_uri"], server_api=ServerApi("1"))
+sidebar("stores")
 
 mongo = database_init()
 
@@ -49,34 +35,23 @@ if not mongo:
     st.error("Cannot Access Data Storage")
     st.stop()
 
-st.title("🏪 ข้อมูลร้านค้า")
-
-# --- Database Operations ---
-canteen_collection = mongo.canteen_info.canteens
-store_collection = mongo.canteen_info.stores
-
-# Function to load canteen data from MongoDB
-def load_canteens():
-    data = canteen_collection.find()
-    return list(data)
-
-def load_stores():
-    data = store_collection.find()
-    return list(data)
+stats = cache_stats()
+st.sidebar.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses")
 
-# Function to update canteen data in MongoDB
-def update_canteen(canteen_id, updated_canteen):
-    canteen_collection.update_one({"_id": ObjectId(canteen_id)}, {"$set": updated_canteen})
-
-def update_store(store_id, updated_store):
-    store_collection.update_one({"_id": ObjectId(store_id)}, {"$set": updated_store})
-
-def delete_store(store_id):
-    store_collection.delete_one({"_id": ObjectId(store_id)})
+st.title("🏪 ข้อมูลร้านค้า")
 
 # --- Load and Extract Data ---
+# The canteen list and the listing below go out together (see run_reads.py);
+# their later calls wait for these results instead of querying again
+load_canteens.prefetch()
+if st.session_state.get("selected_canteen_id") and not st.session_state.get("open_filter_enabled"):
+    load_stores_page.prefetch(
+        st.session_state.selected_canteen_id,
+        current_page_start("stores"),
+        st.session_state.get("store_page_size", PAGE_SIZE_OPTIONS[1]) + 1,
+        st.session_state.get("store_name_filter", ""),
+    )
 canteens = load_canteens()
-stores = load_stores()
 existing_canteen_names = [entry["name"] for entry in canteens]
 
 # --- Input Form ---
@@ -85,6 +60,8 @@ st.header("เพิ่ม/แก้ไข ข้อมูลร้านค้
 # --- Session State Initialization ---
 if "editing_store_id" not in st.session_state:
     st.session_state.editing_store_id = None
+if "editing_store" not in st.session_state:
+    st.session_state.editing_store = None  # The store as loaded, with its version
 if "selected_canteen_id" not in st.session_state:
     st.session_state.selected_canteen_id = None
 if "store_name" not in st.session_state:
@@ -100,9 +77,9 @@ def init_session_state(store=None):
     st.session_state.store_name = store["name"] if store else ""
     st.session_state.store_description = store["description"] if store else ""
 
-    if store and store.get("openingHours"):
+    if store and store["openingHours"]:
         # Determine opening_hours_mode based on data
-        opening_hours = store.get("openingHours")
+        opening_hours = store["openingHours"]
         days_count = len(opening_hours)
 
         if days_count == 5:
@@ -125,57 +102,33 @@ def init_session_state(store=None):
         st.session_state.opening_hours_mode = "everyday"  # Default mode
         st.session_state.opening_hours = []
 
-# Initialize session state if not already initialized
-if st.session_state.editing_store_id:
-    # Find the store being edited
-    for store in stores:
-        if str(store["_id"]) == st.session_state.editing_store_id:
-            st.session_state.selected_canteen_id = str(store["canteenId"])
-            init_session_state(store)
-            break
-else:
-    init_session_state()
-# Select Canteen
-canteen_options = {str(c["_id"]): c["name"] for c in canteens}
-st.session_state.selected_canteen_id = st.selectbox(
-    "เลือกโรงอาหาร",
-    options=canteen_options.keys(),
-    index=list(canteen_options.keys()).index(st.session_state.selected_canteen_id) if st.session_state.selected_canteen_id in canteen_options else 0,
-    format_func=lambda x: canteen_options[x],
-)
 
-if not st.session_state.selected_canteen_id:
-    st.info("กรุณาเลือกโรงอาหารก่อน")
-else:
-    # Store Name
-    st.session_state.store_name = st.text_input(
-        "ชื่อร้านค้า", value=st.session_state.store_name
-    )
+SAME_TIMES_ERROR = "เวลาเริ่มต้นและเวลาสิ้นสุดต้องไม่ตรงกัน"
 
-    # Store Description
-    st.session_state.store_description = st.text_area(
-        "คำอธิบายร้านค้า", value=st.session_state.store_description
-    )
 
+def valid_opening_hours(opening_hours):
+    # The same rule as schema.validate_store: closing after midnight is fine, a zero-length day is not
+    return all(entry["end"] != entry["start"] for entry in opening_hours)
+
+
+# Opening hours editor, as a fragment: changing the mode or a time reruns
+# only this editor, not the canteen lookup or the store listing. The hours
+# live in session state, where the add and save buttons read them.
+@st.fragment
+def opening_hours_editor():
     # Opening Hours Mode
     st.session_state.opening_hours_mode = st.radio(
         "เลือกรูปแบบเวลาเปิดปิด",
         ["everyday", "per_day"],
         index=0 if st.session_state.opening_hours_mode == "everyday" else 1,
         format_func=lambda x: "ทุกวัน" if x == "everyday" else "เฉพาะแต่ละวัน",
+        # A stable key: without one the widget is replaced whenever index changes
+        key=f"opening_hours_mode_{st.session_state.editing_store_id}",
     )
 
     # Opening Hours
     st.write("**เวลาเปิดปิด**")
 
-    days_of_week = [
-        "MONDAY",
-        "TUESDAY",
-        "WEDNESDAY",
-        "THURSDAY",
-        "FRIDAY",
-    ]
-
     if st.session_state.opening_hours_mode == "everyday":
         # If mode is "everyday", create entries for all days
         opening_hours_col1, opening_hours_col2 = st.columns(2)
@@ -185,12 +138,8 @@ else:
         default_start = datetime.time(8, 0)
         default_end = datetime.time(17, 0)
         if st.session_state.opening_hours and len(st.session_state.opening_hours) > 0:
-            default_start = datetime.datetime.strptime(
-                st.session_state.opening_hours[0]["start"], "%H:%M"
-            ).time()
-            default_end = datetime.datetime.strptime(
-                st.session_state.opening_hours[0]["end"], "%H:%M"
-            ).time()
+            default_start = datetime.time.fromisoformat(st.session_state.opening_hours[0]["start"])
+            default_end = datetime.time.fromisoformat(st.session_state.opening_hours[0]["end"])
 
         new_start_time = opening_hours_col1.time_input(
             "เวลาเริ่มต้น (ทุกวัน)", value=default_start, key="new_start_everyday"
@@ -205,11 +154,11 @@ else:
                 "start": new_start_time.strftime("%H:%M"),
                 "end": new_end_time.strftime("%H:%M"),
             }
-            for day in days_of_week
+            for day in DAYS_OF_WEEK
         ]
 
     else:  # per_day mode (This part was already working correctly)
-        for day in days_of_week:
+        for day in DAYS_OF_WEEK:
             # Find existing entry for the day
             existing_entry = next(
                 (
@@ -225,12 +174,12 @@ else:
 
             # Use existing values or defaults
             default_start = (
-                datetime.datetime.strptime(existing_entry["start"], "%H:%M").time()
+                datetime.time.fromisoformat(existing_entry["start"])
                 if existing_entry
                 else datetime.time(8, 0)
             )
             default_end = (
-                datetime.datetime.strptime(existing_entry["end"], "%H:%M").time()
+                datetime.time.fromisoformat(existing_entry["end"])
                 if existing_entry
                 else datetime.time(17, 0)
             )
@@ -260,11 +209,60 @@ else:
             else:
                 # Add new entry
                 st.session_state.opening_hours.append(new_opening_hour)
-    # Display opening hours
+    # Display opening hours; an end before the start closes after midnight (see opening_minutes)
     for opening_hour in st.session_state.opening_hours:
+        overnight = " (วันถัดไป)" if opening_hour["end"] < opening_hour["start"] else ""
         st.write(
-            f"- {opening_hour['dayOfWeek']}: {opening_hour['start']} ถึง {opening_hour['end']}"
+            f"- {opening_hour['dayOfWeek']}: {opening_hour['start']} ถึง {opening_hour['end']}{overnight}"
         )
+    if not valid_opening_hours(st.session_state.opening_hours):
+        st.error(SAME_TIMES_ERROR)
+
+
+
+# Load the store being edited once, when editing starts, so the form keeps
+# the version it was filled from
+if st.session_state.editing_store_id and st.session_state.editing_store is None:
+    store = load_store(st.session_state.editing_store_id, fresh=True)
+    if store:
+        st.session_state.editing_store = copy.deepcopy(store)
+        st.session_state.selected_canteen_id = str(store["canteenId"])
+        init_session_state(store)
+    else:
+        st.session_state.editing_store_id = None
+        init_session_state()
+# In add mode the form keeps what was entered across runs: resetting the
+# mode here would flip the radio back to "everyday" on the run after a
+# fragment rerun changed it, and overwrite the per-day hours on submit.
+# Select Canteen
+canteen_options = {str(c["_id"]): c["name"] for c in canteens}
+st.session_state.selected_canteen_id = st.selectbox(
+    "เลือกโรงอาหาร",
+    options=canteen_options.keys(),
+    index=list(canteen_options.keys()).index(st.session_state.selected_canteen_id) if st.session_state.selected_canteen_id in canteen_options else 0,
+    format_func=lambda x: canteen_options[x],
+)
+
+if not st.session_state.selected_canteen_id:
+    st.info("กรุณาเลือกโรงอาหารก่อน")
+else:
+    # Store Name
+    st.session_state.store_name = st.text_input(
+        "ชื่อร้านค้า", value=st.session_state.store_name
+    )
+    # Names that differ only in spacing, tone marks, punctuation or case; saving is still allowed
+    similar_stores = find_similar_stores(
+        st.session_state.selected_canteen_id, st.session_state.store_name, st.session_state.editing_store_id
+    )
+    if similar_stores:
+        st.warning("โรงอาหารนี้มีร้านค้าที่ชื่อคล้ายกันอยู่แล้ว: " + ", ".join(similar_stores))
+
+    # Store Description
+    st.session_state.store_description = st.text_area(
+        "คำอธิบายร้านค้า", value=st.session_state.store_description
+    )
+
+    opening_hours_editor()
 
     # --- Add or Edit Store Button ---
     if st.session_state.editing_store_id is None:
@@ -276,79 +274,143 @@ else:
                 st.error("กรุณากรอกคำอธิบายร้านค้า")
             elif not st.session_state.opening_hours:
                 st.error("กรุณาเพิ่มเวลาเปิดปิด")
+            elif not valid_opening_hours(st.session_state.opening_hours):
+                st.error(SAME_TIMES_ERROR)
             else:
                 new_store = {
                     "name": st.session_state.store_name,
                     "description": st.session_state.store_description,
                     "canteenId": ObjectId(st.session_state.selected_canteen_id),
                     "openingHours": st.session_state.opening_hours,
-                    "menu": [],
                 }
-                result = store_collection.insert_one(new_store)
-                new_store_id = result.inserted_id
-
-                st.success(
-                    f"เพิ่มร้านค้า {st.session_state.store_name} ใน {canteen_options[st.session_state.selected_canteen_id]} เรียบร้อยแล้ว!"
-                )
+                # The unique index on (canteenId, name) rejects duplicates, ignoring case
+                try:
+                    add_store(new_store)
+                except DuplicateKeyError:
+                    st.error("มีชื่อร้านค้านี้ในโรงอาหารนี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
+                else:
+                    st.success(
+                        f"เพิ่มร้านค้า {st.session_state.store_name} ใน {canteen_options[st.session_state.selected_canteen_id]} เรียบร้อยแล้ว!"
+                    )
 
-                # Reset input values
-                st.session_state.store_name = ""
-                st.session_state.store_description = ""
-                st.session_state.opening_hours = []
-                st.session_state.opening_hours_mode = "everyday"
-                st.rerun()
+                    # Reset input values
+                    st.session_state.store_name = ""
+                    st.session_state.store_description = ""
+                    st.session_state.opening_hours = []
+                    st.session_state.opening_hours_mode = "everyday"
+                    st.rerun()
     else:
         # Save Changes button for editing mode
         if st.button("บันทึกการเปลี่ยนแปลง"):
-            # Retrieve the existing menu before updating
-            existing_store = store_collection.find_one({"_id": ObjectId(st.session_state.editing_store_id)})
-            existing_menu = existing_store.get("menu", []) if existing_store else []
-
-            updated_store = {
-                "name": st.session_state.store_name,
-                "description": st.session_state.store_description,
-                "canteenId": ObjectId(st.session_state.selected_canteen_id),
-                "openingHours": st.session_state.opening_hours,
-                "menu": existing_menu,  # Keep the existing menu
-            }
-            update_store(st.session_state.editing_store_id, updated_store)
-
-            st.success(
-                f"อัปเดตร้านค้า {st.session_state.store_name} ใน {canteen_options[st.session_state.selected_canteen_id]} เรียบร้อยแล้ว!"
-            )
-
-            # Reset editing mode
-            st.session_state.editing_store_id = None
-            init_session_state()  # Reset session state to default values
-            st.rerun()
+            if not valid_opening_hours(st.session_state.opening_hours):
+                st.error(SAME_TIMES_ERROR)
+            else:
+                # Only the changed fields are written, never the menu
+                updated_store = {
+                    "name": st.session_state.store_name,
+                    "description": st.session_state.store_description,
+                    "canteenId": ObjectId(st.session_state.selected_canteen_id),
+                    "openingHours": st.session_state.opening_hours,
+                }
+                original = st.session_state.editing_store
+                try:
+                    saved = update_store(
+                        st.session_state.editing_store_id,
+                        changed_fields(original, updated_store),
+                        original["version"],
+                    )
+                except DuplicateKeyError:
+                    st.error("มีชื่อร้านค้านี้ในโรงอาหารนี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
+                else:
+                    if not saved:
+                        st.session_state.store_save_conflict = True
+                    else:
+                        st.success(
+                            f"อัปเดตร้านค้า {st.session_state.store_name} ใน {canteen_options[st.session_state.selected_canteen_id]} เรียบร้อยแล้ว!"
+                        )
+
+                        # Reset editing mode
+                        st.session_state.editing_store_id = None
+                        st.session_state.editing_store = None
+                        init_session_state()  # Reset session state to default values
+                        st.rerun()
+
+        # Someone else saved this store after it was loaded into the form
+        if st.session_state.get("store_save_conflict"):
+            st.error("ข้อมูลร้านค้านี้ถูกแก้ไขโดยผู้อื่นหลังจากที่คุณเปิดแก้ไข กรุณาโหลดข้อมูลใหม่แล้วแก้ไขอีกครั้ง")
+            if st.button("โหลดข้อมูลใหม่", key="reload_store"):
+                st.session_state.store_save_conflict = False
+                st.session_state.editing_store = None
+                st.rerun()
 
     st.header(f"ข้อมูลร้านค้าใน {canteen_options[st.session_state.selected_canteen_id]}")
 
-    stores = load_stores()
+    filter_col, page_size_col = st.columns([3, 1])
+    store_name_filter = filter_col.text_input("ค้นหาชื่อร้านค้า", key="store_name_filter")
+    page_size = page_size_col.selectbox("ต่อหน้า", PAGE_SIZE_OPTIONS, index=1, key="store_page_size")
+
+    # Open-at filter, answered by the server from the openingMinutes index
+    open_filter = None
+    with st.expander("ค้นหาร้านที่เปิดอยู่"):
+        if st.checkbox("แสดงเฉพาะร้านที่เปิด", key="open_filter_enabled"):
+            now = current_day_and_time()
+            day_col, start_col, end_col = st.columns(3)
+            open_day = day_col.selectbox(
+                "วัน", DAYS_OF_WEEK, index=DAYS_OF_WEEK.index(now[0]) if now else 0, key="open_filter_day"
+            )
+            open_start = start_col.time_input(
+                "เวลา", value=now[1].replace(second=0, microsecond=0) if now else datetime.time(12, 0), key="open_filter_start"
+            )
+            open_until = end_col.time_input("เปิดถึง (ไม่บังคับ)", value=None, key="open_filter_end")
+            exclude_busy = st.checkbox("ไม่รวมโรงอาหารที่อยู่ในช่วงเวลาที่มีลูกค้าเยอะ", key="open_filter_exclude_busy")
+            open_filter = (open_day, open_start, open_until, exclude_busy)
+
+    # One extra row tells whether there is a next page
+    after_id = page_start(
+        "stores", (st.session_state.selected_canteen_id, store_name_filter, page_size, open_filter)
+    )
+    if open_filter:
+        open_day, open_start, open_until, exclude_busy = open_filter
+        stores = find_open_stores(
+            open_day,
+            open_start,
+            open_until,
+            canteen_id=st.session_state.selected_canteen_id,
+            exclude_busy=exclude_busy,
+            after_id=after_id,
+            limit=page_size + 1,
+            name_filter=store_name_filter,
+        )
+    else:
+        stores = load_stores_page(
+            st.session_state.selected_canteen_id, after_id, page_size + 1, store_name_filter
+        )
 
-    for store in stores:
-        if str(store["canteenId"]) == st.session_state.selected_canteen_id:
-            col1, col2, col3 = st.columns([3, 1, 1])
+    for store in stores[:page_size]:
+        col1, col2, col3 = st.columns([3, 1, 1])
 
-            with col1:
-                st.write(f"**ชื่อร้าน:** {store['name']}")
-                if "description" in store:
-                    st.write(f"**คำอธิบาย:** {store['description']}")
-                st.write("**เวลาเปิดปิด:**")
-                for opening_hour in store.get("openingHours", []):
-                    st.write(
-                        f"- {opening_hour['dayOfWeek']}: {opening_hour['start']} ถึง {opening_hour['end']}"
-                    )
-                st.write(f"**จำนวนรายการอาหาร:** {len(store.get('menu', []))}")
+        with col1:
+            st.write(f"**ชื่อร้าน:** {store['name']}")
+            st.write(f"**คำอธิบาย:** {store['description']}")
+            st.write("**เวลาเปิดปิด:**")
+            for opening_hour in store["openingHours"]:
+                st.write(
+                    f"- {opening_hour['dayOfWeek']}: {opening_hour['start']} ถึง {opening_hour['end']}"
+                )
+            st.write(f"**จำนวนรายการอาหาร:** {store['menuCount']}")
+
+        with col2:
+            edit_button_key = f"edit_store_{store.get('_id', 'no_id')}"
+            if st.button("แก้ไข", key=edit_button_key):
+                st.session_state.editing_store_id = str(store["_id"])
+                st.session_state.editing_store = None
+                st.session_state.store_save_conflict = False
+                st.rerun()
 
-            with col2:
-                edit_button_key = f"edit_store_{store.get('_id', 'no_id')}"
-                if st.button("แก้ไข", key=edit_button_key):
-                    st.session_state.editing_store_id = str(store["_id"])
-                    st.rerun()
+        with col3:
+            delete_button_key = f"delete_store_{store.get('_id', 'no_id')}"
+            if st.button("ลบ", key=delete_button_key):
+                delete_store(str(store["_id"]))
+                st.rerun()
 
-            with col3:
-                delete_button_key = f"delete_store_{store.get('_id', 'no_id')}"
-                if st.button("ลบ", key=delete_button_key):
-                    delete_store(str(store["_id"]))
-                    st.rerun()
\ No newline at end of file
+    page_navigation("stores", stores, page_size)
@@ -0,0 +1,45 @@
+import streamlit as st
+
+PAGE_SIZE_OPTIONS = [10, 20, 50, 100]
+
+
+def page_start(state_key, query):
+    """Returns the row key the current page starts after (None for the first page).
+
+    The start keys of the pages visited so far are kept in session state so
+    "ก่อนหน้า" can walk back; changing `query` (filter, page size) restarts
+    from the first page.
+    """
+    starts_key = f"{state_key}_page_starts"
+    query_key = f"{state_key}_page_query"
+    if st.session_state.get(query_key) != query or starts_key not in st.session_state:
+        st.session_state[query_key] = query
+        st.session_state[starts_key] = [None]
+    return st.session_state[starts_key][-1]
+
+
+def current_page_start(state_key):
+    """What `page_start` returned last run, for reads started before the filter widgets render."""
+    starts = st.session_state.get(f"{state_key}_page_starts")
+    return starts[-1] if starts else None
+
+
+def page_navigation(state_key, rows, page_size, row_key=None):
+    """Renders previous/next buttons below a page fetched with `page_size + 1` rows.
+
+    The extra row only tells whether a next page exists; callers show
+    `rows[:page_size]`. The next page starts after `row_key(last row)`,
+    by default the row's `_id` as a string.
+    """
+    row_key = row_key or (lambda row: str(row["_id"]))
+    starts = st.session_state[f"{state_key}_page_starts"]
+    has_next = len(rows) > page_size
+
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    page_col.write(f"หน้า {len(starts)}")
+    if prev_col.button("ก่อนหน้า", key=f"{state_key}_prev", disabled=len(starts) == 1):
+        starts.pop()
+        st.rerun()
+    if next_col.button("ถัดไป", key=f"{state_key}_next", disabled=not has_next):
+        starts.append(row_key(rows[page_size - 1]))
+        st.rerun()
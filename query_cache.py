@@ -0,0 +1,94 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """In-process cache of query results, shared by every session and page.
+
+    Entries are keyed by query, expire after `ttl_seconds` and the least
+    recently used entry is dropped once `max_entries` is reached. Keys are
+    tuples; writers call `invalidate()` with the keys their write affected.
+    """
+
+    def __init__(self, ttl_seconds=60, max_entries=512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Bumped on every invalidation so a load that started before a write
+        # never stores its (now stale) result after the write finished. Only
+        # kept for prefixes of loads in flight, so it stays as small as those.
+        self._generations = {}
+        self._loading = {}  # key -> loads of it in flight
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+            generation = self._generation(key)
+            self._loading[key] = self._loading.get(key, 0) + 1
+
+        try:
+            value = loader()
+        except BaseException:
+            with self._lock:
+                self._finish(key)
+            raise
+
+        with self._lock:
+            if self._generation(key) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            self._finish(key)
+        # Callers may mutate what they get back, so never hand out the cached object
+        return copy.deepcopy(value)
+
+    def _generation(self, key):
+        # A key is invalidated by invalidating it or any prefix of it
+        return (self._epoch,) + tuple(self._generations.get(key[:i], 0) for i in range(1, len(key) + 1))
+
+    def _finish(self, key):
+        self._loading[key] -= 1
+        if not self._loading[key]:
+            del self._loading[key]
+        for i in range(1, len(key) + 1):
+            prefix = key[:i]
+            if prefix in self._generations and not any(k[:i] == prefix for k in self._loading):
+                del self._generations[prefix]
+
+    def invalidate(self, *keys):
+        """Drop each key and every cached key that starts with it.
+
+        Keys are tuples, so invalidating ("stores", canteen_id) also drops
+        ("stores", canteen_id, "page", ...).
+        """
+        with self._lock:
+            for key in keys:
+                for cached_key in [k for k in self._entries if k[:len(key)] == key]:
+                    del self._entries[cached_key]
+                if any(k[:len(key)] == key for k in self._loading):
+                    self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Module-level so every page and session in the Streamlit process shares it
+shared_cache = QueryCache()
@@ -0,0 +1,286 @@
+"""A local SQLite copy of the canteens and stores collections, for listings.
+
+Pages list canteens and stores, and fill their canteen and store selectboxes,
+from this file instead of the remote cluster. A background thread copies
+every document whose `updatedAt` is past the high-water mark of the last
+sync (with some overlap for clock skew). Less often it compares ids with
+the server, to drop deleted documents and copy any it missed, neither of
+which `updatedAt` can show.
+This process's own writes are copied straight after they are made
+(write-through), and changes the change feed sees from other processes
+start a sync at once.
+
+Reads fall back to MongoDB until the first sync of the process has
+finished, and whenever the last successful sync is older than
+`max_staleness_seconds`. Editors keep reading MongoDB, for the version
+they save against.
+"""
+
+import datetime
+import hashlib
+import sqlite3
+import threading
+import time
+
+from bson import json_util
+from pymongo.errors import PyMongoError
+
+COLLECTIONS = ["canteens", "stores"]
+# Re-read this much before the high-water mark, for clock skew between app servers
+SYNC_OVERLAP = datetime.timedelta(seconds=2)
+BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS canteens (id TEXT PRIMARY KEY, name TEXT NOT NULL, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS stores (
+    id TEXT PRIMARY KEY, canteen_id TEXT NOT NULL, name TEXT NOT NULL, menu_count INTEGER NOT NULL, doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stores_by_canteen ON stores (canteen_id, id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def _row(collection, doc):
+    if collection == "canteens":
+        return (str(doc["_id"]), doc["name"], json_util.dumps(doc))
+    return (str(doc["_id"]), str(doc["canteenId"]), doc["name"], doc.get("menuCount", 0), json_util.dumps(doc))
+
+
+def _like(text):
+    # Substring match like the server's escaped, case-insensitive $regex
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ReadReplica:
+    def __init__(self):
+        self.path = None
+        self.max_staleness_seconds = 60.0
+        self.last_synced = None  # monotonic time of the last successful sync, None before the first
+        self._connection = None
+        self._lock = threading.Lock()  # the SQLite connection
+        self._sync_lock = threading.Lock()  # one sync at a time
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._connection is not None
+
+    def open(self, path: str, source: str, max_staleness_seconds: float = 60.0) -> None:
+        """Opens (or creates) the file; a file filled from a different `source` is emptied first."""
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        fingerprint = hashlib.sha256(source.encode()).hexdigest()
+        stored = connection.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        with connection:
+            if stored is None or stored[0] != fingerprint:
+                for table in ("canteens", "stores", "meta"):
+                    connection.execute(f"DELETE FROM {table}")
+                connection.execute("INSERT INTO meta VALUES ('source', ?)", (fingerprint,))
+        self.path = path
+        self.max_staleness_seconds = max_staleness_seconds
+        self._connection = connection
+
+    def age_seconds(self) -> float | None:
+        """Seconds since the last successful sync; None when there is no replica or it has not synced yet."""
+        if not self.enabled or self.last_synced is None:
+            return None
+        return time.monotonic() - self.last_synced
+
+    def is_fresh(self) -> bool:
+        age = self.age_seconds()
+        return age is not None and age <= self.max_staleness_seconds
+
+    # --- Sync ---
+
+    def start(self, db, sync_seconds=5.0, reconcile_seconds=300.0):
+        """Starts the background sync, once per process."""
+        with self._lock:
+            if self._thread is not None or not self.enabled:
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(db, sync_seconds, reconcile_seconds), name="read-replica", daemon=True
+            )
+        self._thread.start()
+
+    def request_sync(self, change=None):
+        """Wakes the sync thread now (registered as a change feed listener).
+
+        A sync only sees documents that still exist, so a deleted one is
+        removed here; deletes without an id are left to the next reconcile.
+        """
+        if change is not None and change.operation == "delete" and change.collection in COLLECTIONS:
+            if change.collection == "canteens" and change.document_id is not None:
+                self.remove_canteen(change.document_id)
+            elif change.document_id is not None:
+                self.remove(change.collection, [change.document_id])
+        self._wake.set()
+
+    def _run(self, db, sync_seconds, reconcile_seconds):
+        next_reconcile = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_reconcile:
+                    self.reconcile(db)
+                    next_reconcile = time.monotonic() + reconcile_seconds
+                self.sync(db)
+            except (PyMongoError, sqlite3.Error):
+                pass  # try again next round from the same high-water mark
+            self._wake.wait(sync_seconds)
+            self._wake.clear()
+
+    def sync(self, db) -> int:
+        """Copies the documents changed since the last sync; returns how many."""
+        copied = 0
+        with self._sync_lock:
+            for collection in COLLECTIONS:
+                high_water = self._high_water(collection)
+                query = {} if high_water is None else {"updatedAt": {"$gt": high_water - SYNC_OVERLAP}}
+                batch = []
+                for doc in db[collection].find(query).sort("updatedAt", 1):
+                    batch.append(doc)
+                    if doc.get("updatedAt") is not None:
+                        high_water = max(high_water or datetime.datetime.min, _naive_utc(doc["updatedAt"]))
+                    if len(batch) == BATCH_SIZE:
+                        self.put(collection, batch)
+                        copied += len(batch)
+                        batch = []
+                self.put(collection, batch)
+                copied += len(batch)
+                if high_water is not None:
+                    self._set_high_water(collection, high_water)
+            self.last_synced = time.monotonic()
+        return copied
+
+    def reconcile(self, db) -> int:
+        """Drops documents deleted on the server and copies ones the replica never saw; returns how many.
+
+        The second kind are documents written without `updatedAt`, or
+        before the high-water mark of a database that was since replaced.
+        """
+        changed = 0
+        for collection in COLLECTIONS:
+            existing = {doc["_id"] for doc in db[collection].find({}, {"_id": True})}
+            with self._lock:
+                local = {row[0] for row in self._connection.execute(f"SELECT id FROM {collection}")}
+            changed += self.remove(collection, local - {str(i) for i in existing})
+            missing = [i for i in existing if str(i) not in local]
+            for start in range(0, len(missing), BATCH_SIZE):
+                batch = list(db[collection].find({"_id": {"$in": missing[start:start + BATCH_SIZE]}}))
+                self.put(collection, batch)
+                changed += len(batch)
+        return changed
+
+    def _high_water(self, collection):
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (f"high_water:{collection}",)).fetchone()
+        return datetime.datetime.fromisoformat(row[0]) if row else None
+
+    def _set_high_water(self, collection, value):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", (f"high_water:{collection}", value.isoformat())
+            )
+
+    # --- Write-through ---
+
+    def put(self, collection: str, docs: list[dict]) -> None:
+        if not self.enabled or not docs:
+            return
+        placeholders = ", ".join("?" * (3 if collection == "canteens" else 5))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO {collection} VALUES ({placeholders})", [_row(collection, doc) for doc in docs]
+            )
+
+    def remove(self, collection: str, ids) -> int:
+        ids = [str(i) for i in ids]
+        if not self.enabled or not ids:
+            return 0
+        with self._lock, self._connection:
+            self._connection.executemany(f"DELETE FROM {collection} WHERE id = ?", [(i,) for i in ids])
+        return len(ids)
+
+    def remove_canteen(self, canteen_id) -> None:
+        """Removes a canteen and its stores, as delete_canteen() does on the server."""
+        if not self.enabled:
+            return
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM stores WHERE canteen_id = ?", (str(canteen_id),))
+            self._connection.execute("DELETE FROM canteens WHERE id = ?", (str(canteen_id),))
+
+    # --- Reads, shaped like the repository's MongoDB queries ---
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def canteens(self) -> list[dict]:
+        return [json_util.loads(doc) for (doc,) in self._query("SELECT doc FROM canteens ORDER BY id")]
+
+    def canteens_page(self, after_id: str | None, limit: int, name_filter: str) -> list[dict]:
+        where, params = ["1"], []
+        if after_id:
+            where.append("c.id > ?")
+            params.append(str(after_id))
+        if name_filter:
+            where.append("c.name LIKE ? ESCAPE '\\'")
+            params.append(_like(name_filter))
+        rows = self._query(
+            "SELECT c.doc, COUNT(s.id), COALESCE(SUM(s.menu_count), 0)"
+            " FROM canteens c LEFT JOIN stores s ON s.canteen_id = c.id"
+            f" WHERE {' AND '.join(where)} GROUP BY c.id ORDER BY c.id LIMIT ?",
+            (*params, limit),
+        )
+        page = []
+        for doc, store_count, menu_item_count in rows:
+            canteen = json_util.loads(doc)
+            page.append({
+                "_id": canteen["_id"],
+                "name": canteen["name"],
+                "busyPeriods": canteen.get("busyPeriods", []),
+                "withAirConditioning": canteen.get("withAirConditioning", False),
+                "version": canteen.get("version"),
+                "storeCount": store_count,
+                "menuItemCount": menu_item_count,
+            })
+        return page
+
+    def stores(self, canteen_id: str) -> list[dict]:
+        rows = self._query("SELECT doc FROM stores WHERE canteen_id = ? ORDER BY id", (str(canteen_id),))
+        return [json_util.loads(doc) for (doc,) in rows]
+
+    def stores_page(self, canteen_id: str, after_id: str | None, limit: int, name_filter: str) -> list[dict]:
+        where, params = ["canteen_id = ?"], [str(canteen_id)]
+        if after_id:
+            where.append("id > ?")
+            params.append(str(after_id))
+        if name_filter:
+            where.append("name LIKE ? ESCAPE '\\'")
+            params.append(_like(name_filter))
+        rows = self._query(
+            f"SELECT doc, menu_count FROM stores WHERE {' AND '.join(where)} ORDER BY id LIMIT ?", (*params, limit)
+        )
+        page = []
+        for doc, menu_count in rows:
+            store = json_util.loads(doc)
+            page.append({
+                "_id": store["_id"],
+                "name": store["name"],
+                "description": store.get("description", ""),
+                "canteenId": store["canteenId"],
+                "openingHours": store.get("openingHours", []),
+                "menuCount": menu_count,
+            })
+        return page
+
+
+# Module-level so every page and session in the Streamlit process shares it
+shared_replica = ReadReplica()
@@ -0,0 +1,1200 @@
+"""Shared data access for every page: one tuned MongoDB client and the CRUD helpers.
+
+The backend is chosen with `mongo_backend` in `st.secrets`:
+
+- "mongodb" (default): a real server at `mongo_uri`, Atlas or a local `mongod`
+- "memory": an in-process mongomock database, for local runs and tests
+
+Client tuning can be overridden in `st.secrets` with `mongo_max_pool_size`,
+`mongo_min_pool_size`, `mongo_server_selection_timeout_ms`,
+`mongo_max_idle_time_ms` and `mongo_read_preference`; how often other
+processes' writes are polled for (without change streams) with
+`change_poll_seconds`. Command statistics (see instrumentation.py) take
+`slow_command_ms`, `command_log_path` (empty turns the log off) and
+`command_stats_runs`. The startup health check and circuit breaker (see
+circuit_breaker.py) take `mongo_ping_timeout_ms`,
+`circuit_failure_threshold` and `circuit_reset_seconds`. The local read
+replica for listings (see read_replica.py) takes `replica_path` (empty turns
+it off), `replica_max_staleness_seconds` and `replica_sync_seconds`.
+"""
+
+import datetime
+import os
+import re
+
+import pymongo
+import streamlit as st
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from pymongo.collation import Collation, CollationStrength
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, ExecutionTimeout, OperationFailure
+from pymongo.server_api import ServerApi
+
+from analytics import SUMMARY_COLLECTION, merge_stage, summary_keys_pipeline, summary_pipeline
+from change_feed import shared_feed
+from circuit_breaker import CircuitOpenError, shared_breaker
+from instrumentation import shared_monitor
+from name_keys import name_key
+from menu_search import CANDIDATE_LIMIT, ngrams, normalize, rank, search_entry
+from opening_hours import busy_minutes, busy_query, open_query, opening_minutes
+from query_cache import shared_cache
+from read_replica import shared_replica
+from run_reads import shared_reads
+from schema import SCHEMA_VERSIONS
+
+DATABASE_NAME = "canteen_info"
+
+# Case-insensitive comparison used for every name uniqueness check
+NAME_COLLATION = Collation(locale="th", strength=CollationStrength.SECONDARY)
+
+# Listings are paged by _id so each page costs the same however large the collection
+PAGE_SIZE = 20
+
+CLIENT_DEFAULTS = {
+    "maxPoolSize": 20,
+    "minPoolSize": 1,
+    "serverSelectionTimeoutMS": 5000,
+    "maxIdleTimeMS": 60000,
+    "readPreference": "primaryPreferred",
+    "retryWrites": True,
+}
+
+
+def _mongodb_client(uri: str, **options) -> pymongo.MongoClient:
+    return pymongo.MongoClient(uri, server_api=ServerApi("1"), **{**CLIENT_DEFAULTS, **options})
+
+
+def _memory_client(uri: str, **options):
+    try:
+        import mongomock
+    except ImportError as e:
+        raise RuntimeError("The 'memory' backend needs mongomock: pip install mongomock") from e
+    return mongomock.MongoClient()
+
+
+# Backend name -> (client factory, whether it understands collations)
+BACKENDS = {
+    "mongodb": (_mongodb_client, True),
+    "memory": (_memory_client, False),
+}
+
+class DatabaseNotReady(RuntimeError):
+    """The data needs a maintenance step before the app can use it; the message says which."""
+
+
+_backend_name = "mongodb"
+_client_override = None
+_database_name = DATABASE_NAME
+
+
+def register_backend(name: str, factory, supports_collation: bool = True) -> None:
+    BACKENDS[name] = (factory, supports_collation)
+
+
+def create_client(uri: str = "", backend: str = "mongodb", **options):
+    """Build a client without touching Streamlit, for scripts and tests."""
+    global _backend_name
+    factory, _ = BACKENDS[backend]
+    _backend_name = backend
+    return factory(uri, **options)
+
+
+def secret(name: str, default=None):
+    """`st.secrets[name]`, or `default` when it (or the whole secrets file) is missing."""
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        return default
+
+
+def _client_options_from_secrets() -> dict:
+    secret_names = {
+        "maxPoolSize": "mongo_max_pool_size",
+        "minPoolSize": "mongo_min_pool_size",
+        "serverSelectionTimeoutMS": "mongo_server_selection_timeout_ms",
+        "maxIdleTimeMS": "mongo_max_idle_time_ms",
+        "readPreference": "mongo_read_preference",
+    }
+    return {option: secret(name) for option, name in secret_names.items() if secret(name) is not None}
+
+
+@st.cache_resource()
+def _shared_client():
+    # Per-run command statistics for the sidebar panel and the slow-command log
+    shared_monitor.configure(
+        slow_ms=float(secret("slow_command_ms", 100)),
+        log_path=secret("command_log_path", "db_commands.jsonl") or None,
+        window=int(secret("command_stats_runs", 200)),
+    )
+    client = create_client(
+        secret("mongo_uri", ""),
+        backend=secret("mongo_backend", "mongodb"),
+        event_listeners=[shared_monitor],
+        **_client_options_from_secrets(),
+    )
+    ping_seconds = float(secret("mongo_ping_timeout_ms", 2000)) / 1000
+    shared_breaker.configure(
+        failure_threshold=int(secret("circuit_failure_threshold", 3)),
+        reset_seconds=float(secret("circuit_reset_seconds", 15)),
+        probe=lambda: _ping(client, ping_seconds),
+    )
+    return client
+
+
+def _ping(client, seconds: float) -> None:
+    # Bounds server selection too, which is where an unreachable server blocks
+    with pymongo.timeout(seconds):
+        client.admin.command("ping")
+
+
+@st.cache_resource()
+def _prepare(_client) -> bool:
+    # Once per process, after the server first answered; a failure is not cached
+    _ping(_client, float(secret("mongo_ping_timeout_ms", 2000)) / 1000)
+    _build_indexes(_client[DATABASE_NAME])
+    # Pages read fields only migrations add to older documents
+    outdated = outdated_collections(_client[DATABASE_NAME])
+    if outdated:
+        raise DatabaseNotReady(
+            f"Collections {', '.join(outdated)} hold documents from an older schema. "
+            "Run `python migrations.py` before starting the app."
+        )
+    # Follow writes made by other app processes (see change_feed.py)
+    shared_feed.start(_client[DATABASE_NAME], poll_seconds=float(secret("change_poll_seconds", 5)))
+    # Local copy for listings (see read_replica.py); the memory backend is local already
+    replica_path = secret("replica_path", "canteen_replica.sqlite3")
+    if replica_path and _backend_name != "memory":
+        shared_replica.open(
+            replica_path,
+            # Migrations do not stamp updatedAt, so a new schema version starts a fresh copy
+            source=f"{secret('mongo_uri', '')}/{DATABASE_NAME}/{SCHEMA_VERSIONS}",
+            max_staleness_seconds=float(secret("replica_max_staleness_seconds", 60)),
+        )
+        shared_replica.start(_client[DATABASE_NAME], sync_seconds=float(secret("replica_sync_seconds", 5)))
+        shared_feed.add_listener(shared_replica.request_sync)
+    return True
+
+
+def database_init():
+    """The shared client, or None while the database is unreachable.
+
+    The first call pings the server with a short timeout before anything
+    else. A failed ping opens the circuit breaker, so pages stop at their
+    "Cannot Access Data Storage" check straight away until the breaker's
+    background probe reaches the server again.
+    """
+    if _client_override is not None:
+        # Pages driven by a script that called use_client() (benchmarks) share its client
+        return _client_override
+    if shared_breaker.is_open:
+        return None
+    client = _shared_client()
+    try:
+        _prepare(client)
+    except (ConnectionFailure, ExecutionTimeout):
+        shared_breaker.trip()
+        return None
+    except DatabaseNotReady as e:
+        # Reachable but unusable until someone runs the step the message names
+        st.error(str(e))
+        st.stop()
+    return client
+
+
+def use_client(client, backend: str = "mongodb", database_name: str = DATABASE_NAME, build_indexes: bool = True) -> None:
+    """Point the repository at an already built client instead of `database_init()`.
+
+    Benchmarks and tests pass their own `database_name` so they never touch the real data.
+    Raises `DatabaseNotReady` if the indexes cannot be built; tools that repair
+    what stops them pass `build_indexes=False`.
+    """
+    global _client_override, _backend_name, _database_name
+    _client_override = client
+    _backend_name = backend
+    _database_name = database_name
+    if build_indexes:
+        _build_indexes(client[database_name])
+    shared_cache.clear()
+
+
+def add_connection_arguments(parser) -> None:
+    """Adds --uri/--backend to a command-line tool's argument parser."""
+    parser.add_argument("--uri", default=os.environ.get("MONGO_URI"), help="default: $MONGO_URI or mongo_uri in secrets.toml")
+    parser.add_argument("--backend", default=os.environ.get("MONGO_BACKEND"), choices=sorted(BACKENDS))
+
+
+def connect(args, build_indexes: bool = True) -> None:
+    """Connects a command-line tool, falling back to the app's own secrets."""
+    uri = args.uri or secret("mongo_uri", "")
+    backend = args.backend or secret("mongo_backend", "mongodb")
+    client = create_client(uri, backend=backend, **_client_options_from_secrets())
+    try:
+        use_client(client, backend=backend, build_indexes=build_indexes)
+    except DatabaseNotReady as e:
+        raise SystemExit(str(e)) from e
+
+
+def get_database():
+    # Fails at once, without waiting for server selection, while the breaker is open
+    shared_breaker.check()
+    client = _client_override if _client_override is not None else database_init()
+    if client is None:
+        raise CircuitOpenError("database unreachable; retrying in the background")
+    return client[_database_name]
+
+
+def now() -> datetime.datetime:
+    # Every write stamps updatedAt so exports and readers can ask for changes since a time
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _publish(collection: str, document_id=None, canteen_id=None, operation: str = "update") -> None:
+    # Tells open sessions in this process what changed
+    shared_reads.invalidate()
+    sequence = shared_feed.publish(
+        collection,
+        ObjectId(document_id) if document_id else None,
+        ObjectId(canteen_id) if canteen_id else None,
+        operation,
+    )
+    if st.runtime.exists():
+        # The session that made the change does not need telling
+        st.session_state.setdefault("own_changes", set()).add(sequence)
+
+
+def _write_through(collection: str, document_id) -> None:
+    # Copies this process's own write into the local read replica
+    if not shared_replica.enabled:
+        return
+    doc = get_database()[collection].find_one({"_id": ObjectId(document_id)})
+    if doc is None:
+        shared_replica.remove(collection, [document_id])
+    else:
+        shared_replica.put(collection, [doc])
+
+
+def _replica_catch_up() -> None:
+    # After bulk writes, one incremental sync copies everything they touched
+    if shared_replica.enabled:
+        shared_replica.sync(get_database())
+
+
+@shared_breaker.guarded
+def load_changed_since(collection: str, since: datetime.datetime, limit: int = 1000) -> list[dict]:
+    """Documents of `collection` written after `since`, oldest first (the updatedAt index).
+
+    Deletes are not included; see change_feed.py for those made in this process.
+    """
+    return list(get_database()[collection].find({"updatedAt": {"$gt": since}}).sort("updatedAt", 1).limit(limit))
+
+
+def with_time_ranges(doc: dict) -> dict:
+    """Adds the integer minute ranges derived from `openingHours` / `busyPeriods`."""
+    derived = {}
+    if "openingHours" in doc:
+        derived["openingMinutes"] = opening_minutes(doc["openingHours"])
+    if "busyPeriods" in doc:
+        derived["busyMinutes"] = busy_minutes(doc["busyPeriods"])
+    return {**doc, **derived}
+
+
+def with_name_key(doc: dict) -> dict:
+    """Adds `nameKey` (see name_keys.py) when the document has a name."""
+    if "name" not in doc:
+        return doc
+    return {**doc, "nameKey": name_key(doc["name"])}
+
+
+def _collation() -> dict:
+    # Backends without collation support fall back to case-sensitive names
+    return {"collation": NAME_COLLATION} if BACKENDS[_backend_name][1] else {}
+
+
+def ensure_indexes(db) -> None:
+    # Stores are always looked up per canteen and paged by _id within it
+    db.stores.create_index([("canteenId", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    # "Open at" / "busy at" lookups on minute ranges
+    db.stores.create_index([("openingMinutes.start", pymongo.ASCENDING), ("openingMinutes.end", pymongo.ASCENDING)])
+    db.canteens.create_index([("busyMinutes.start", pymongo.ASCENDING), ("busyMinutes.end", pymongo.ASCENDING)])
+    # "Changed since" queries
+    db.canteens.create_index("updatedAt")
+    db.stores.create_index("updatedAt")
+    # Names are unique ignoring case: canteens overall, stores within a canteen
+    db.canteens.create_index("name", unique=True, **_collation())
+    db.stores.create_index(
+        [("canteenId", pymongo.ASCENDING), ("name", pymongo.ASCENDING)],
+        unique=True,
+        **_collation(),
+    )
+    # Near-duplicate name warnings look stores up by key within their canteen
+    db.stores.create_index([("canteenId", pymongo.ASCENDING), ("nameKey", pymongo.ASCENDING)])
+    # A store's menu, paged by category or by price with _id breaking ties
+    db.food_items.create_index([("storeId", pymongo.ASCENDING), ("category", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    db.food_items.create_index([("storeId", pymongo.ASCENDING), ("price", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    # Item names are unique within a store, ignoring case
+    db.food_items.create_index(
+        [("storeId", pymongo.ASCENDING), ("name", pymongo.ASCENDING)],
+        unique=True,
+        **_collation(),
+    )
+    # ... and near-duplicate item names by key within the store
+    db.food_items.create_index([("storeId", pymongo.ASCENDING), ("nameKey", pymongo.ASCENDING)])
+    # Cascades and price summaries per canteen
+    db.food_items.create_index("canteenId")
+    # The startup check and migrations look for documents below the current schemaVersion
+    for collection in SCHEMA_VERSIONS:
+        db[collection].create_index("schemaVersion")
+    # Menu search: bigram lookups, and cleanup when a store or canteen goes
+    db.menu_search.create_index("grams")
+    db.menu_search.create_index("key")
+    db.menu_search.create_index("storeId")
+    db.menu_search.create_index("canteenId")
+    # The analytics dashboard reads price_summary whole, in this order
+    db[SUMMARY_COLLECTION].create_index(
+        [("canteenId", pymongo.ASCENDING), ("category", pymongo.ASCENDING)], unique=True
+    )
+
+
+def _build_indexes(db) -> None:
+    try:
+        ensure_indexes(db)
+    except OperationFailure as e:
+        if e.code == 11000:
+            # Data from before the unique indexes may repeat a name
+            raise DatabaseNotReady(
+                "Duplicate names stop the unique name indexes from being built. "
+                "Run `python maintenance.py dedupe-names --dry-run` to list them, "
+                f"then `python maintenance.py dedupe-names` to rename them. ({e})"
+            ) from e
+        raise DatabaseNotReady(f"Could not build the database indexes: {e}") from e
+
+
+def outdated_collections(db) -> list[str]:
+    """Collections with documents below their current `schemaVersion` (see migrations.py)."""
+    return [
+        collection
+        for collection, version in SCHEMA_VERSIONS.items()
+        if db[collection].find_one({"schemaVersion": {"$not": {"$gte": version}}}, {"_id": True}) is not None
+    ]
+
+
+def cache_stats() -> dict:
+    return shared_cache.stats()
+
+
+# --- Canteens ---
+
+@shared_reads.memoized
+@shared_breaker.guarded
+def load_canteens() -> list[dict]:
+    if shared_replica.is_fresh():
+        return shared_replica.canteens()
+    db = get_database()
+    return shared_cache.get_or_load(("canteens",), lambda: list(db.canteens.find()))
+
+
+def _page_filter(after_id: str | None, name_filter: str) -> dict:
+    query = {}
+    if after_id:
+        query["_id"] = {"$gt": ObjectId(after_id)}
+    if name_filter:
+        query["name"] = {"$regex": re.escape(name_filter), "$options": "i"}
+    return query
+
+
+@shared_reads.memoized
+@shared_breaker.guarded
+def load_canteens_page(after_id: str | None = None, limit: int = PAGE_SIZE, name_filter: str = "") -> list[dict]:
+    """Canteens after `after_id` in _id order, each with `storeCount` and `menuItemCount`.
+
+    One aggregation: the page is cut first, then only its canteens are joined
+    to their stores through the canteenId index and reduced to counts on the
+    server, so no store document leaves the database. Menu items are counted
+    from each store's `menuCount`, never from food_items. The stores are
+    unwound and grouped back rather than summed inside $project, which the
+    memory backend (mongomock) evaluates to 0.
+    """
+    if shared_replica.is_fresh():
+        return shared_replica.canteens_page(after_id, limit, name_filter)
+    db = get_database()
+    pipeline = [
+        {"$match": _page_filter(after_id, name_filter)},
+        {"$sort": {"_id": pymongo.ASCENDING}},
+        {"$limit": limit},
+        {"$lookup": {"from": "stores", "localField": "_id", "foreignField": "canteenId", "as": "storeDocs"}},
+        # A canteen without stores keeps one row, with no storeDocs
+        {"$unwind": {"path": "$storeDocs", "preserveNullAndEmptyArrays": True}},
+        {"$group": {
+            "_id": "$_id",
+            "name": {"$first": "$name"},
+            "busyPeriods": {"$first": "$busyPeriods"},
+            "withAirConditioning": {"$first": "$withAirConditioning"},
+            "version": {"$first": "$version"},
+            "storeCount": {"$sum": {"$cond": [{"$ifNull": ["$storeDocs._id", False]}, 1, 0]}},
+            "menuItemCount": {"$sum": {"$ifNull": ["$storeDocs.menuCount", 0]}},
+        }},
+        {"$sort": {"_id": pymongo.ASCENDING}},
+    ]
+    return shared_cache.get_or_load(
+        ("canteens", "page", after_id, limit, name_filter),
+        lambda: list(db.canteens.aggregate(pipeline)),
+    )
+
+
+@shared_breaker.guarded
+def add_canteen(canteen: dict) -> ObjectId:
+    """Raises `DuplicateKeyError` if the name is already taken."""
+    doc = {**with_time_ranges(canteen), "version": 1, "schemaVersion": SCHEMA_VERSIONS["canteens"], "updatedAt": now()}
+    result = get_database().canteens.insert_one(doc)
+    shared_replica.put("canteens", [doc])
+    shared_cache.invalidate(("canteens",))
+    _publish("canteens", result.inserted_id, operation="insert")
+    return result.inserted_id
+
+
+@shared_breaker.guarded
+def load_canteen(canteen_id: str) -> dict | None:
+    # Uncached: editors start from the live document and its version
+    return get_database().canteens.find_one({"_id": ObjectId(canteen_id)})
+
+
+def changed_fields(original: dict, edited: dict) -> dict:
+    """The fields of `edited` whose values differ from `original`."""
+    return {field: value for field, value in edited.items() if original.get(field) != value}
+
+
+@shared_breaker.guarded
+def update_canteen(canteen_id: str, changes: dict, version: int) -> bool:
+    """Applies `changes` if the canteen is still at `version`; returns False if someone saved it since.
+
+    Raises `DuplicateKeyError` if the new name is already taken.
+    """
+    if not changes:
+        return True
+    result = get_database().canteens.update_one(
+        {"_id": ObjectId(canteen_id), "version": version},
+        {"$set": {**with_time_ranges(changes), "updatedAt": now()}, "$inc": {"version": 1}},
+    )
+    shared_cache.invalidate(("canteens",))
+    if result.matched_count == 1:
+        _write_through("canteens", canteen_id)
+        _publish("canteens", canteen_id)
+    return result.matched_count == 1
+
+
+def supports_transactions(db) -> bool:
+    # Multi-document transactions need a replica set or sharded cluster (Atlas always is)
+    topology = getattr(db.client, "topology_description", None)
+    return topology is not None and topology.topology_type_name in ("ReplicaSetWithPrimary", "Sharded", "LoadBalanced")
+
+
+@shared_breaker.guarded
+def delete_canteen(canteen_id: str) -> int:
+    """Deletes the canteen and every store in it; returns the number of stores deleted.
+
+    The stores go in one server-side delete_many, inside a transaction with
+    the canteen delete where the deployment supports it. Otherwise each
+    level is deleted before its parent (menu items, then stores, then the
+    canteen), so an interrupted delete never leaves orphans behind.
+    """
+    db = get_database()
+    canteen_object_id = ObjectId(canteen_id)
+
+    def cascade(session=None):
+        db.food_items.delete_many({"canteenId": canteen_object_id}, session=session)
+        db.menu_search.delete_many({"canteenId": canteen_object_id}, session=session)
+        deleted = db.stores.delete_many({"canteenId": canteen_object_id}, session=session)
+        db[SUMMARY_COLLECTION].delete_many({"canteenId": canteen_object_id}, session=session)
+        db.canteens.delete_one({"_id": canteen_object_id}, session=session)
+        return deleted.deleted_count
+
+    if supports_transactions(db):
+        with db.client.start_session() as session:
+            deleted_stores = session.with_transaction(cascade)
+    else:
+        deleted_stores = cascade()
+    # The deleted stores' own ids are unknown here, so drop every cached single store
+    shared_cache.invalidate(
+        ("canteens",), ("stores", canteen_id), ("store",), ("menu",), ("menu_search",), ("price_summary",)
+    )
+    shared_replica.remove_canteen(canteen_id)
+    _publish("canteens", canteen_id, operation="delete")
+    _publish("stores", canteen_id=canteen_id, operation="delete")
+    return deleted_stores
+
+
+# --- Stores ---
+
+@shared_reads.memoized
+@shared_breaker.guarded
+def load_stores(canteen_id: str) -> list[dict]:
+    if shared_replica.is_fresh():
+        return shared_replica.stores(canteen_id)
+    db = get_database()
+    return shared_cache.get_or_load(
+        ("stores", canteen_id),
+        lambda: list(db.stores.find({"canteenId": ObjectId(canteen_id)})),
+    )
+
+
+def _store_listing_pipeline(match: dict, after_id: str | None, limit: int, name_filter: str) -> list[dict]:
+    return [
+        {"$match": {**match, **_page_filter(after_id, name_filter)}},
+        {"$sort": {"_id": pymongo.ASCENDING}},
+        {"$limit": limit},
+        {"$project": {
+            "name": True,
+            "description": True,
+            "canteenId": True,
+            "openingHours": True,
+            "menuCount": {"$ifNull": ["$menuCount", 0]},
+        }},
+    ]
+
+
+@shared_reads.memoized
+@shared_breaker.guarded
+def load_stores_page(
+    canteen_id: str, after_id: str | None = None, limit: int = PAGE_SIZE, name_filter: str = ""
+) -> list[dict]:
+    """A canteen's stores after `after_id`, with their `menuCount` but no menu items."""
+    if shared_replica.is_fresh():
+        return shared_replica.stores_page(canteen_id, after_id, limit, name_filter)
+    db = get_database()
+    pipeline = _store_listing_pipeline({"canteenId": ObjectId(canteen_id)}, after_id, limit, name_filter)
+    return shared_cache.get_or_load(
+        ("stores", canteen_id, "page", after_id, limit, name_filter),
+        lambda: list(db.stores.aggregate(pipeline)),
+    )
+
+
+@shared_breaker.guarded
+def find_open_stores(
+    day: str,
+    start,
+    end=None,
+    canteen_id: str | None = None,
+    exclude_busy: bool = False,
+    after_id: str | None = None,
+    limit: int = PAGE_SIZE,
+    name_filter: str = "",
+) -> list[dict]:
+    """Stores open on `day` at `start`, or for the whole of `start`-`end`.
+
+    Answered on the server from the openingMinutes index; with `exclude_busy`
+    the canteens in a busy period at that time are looked up first (also
+    indexed) and left out. Not cached, since the answer depends on the time.
+    """
+    db = get_database()
+    match = open_query(day, start, end)
+    if canteen_id:
+        match["canteenId"] = ObjectId(canteen_id)
+    if exclude_busy:
+        busy_canteens = [c["_id"] for c in db.canteens.find(busy_query(start, end), {"_id": True})]
+        if busy_canteens:
+            match["canteenId"] = (
+                {"$in": [match["canteenId"]], "$nin": busy_canteens} if canteen_id else {"$nin": busy_canteens}
+            )
+    return list(db.stores.aggregate(_store_listing_pipeline(match, after_id, limit, name_filter)))
+
+
+@shared_breaker.guarded
+def load_store(store_id: str, fresh: bool = False) -> dict | None:
+    """The store, from the cache unless `fresh` (editors need the live version)."""
+    db = get_database()
+    if fresh:
+        shared_cache.invalidate(("store", store_id))
+    return shared_cache.get_or_load(
+        ("store", store_id),
+        lambda: db.stores.find_one({"_id": ObjectId(store_id)}),
+    )
+
+
+def invalidate_store(canteen_id: str, store_id: str) -> None:
+    """Called after every write to a store, menu included."""
+    # Canteen pages carry store and menu counts, so they go stale as well
+    shared_cache.invalidate(("stores", canteen_id), ("store", store_id), ("menu", store_id), ("canteens", "page"))
+    _write_through("stores", store_id)
+    _publish("stores", store_id, canteen_id)
+
+
+@shared_breaker.guarded
+def add_store(store: dict) -> ObjectId:
+    """Raises `DuplicateKeyError` if the canteen already has a store with this name."""
+    doc = {
+        **with_name_key(with_time_ranges(store)),
+        "menuCount": 0,
+        "version": 1,
+        "schemaVersion": SCHEMA_VERSIONS["stores"],
+        "updatedAt": now(),
+    }
+    result = get_database().stores.insert_one(doc)
+    shared_replica.put("stores", [doc])
+    shared_cache.invalidate(("stores", str(store["canteenId"])), ("canteens", "page"))
+    _publish("stores", result.inserted_id, store["canteenId"], "insert")
+    return result.inserted_id
+
+
+@shared_breaker.guarded
+def update_store(store_id: str, changes: dict, version: int) -> bool:
+    """Applies `changes` if the store is still at `version`; returns False if someone saved it since.
+
+    Only the given fields are written; menu items live in food_items and
+    have their own writes below. Menu writes leave the version alone, so
+    adding an item never conflicts with editing the store.
+    Raises `DuplicateKeyError` if the canteen already has a store with this name.
+    """
+    if not changes:
+        return True
+    # The store may move to another canteen, so the previous canteenId comes
+    # back with the update and both canteens' store lists are invalidated
+    previous = get_database().stores.find_one_and_update(
+        {"_id": ObjectId(store_id), "version": version},
+        {"$set": {**with_name_key(with_time_ranges(changes)), "updatedAt": now()}, "$inc": {"version": 1}},
+        projection={"canteenId": True},
+    )
+    if previous is None:
+        return False
+    canteen_id = changes.get("canteenId", previous["canteenId"])
+    invalidate_store(str(canteen_id), store_id)
+    if canteen_id != previous["canteenId"]:
+        shared_cache.invalidate(("stores", str(previous["canteenId"])))
+        get_database().food_items.update_many({"storeId": ObjectId(store_id)}, {"$set": {"canteenId": canteen_id}})
+        get_database().menu_search.update_many({"storeId": ObjectId(store_id)}, {"$set": {"canteenId": canteen_id}})
+        refresh_price_summary([previous["canteenId"], canteen_id])
+    return True
+
+
+@shared_breaker.guarded
+def delete_store(store_id: str) -> None:
+    # Menu items go before the store so an interrupted delete leaves no orphans
+    get_database().food_items.delete_many({"storeId": ObjectId(store_id)})
+    get_database().menu_search.delete_many({"storeId": ObjectId(store_id)})
+    deleted = get_database().stores.find_one_and_delete(
+        {"_id": ObjectId(store_id)},
+        projection={"canteenId": True},
+    )
+    shared_replica.remove("stores", [store_id])
+    shared_cache.invalidate(("store", store_id), ("menu", store_id), ("canteens", "page"), ("menu_search",))
+    if deleted:
+        shared_cache.invalidate(("stores", str(deleted["canteenId"])))
+        refresh_price_summary([deleted["canteenId"]])
+        _publish("stores", store_id, deleted["canteenId"], "delete")
+
+
+# --- Menu items ---
+# Menu items live in the food_items collection, one document per item with
+# its storeId and canteenId, so store documents stay small and listings read
+# the store's `menuCount` instead of its menu. Item names are unique within
+# a store, ignoring case, by the (storeId, name) index; add and update
+# return False when another item already uses the name.
+
+MENU_FIELDS = ("name", "price", "category")
+
+# Orders a store's menu can be paged in; each is served by a (storeId, field, _id) index
+MENU_SORTS = ("category", "price")
+
+
+def _food_item(canteen_id, store_id, fields: dict) -> dict:
+    return {
+        "_id": ObjectId(),
+        "storeId": ObjectId(store_id),
+        "canteenId": ObjectId(canteen_id),
+        **with_name_key(fields),
+        "schemaVersion": SCHEMA_VERSIONS["food_items"],
+        "updatedAt": now(),
+    }
+
+
+def _recount_menus(store_ids) -> None:
+    # Stores carry menuCount for the listings. Setting it also bumps the
+    # store's updatedAt, so the change feed and the read replica see menu
+    # edits as store changes.
+    db = get_database()
+    store_ids = [ObjectId(store_id) for store_id in store_ids]
+    if not store_ids:
+        return
+    counts = {
+        row["_id"]: row["count"]
+        for row in db.food_items.aggregate([
+            {"$match": {"storeId": {"$in": store_ids}}},
+            {"$group": {"_id": "$storeId", "count": {"$sum": 1}}},
+        ])
+    }
+    db.stores.bulk_write(
+        [UpdateOne({"_id": store_id}, {"$set": {"menuCount": counts.get(store_id, 0), "updatedAt": now()}}) for store_id in store_ids],
+        ordered=False,
+    )
+
+
+def _menu_changed(canteen_id: str, store_id: str, added: int | None = None) -> None:
+    # Single-item writes know how the count moved (`added` items, 0 for an
+    # edit) and adjust it in one update; bulk saves recount instead
+    if added is None:
+        _recount_menus([store_id])
+    else:
+        update = {"$set": {"updatedAt": now()}}
+        if added:
+            update["$inc"] = {"menuCount": added}
+        get_database().stores.update_one({"_id": ObjectId(store_id)}, update)
+    invalidate_store(canteen_id, store_id)
+
+
+@shared_breaker.guarded
+def load_menu(store_id: str) -> list[dict]:
+    # Uncached and whole: the grid editor saves its edits against this
+    return list(get_database().food_items.find({"storeId": ObjectId(store_id)}).sort("_id", 1))
+
+
+@shared_reads.memoized
+@shared_breaker.guarded
+def load_menu_page(store_id: str, sort: str = "category", after: tuple | None = None, limit: int = PAGE_SIZE) -> list[dict]:
+    """A store's menu items in `sort` order ("category" or "price"), starting after `after`.
+
+    Paged by (sort field, _id) like the listings are by _id: `after` is the
+    (value, _id) pair of the previous page's last item, so every page is one
+    range of the matching food_items index however long the menu is.
+    """
+    if sort not in MENU_SORTS:
+        raise ValueError(f"cannot sort a menu by {sort!r}")
+    db = get_database()
+    query = {"storeId": ObjectId(store_id)}
+    if after is not None:
+        value, last_id = after
+        query["$or"] = [{sort: {"$gt": value}}, {sort: value, "_id": {"$gt": ObjectId(last_id)}}]
+    return shared_cache.get_or_load(
+        ("menu", store_id, sort, after, limit),
+        lambda: list(db.food_items.find(query).sort([(sort, pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]).limit(limit)),
+    )
+
+
+@shared_breaker.guarded
+def add_menu_item(canteen_id: str, store_id: str, food_item: dict) -> bool:
+    item = _food_item(canteen_id, store_id, food_item)
+    try:
+        get_database().food_items.insert_one(item)
+    except DuplicateKeyError:
+        return False
+    _menu_changed(canteen_id, store_id, added=1)
+    _index_menu_item(item)
+    refresh_price_summary([canteen_id], [food_item["category"]])
+    return True
+
+
+@shared_breaker.guarded
+def update_menu_item(canteen_id: str, store_id: str, item_id: str, food_item: dict) -> bool:
+    """Returns False if the item no longer exists (deleted since it was loaded).
+
+    Raises `DuplicateKeyError` if another item of the store already has the name.
+    """
+    result = get_database().food_items.update_one(
+        {"_id": ObjectId(item_id), "storeId": ObjectId(store_id)},
+        {"$set": {**with_name_key(food_item), "updatedAt": now()}},
+    )
+    if result.matched_count == 1:
+        _menu_changed(canteen_id, store_id, added=0)
+        _index_menu_item({"_id": ObjectId(item_id), "storeId": ObjectId(store_id), "canteenId": ObjectId(canteen_id), **food_item})
+        # The item may have left its previous category, which the update does not tell
+        refresh_price_summary([canteen_id])
+    return result.matched_count == 1
+
+
+@shared_breaker.guarded
+def delete_menu_item(canteen_id: str, store_id: str, item_id: str) -> None:
+    previous = get_database().food_items.find_one_and_delete(
+        {"_id": ObjectId(item_id), "storeId": ObjectId(store_id)},
+        projection={"category": True},
+    )
+    if previous:
+        _menu_changed(canteen_id, store_id, added=-1)
+        get_database().menu_search.delete_one({"_id": ObjectId(item_id)})
+        shared_cache.invalidate(("menu_search",))
+        refresh_price_summary([canteen_id], [previous["category"]])
+    else:
+        # Already deleted elsewhere; the menu the page showed was stale
+        shared_cache.invalidate(("menu", store_id))
+
+
+def diff_menu(original: list[dict], edited: list[dict]) -> tuple[list[dict], list[dict], list[ObjectId]]:
+    """(added, updated, deleted ids) that turn `original` into `edited`.
+
+    Edited rows keep the `_id` of the item they came from; new rows have none.
+    """
+    original_by_id = {item["_id"]: item for item in original}
+    added, updated, kept = [], [], set()
+    for row in edited:
+        item = {field: row[field] for field in MENU_FIELDS}
+        if not row.get("_id"):
+            added.append(item)
+            continue
+        item_id = ObjectId(row["_id"])
+        kept.add(item_id)
+        before = original_by_id.get(item_id)
+        if before is not None and any(before.get(field) != item[field] for field in MENU_FIELDS):
+            updated.append({"_id": item_id, **item})
+    deleted = [item_id for item_id in original_by_id if item_id not in kept]
+    return added, updated, deleted
+
+
+def _duplicate_names(items: list[dict], write) -> list[dict]:
+    # Runs an unordered bulk `write` of `items`; returns the items the unique index turned away
+    try:
+        write()
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error["code"] != 11000 for error in errors):
+            raise
+        return [items[error["index"]] for error in errors]
+    return []
+
+
+@shared_breaker.guarded
+def save_menu_changes(canteen_id: str, store_id: str, original: list[dict], edited: list[dict]) -> list[str]:
+    """Writes only what differs between `original` and `edited`, in one write per kind of change.
+
+    Deletes go first, then edits, then new items, so a row can take the
+    name of an item removed or renamed in the same save. Returns the names
+    of the rows that were not saved because another item already had the name.
+    """
+    added, updated, deleted = diff_menu(original, edited)
+    if not (added or updated or deleted):
+        return []
+    db = get_database()
+    store_object_id = ObjectId(store_id)
+    if deleted:
+        db.food_items.delete_many({"_id": {"$in": deleted}, "storeId": store_object_id})
+    rejected = []
+    if updated:
+        rejected += _duplicate_names(updated, lambda: db.food_items.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": item["_id"], "storeId": store_object_id},
+                    {"$set": {**with_name_key({field: item[field] for field in MENU_FIELDS}), "updatedAt": now()}},
+                )
+                for item in updated
+            ],
+            ordered=False,
+        ))
+    added = [_food_item(canteen_id, store_id, item) for item in added]
+    if added:
+        rejected += _duplicate_names(added, lambda: db.food_items.insert_many(added, ordered=False))
+    _menu_changed(canteen_id, store_id)
+
+    owner = {"storeId": store_object_id, "canteenId": ObjectId(canteen_id)}
+    search_operations = [DeleteOne({"_id": item_id}) for item_id in deleted]
+    # By id: a rejected row may share its name with an item that was saved
+    rejected_ids = {item["_id"] for item in rejected}
+    search_operations += [
+        ReplaceOne({"_id": item["_id"]}, search_entry({**owner, **item}), upsert=True)
+        for item in updated + added
+        if item["_id"] not in rejected_ids
+    ]
+    if search_operations:
+        db.menu_search.bulk_write(search_operations, ordered=False)
+    shared_cache.invalidate(("menu_search",))
+    refresh_price_summary([canteen_id])
+    return [item["name"] for item in rejected]
+
+
+# --- Near-duplicate names ---
+# Stores and food items carry `nameKey` (see name_keys.py), indexed with
+# their canteen or store. The forms look a name's key up before saving and
+# warn about the matches; nothing is rejected here, only by the unique
+# name indexes.
+
+SIMILAR_NAMES_LIMIT = 5
+
+
+@shared_breaker.guarded
+def find_similar_stores(canteen_id: str, name: str, exclude_id: str | None = None) -> list[str]:
+    """Names of the canteen's stores whose name has the same key as `name`."""
+    return _similar_names(get_database().stores, {"canteenId": ObjectId(canteen_id)}, name, exclude_id)
+
+
+@shared_breaker.guarded
+def find_similar_menu_items(store_id: str, name: str, exclude_id: str | None = None) -> list[str]:
+    """Names of the store's menu items whose name has the same key as `name`."""
+    return _similar_names(get_database().food_items, {"storeId": ObjectId(store_id)}, name, exclude_id)
+
+
+def _similar_names(collection, owner: dict, name: str, exclude_id) -> list[str]:
+    # Uncached: asked while typing, and must see the entry saved a moment ago
+    key = name_key(name)
+    if not key:
+        return []
+    query = {**owner, "nameKey": key}
+    if exclude_id:
+        query["_id"] = {"$ne": ObjectId(exclude_id)}
+    return [doc["name"] for doc in collection.find(query, {"name": True}).limit(SIMILAR_NAMES_LIMIT)]
+
+
+# --- Menu search ---
+# menu_search holds one entry per menu item (see menu_search.py). The menu
+# writes above keep it in step item by item; imports re-index whole stores.
+
+def _index_menu_item(item: dict) -> None:
+    entry = search_entry(item)
+    get_database().menu_search.replace_one({"_id": entry["_id"]}, entry, upsert=True)
+    shared_cache.invalidate(("menu_search",))
+
+
+@shared_breaker.guarded
+def reindex_menu_search(store_filter: dict | None = None, batch_size: int = 500) -> int:
+    """Rebuilds the search entries of the stores matching `store_filter` (all by default)."""
+    db = get_database()
+    store_filter = store_filter or {}
+    indexed = 0
+    batch = []
+
+    def flush():
+        db.menu_search.delete_many({"storeId": {"$in": batch}})
+        entries = [search_entry(item) for item in db.food_items.find({"storeId": {"$in": batch}})]
+        if entries:
+            db.menu_search.insert_many(entries, ordered=False)
+        batch.clear()
+        return len(entries)
+
+    for store in db.stores.find(store_filter, {"_id": True}, **_collation()).sort("_id", 1):
+        batch.append(store["_id"])
+        if len(batch) == batch_size:
+            indexed += flush()
+    if batch:
+        indexed += flush()
+    if not store_filter:
+        # Entries of stores that no longer exist
+        db.menu_search.delete_many({"storeId": {"$nin": db.stores.distinct("_id")}})
+    shared_cache.invalidate(("menu_search",))
+    return indexed
+
+
+@shared_reads.memoized
+@shared_breaker.guarded
+def search_menu(query: str, limit: int = PAGE_SIZE) -> list[dict]:
+    """Menu items across all canteens whose names match `query`, best first.
+
+    Each result has the item fields plus storeId/storeName, canteenId/canteenName
+    and a `score` between 0 and 1. Queries shorter than two characters match nothing.
+    """
+    grams = ngrams(query)
+    if not grams:
+        return []
+
+    def load():
+        db = get_database()
+        projection = {"storeId": True, "canteenId": True, "name": True, "price": True, "category": True, "key": True, "grams": True}
+        # Best matches first, each step only if the previous ones found too few:
+        # names starting with the query (an index range on key), names holding
+        # all of its bigrams, then names sharing some of them
+        steps = [
+            {"key": {"$regex": "^" + re.escape(normalize(query))}},
+            {"grams": {"$all": grams}},
+            {"grams": {"$in": grams}},
+        ]
+        candidates = []
+        for step in steps:
+            if len(candidates) >= limit:
+                break
+            seen = [entry["_id"] for entry in candidates]
+            candidates += db.menu_search.find({**step, "_id": {"$nin": seen}}, projection).limit(CANDIDATE_LIMIT)
+        results = rank(query, candidates, limit)
+        store_names = {
+            store["_id"]: store["name"]
+            for store in db.stores.find({"_id": {"$in": list({r["storeId"] for r in results})}}, {"name": True})
+        }
+        canteen_names = {
+            canteen["_id"]: canteen["name"]
+            for canteen in db.canteens.find({"_id": {"$in": list({r["canteenId"] for r in results})}}, {"name": True})
+        }
+        return [
+            {**r, "storeName": store_names.get(r["storeId"], ""), "canteenName": canteen_names.get(r["canteenId"], "")}
+            for r in results
+        ]
+
+    return shared_cache.get_or_load(("menu_search", query, limit), load)
+
+
+# --- Price summary ---
+# price_summary holds figures per (canteen, category), see analytics.py.
+# Writes refresh only the rows they can have changed.
+
+@shared_breaker.guarded
+def refresh_price_summary(canteen_ids: list | None = None, categories: list[str] | None = None) -> None:
+    """Recomputes the summary rows of these canteens and categories (all by default)."""
+    db = get_database()
+    scope, match = {}, {}
+    if canteen_ids is not None:
+        scope["canteenId"] = match["canteenId"] = {"$in": [ObjectId(c) for c in canteen_ids]}
+    if categories is not None:
+        scope["category"] = match["category"] = {"$in": categories}
+    refreshed_at = now()
+    pipeline = summary_pipeline(match, refreshed_at)
+    try:
+        db.food_items.aggregate([*pipeline, merge_stage()])
+        produced = {(k["_id"]["canteenId"], k["_id"]["category"]) for k in db.food_items.aggregate(summary_keys_pipeline(match))}
+    except (OperationFailure, NotImplementedError):
+        # $merge needs MongoDB 4.2+ and the memory backend has none; write the rows from here
+        rows = list(db.food_items.aggregate(pipeline))
+        produced = {(r["canteenId"], r["category"]) for r in rows}
+        operations = [
+            # Matches only a row no newer than this refresh; a newer one turns
+            # the upsert into a duplicate key, which leaves it in place
+            ReplaceOne(
+                {"canteenId": r["canteenId"], "category": r["category"], "refreshedAt": {"$not": {"$gt": refreshed_at}}},
+                r,
+                upsert=True,
+            )
+            for r in rows
+        ]
+        try:
+            if operations:
+                db[SUMMARY_COLLECTION].bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    # Rows whose canteen or category has no items left; a row a newer refresh wrote stays
+    absent = [
+        {"canteenId": row["canteenId"], "category": row["category"]}
+        for row in db[SUMMARY_COLLECTION].find(scope, {"canteenId": True, "category": True})
+        if (row["canteenId"], row["category"]) not in produced
+    ]
+    if absent:
+        db[SUMMARY_COLLECTION].delete_many({"$or": absent, "refreshedAt": {"$not": {"$gt": refreshed_at}}})
+    shared_cache.invalidate(("price_summary",))
+
+
+@shared_reads.memoized
+@shared_breaker.guarded
+def load_price_summary() -> list[dict]:
+    db = get_database()
+    return shared_cache.get_or_load(
+        ("price_summary",),
+        lambda: list(db[SUMMARY_COLLECTION].find({}, {"_id": False}).sort([("canteenId", 1), ("category", 1)])),
+    )
+
+
+# --- Bulk upserts (imports) ---
+# Each helper sends one unordered bulk_write and matches documents by name
+# under the same collation as the unique indexes, so re-importing a file
+# updates what is already there instead of duplicating it. A document whose
+# imported fields already match is left alone, version and updatedAt
+# included, so open editors and incremental exports see no change.
+
+
+def _differs(doc: dict) -> dict:
+    # Filter clause: at least one of `doc`'s fields has another value
+    return {"$or": [{field: {"$ne": value}} for field, value in doc.items()]}
+
+
+def _upsert_changed(collection, operations) -> int:
+    """Runs the upserts; returns how many documents they inserted or changed.
+
+    An upsert whose document already matches (see _differs) finds nothing
+    to update and tries to insert, which the unique name index turns away.
+    """
+    try:
+        result = collection.bulk_write(operations, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        result = e.details
+    return result["nUpserted"] + result["nModified"]
+
+@shared_breaker.guarded
+def upsert_canteens(canteens: list[dict]) -> dict[str, ObjectId]:
+    """Upserts canteens by name; returns their ids keyed by casefolded name."""
+    if not canteens:
+        return {}
+    db = get_database()
+    _upsert_changed(db.canteens, [
+        UpdateOne(
+            {"name": c["name"], **_differs(c)},
+            {
+                "$set": {**with_time_ranges(c), "updatedAt": now()},
+                "$inc": {"version": 1},
+                "$setOnInsert": {"schemaVersion": SCHEMA_VERSIONS["canteens"]},
+            },
+            upsert=True,
+            **_collation(),
+        )
+        for c in canteens
+    ])
+    shared_cache.invalidate(("canteens",))
+    _replica_catch_up()
+    _publish("canteens")
+    names = [c["name"] for c in canteens]
+    cursor = db.canteens.find({"name": {"$in": names}}, {"name": True}, **_collation())
+    return {doc["name"].casefold(): doc["_id"] for doc in cursor}
+
+
+@shared_breaker.guarded
+def upsert_stores(stores: list[dict]) -> int:
+    """Upserts stores by (canteenId, name); a new store starts with an empty menu."""
+    if not stores:
+        return 0
+    written = _upsert_changed(get_database().stores, [
+        UpdateOne(
+            {"canteenId": s["canteenId"], "name": s["name"], **_differs(s)},
+            {
+                "$set": {**with_name_key(with_time_ranges(s)), "updatedAt": now()},
+                "$inc": {"version": 1},
+                "$setOnInsert": {"menuCount": 0, "schemaVersion": SCHEMA_VERSIONS["stores"]},
+            },
+            upsert=True,
+            **_collation(),
+        )
+        for s in stores
+    ])
+    shared_cache.invalidate(*{("stores", str(s["canteenId"])) for s in stores}, ("store",), ("canteens", "page"))
+    _replica_catch_up()
+    _publish("stores")
+    return written
+
+
+@shared_breaker.guarded
+def upsert_menu_items(items: list[tuple[ObjectId, str, dict]]) -> int:
+    """Upserts (canteenId, store name, item) menu items by name within their store.
+
+    The stores are looked up by name first, under the same collation as the
+    unique indexes; items of stores that do not exist are skipped.
+    """
+    if not items:
+        return 0
+    db = get_database()
+    store_keys = {(canteen_id, store_name) for canteen_id, store_name, _ in items}
+    store_ids = {
+        (store["canteenId"], store["name"].casefold()): store["_id"]
+        for store in db.stores.find(
+            {"$or": [{"canteenId": canteen_id, "name": store_name} for canteen_id, store_name in store_keys]},
+            {"canteenId": True, "name": True},
+            **_collation(),
+        )
+    }
+    operations = []
+    for canteen_id, store_name, item in items:
+        store_id = store_ids.get((canteen_id, store_name.casefold()))
+        if store_id is None:
+            continue
+        operations.append(UpdateOne(
+            {"storeId": store_id, "name": item["name"], **_differs(item)},
+            {
+                "$set": {**with_name_key(item), "updatedAt": now()},
+                "$setOnInsert": {"canteenId": canteen_id, "schemaVersion": SCHEMA_VERSIONS["food_items"]},
+            },
+            upsert=True,
+            **_collation(),
+        ))
+    if not operations:
+        return 0
+    written = _upsert_changed(db.food_items, operations)
+    if not written:
+        # Nothing differed: no store, search entry or summary to touch
+        return 0
+    _recount_menus(set(store_ids.values()))
+    shared_cache.invalidate(
+        *{("stores", str(canteen_id)) for canteen_id, _, _ in items}, ("store",), ("menu",), ("canteens", "page")
+    )
+    _replica_catch_up()
+    _publish("stores")
+    reindex_menu_search({"_id": {"$in": list(store_ids.values())}})
+    refresh_price_summary(list({canteen_id for canteen_id, _, _ in items}))
+    return written
@@ -0,0 +1,120 @@
+"""Concurrent reads at the top of a page, each sent at most once per script run.
+
+Most of what a page lists does not depend on anything else it reads: the
+canteens, the selected canteen's stores and the selected store's menu are
+all known from session state before anything renders. Pages start those
+reads together with `load_x.prefetch(...)`; each runs on a small thread
+pool over the shared, pooled client, and the page's later `load_x(...)`
+waits for that result instead of sending the query again. A page load then
+waits for its slowest read instead of the sum of them. The pool is shared
+by every session, so a read whose prefetch has not started by the time the
+page asks for it is taken back and run on the page's own thread rather
+than waited for behind other sessions' reads.
+
+The same memo means a read decorated with `shared_reads.memoized` goes out
+once per script run, however many times the run calls it with the same
+arguments. layout.sidebar() starts a new memo for every run, and every write
+(repository._publish) empties it, so a run never reads back stale data
+after its own write.
+"""
+
+import contextvars
+import copy
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Well under the client's maxPoolSize, so prefetches never queue for a connection
+MAX_WORKERS = 4
+
+_memo = contextvars.ContextVar("run_memo", default=None)
+
+
+class RunReads:
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page-read")
+        self._lock = threading.Lock()
+
+    def start_run(self) -> None:
+        _memo.set({})
+
+    def invalidate(self) -> None:
+        memo = _memo.get()
+        if memo is not None:
+            with self._lock:
+                memo.clear()
+
+    def memoized(self, fn):
+        """Decorator: one call per script run and arguments, plus `fn.prefetch(...)` to start it early.
+
+        Outside a page's script run (scripts, benchmarks' seeding) calls go straight to `fn`.
+        """
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            future = self._future(fn, args, kwargs, background=False)
+            if future is None:
+                return fn(*args, **kwargs)
+            # Callers may mutate what they get back, as with the query cache
+            return copy.deepcopy(future.result())
+
+        def prefetch(*args, **kwargs) -> None:
+            self._future(fn, args, kwargs, background=True)
+
+        wrapper.prefetch = prefetch
+        return wrapper
+
+    def _future(self, fn, args, kwargs, background):
+        memo = _memo.get()
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        if memo is None:
+            return None
+        with self._lock:
+            future = memo.get(key)
+            created = future is None
+            if created:
+                future = memo[key] = Future()
+        if background:
+            if created:
+                # The worker attributes its commands to this run (instrumentation.py) and
+                # can reach the cached client, which needs the script's run context
+                self._pool.submit(
+                    self._run, future, memo, key, contextvars.copy_context(), get_script_run_ctx(), fn, args, kwargs
+                )
+        else:
+            # Runs here unless a worker already has it (or it is done)
+            self._run(future, memo, key, None, None, fn, args, kwargs)
+        return future
+
+    def _claim(self, future) -> bool:
+        # Whoever moves the future from pending to running runs the read
+        with self._lock:
+            return not future.running() and not future.done() and future.set_running_or_notify_cancel()
+
+    def _run(self, future, memo, key, context, script_run_ctx, fn, args, kwargs):
+        if not self._claim(future):
+            return
+        if script_run_ctx is not None:
+            add_script_run_ctx(threading.current_thread(), script_run_ctx)
+        try:
+            result = context.run(fn, *args, **kwargs) if context is not None else fn(*args, **kwargs)
+        except BaseException as e:
+            # Failures are not remembered; the next call tries again
+            with self._lock:
+                if memo.get(key) is future:
+                    del memo[key]
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            if script_run_ctx is not None:
+                add_script_run_ctx(threading.current_thread(), None)
+
+
+# Module-level so every page and session shares one pool
+shared_reads = RunReads()
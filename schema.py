@@ -0,0 +1,136 @@
+"""The document shape the entry forms write, and checks for data that arrives any other way."""
+
+import re
+
+DAYS_OF_WEEK = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY"]
+
+# Category code -> label shown in the forms
+CATEGORIES = {
+    "MAIN": "อาหารจานหลัก",
+    "SIDE": "กับข้าว",
+    "DRINK": "เครื่องดื่ม",
+    "VEGETARIAN": "มังสวิรัติ",
+}
+
+# Version new documents are written with; bump together with a step in migrations.py
+SCHEMA_VERSIONS = {"canteens": 2, "stores": 5, "food_items": 2}
+
+TIME_PATTERN = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+# Columns of the flat CSV layout: one row per menu item, joined to its store and canteen
+CSV_COLUMNS = [
+    "canteen_name",
+    "canteen_with_air_conditioning",
+    "canteen_busy_periods",
+    "store_name",
+    "store_description",
+    "store_opening_hours",
+    "item_name",
+    "item_price",
+    "item_category",
+]
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def _time_range(entry: dict, what: str, overnight: bool = False) -> dict:
+    """`overnight`: an end before the start runs past midnight (opening hours, see opening_minutes)."""
+    start, end = entry.get("start"), entry.get("end")
+    for value in (start, end):
+        if not isinstance(value, str) or not TIME_PATTERN.match(value):
+            raise ValidationError(f"{what}: time {value!r} is not HH:MM")
+    if end == start or (end < start and not overnight):
+        raise ValidationError(f"{what}: end {end} is not after start {start}")
+    return {"start": start, "end": end}
+
+
+def _object(value, what: str) -> dict:
+    # Imported JSON may have a string or a list where an object belongs
+    if not isinstance(value, dict):
+        raise ValidationError(f"{what}: expected an object, got {type(value).__name__}")
+    return value
+
+
+def _name(value, what: str) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise ValidationError(f"{what}: name is missing")
+    return value.strip()
+
+
+def validate_canteen(canteen: dict) -> dict:
+    """Returns the canteen fields the form would write, or raises ValidationError."""
+    _object(canteen, "canteen")
+    name = _name(canteen.get("name"), "canteen")
+    with_air_conditioning = canteen.get("withAirConditioning", False)
+    if not isinstance(with_air_conditioning, bool):
+        raise ValidationError(f"canteen {name}: withAirConditioning must be true or false")
+    return {
+        "name": name,
+        "busyPeriods": [_time_range(p, f"canteen {name} busy period") for p in canteen.get("busyPeriods", [])],
+        "withAirConditioning": with_air_conditioning,
+    }
+
+
+def validate_store(store: dict) -> dict:
+    """Returns the store fields the form would write (without canteenId and menu)."""
+    _object(store, "store")
+    name = _name(store.get("name"), "store")
+    description = store.get("description")
+    if not isinstance(description, str) or not description.strip():
+        raise ValidationError(f"store {name}: description is missing")
+    opening_hours = store.get("openingHours") or []
+    if not opening_hours:
+        raise ValidationError(f"store {name}: openingHours is empty")
+    days = []
+    for entry in opening_hours:
+        day = entry.get("dayOfWeek")
+        if day not in DAYS_OF_WEEK:
+            raise ValidationError(f"store {name}: {day!r} is not one of {', '.join(DAYS_OF_WEEK)}")
+        days.append({"dayOfWeek": day, **_time_range(entry, f"store {name} {day}", overnight=True)})
+    return {"name": name, "description": description.strip(), "openingHours": days}
+
+
+def validate_menu_item(item: dict) -> dict:
+    _object(item, "menu item")
+    name = _name(item.get("name"), "menu item")
+    try:
+        price = float(item.get("price"))
+    except (TypeError, ValueError):
+        raise ValidationError(f"menu item {name}: price {item.get('price')!r} is not a number") from None
+    if price <= 0:
+        raise ValidationError(f"menu item {name}: price must be greater than 0")
+    category = item.get("category")
+    if category not in CATEGORIES:
+        raise ValidationError(f"menu item {name}: {category!r} is not one of {', '.join(CATEGORIES)}")
+    return {"name": name, "price": price, "category": category}
+
+
+# --- Flat CSV encodings ---
+# Busy periods:  "11:00-13:00;17:00-18:00"
+# Opening hours: "MONDAY 08:00-17:00;TUESDAY 08:00-16:00"
+
+def format_busy_periods(periods: list[dict]) -> str:
+    return ";".join(f"{p['start']}-{p['end']}" for p in periods)
+
+
+def parse_busy_periods(text: str) -> list[dict]:
+    periods = []
+    for part in filter(None, (p.strip() for p in (text or "").split(";"))):
+        start, _, end = part.partition("-")
+        periods.append({"start": start.strip(), "end": end.strip()})
+    return periods
+
+
+def format_opening_hours(opening_hours: list[dict]) -> str:
+    return ";".join(f"{h['dayOfWeek']} {h['start']}-{h['end']}" for h in opening_hours)
+
+
+def parse_opening_hours(text: str) -> list[dict]:
+    opening_hours = []
+    for part in filter(None, (p.strip() for p in (text or "").split(";"))):
+        day, _, times = part.partition(" ")
+        start, _, end = times.strip().partition("-")
+        opening_hours.append({"dayOfWeek": day.strip().upper(), "start": start.strip(), "end": end.strip()})
+    return opening_hours
@@ -0,0 +1,42 @@
+"""The repository on the memory backend, one fresh database per test.
+
+    pip install pytest mongomock
+    python -m pytest
+"""
+
+import pytest
+
+import repository
+from circuit_breaker import shared_breaker
+
+TEST_DATABASE = "canteen_test"
+
+
+def connect_memory(build_indexes=True):
+    """A new, empty in-memory client behind the repository; returns its test database."""
+    client = repository.create_client(backend="memory")
+    repository.use_client(client, backend="memory", database_name=TEST_DATABASE, build_indexes=build_indexes)
+    return client[TEST_DATABASE]
+
+
+@pytest.fixture
+def db():
+    # A test that tripped the shared breaker must not fail the ones after it
+    shared_breaker.failures = 0
+    shared_breaker.opened_at = None
+    return connect_memory()
+
+
+@pytest.fixture
+def canteen_id(db):
+    return repository.add_canteen({"name": "โรงอาหารกลาง", "busyPeriods": [], "withAirConditioning": False})
+
+
+@pytest.fixture
+def store_id(db, canteen_id):
+    return repository.add_store({
+        "name": "ร้านป้าแดง",
+        "description": "ข้าวแกง",
+        "canteenId": canteen_id,
+        "openingHours": [{"dayOfWeek": "MONDAY", "start": "08:00", "end": "14:00"}],
+    })
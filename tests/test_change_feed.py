@@ -0,0 +1,94 @@
+import threading
+import time
+
+from bson.objectid import ObjectId
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from change_feed import ChangeFeed
+
+
+def test_own_writes_are_not_announced_twice():
+    feed = ChangeFeed()
+    heard = []
+    feed.add_listener(heard.append)
+    store_id = ObjectId()
+    feed.publish("stores", store_id)
+    feed.publish("stores", store_id)
+    # One echo per write comes back from the server, then it is someone else's change
+    assert feed.publish("stores", store_id, local=False) is None
+    assert feed.publish("stores", store_id, local=False) is None
+    sequence = feed.publish("stores", store_id, local=False)
+    assert sequence == 3
+    assert [(c.collection, c.document_id) for c in heard] == [("stores", store_id)]
+
+
+def test_changes_since_asks_for_a_reload_once_changes_were_dropped():
+    feed = ChangeFeed(max_changes=2)
+    for _ in range(3):
+        feed.publish("canteens", ObjectId())
+    assert [c.sequence for c in feed.changes_since(1)] == [2, 3]
+    assert feed.changes_since(0) is None
+
+
+class Stream:
+    def __init__(self, events, error=None):
+        self.events, self.error = events, error
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for token, event in self.events:
+            self.resume_token = token
+            yield event
+        if self.error:
+            raise self.error
+        # The last stream stays open, parking the (daemon) feed thread
+        threading.Event().wait()
+
+
+class ReplicaSetDatabase:
+    """Opens the scripted streams in turn, recording where each resumed."""
+
+    def __init__(self, streams):
+        self.streams = streams
+        self.resumed_after = []
+
+    def watch(self, pipeline, full_document=None, resume_after=None):
+        self.resumed_after.append(resume_after)
+        return self.streams.pop(0)
+
+
+def event(collection, document_id, operation="update"):
+    return {"ns": {"coll": collection}, "documentKey": {"_id": document_id}, "operationType": operation}
+
+
+def test_change_stream_resumes_after_failovers():
+    feed = ChangeFeed()
+    store_id, canteen_id = ObjectId(), ObjectId()
+    db = ReplicaSetDatabase([
+        Stream([("t1", event("stores", store_id))], error=AutoReconnect("primary stepped down")),
+        # The resume point fell off the oplog
+        Stream([], error=OperationFailure("resume point lost", code=286)),
+        Stream([("t2", event("canteens", canteen_id, "delete"))]),
+    ])
+    threading.Thread(target=feed._run, args=(db, 0), daemon=True).start()
+    for _ in range(500):
+        if feed.sequence == 4:
+            break
+        time.sleep(0.01)
+
+    assert feed.source == "change stream"
+    assert db.resumed_after == [None, "t1", None]
+    changes = [(c.collection, c.document_id, c.operation) for c in feed.changes_since(0)]
+    assert changes == [
+        ("stores", store_id, "update"),
+        # Everything cached is treated as changed
+        ("canteens", None, "update"),
+        ("stores", None, "update"),
+        ("canteens", canteen_id, "delete"),
+    ]
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError, OperationFailure
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def failing(error):
+    def call():
+        raise error
+    return call
+
+
+def test_opens_after_consecutive_connection_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    call = breaker.guarded(failing(AutoReconnect("down")))
+    for _ in range(2):
+        with pytest.raises(AutoReconnect):
+            call()
+    assert breaker.is_open
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.guarded(lambda: calls.append(1))()
+    assert calls == []
+
+
+def test_server_errors_and_successes_do_not_open_it():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    with pytest.raises(AutoReconnect):
+        breaker.guarded(failing(AutoReconnect("down")))()
+    breaker.guarded(lambda: None)()
+    with pytest.raises(AutoReconnect):
+        breaker.guarded(failing(AutoReconnect("down")))()
+    for _ in range(3):
+        with pytest.raises(DuplicateKeyError):
+            breaker.guarded(failing(DuplicateKeyError("taken")))()
+    assert not breaker.is_open
+
+
+def test_nested_calls_count_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    inner = breaker.guarded(failing(AutoReconnect("down")))
+    with pytest.raises(AutoReconnect):
+        breaker.guarded(inner)()
+    assert breaker.failures == 1
+
+
+def test_probe_closes_it_and_outlives_other_errors():
+    probes = []
+
+    def probe():
+        probes.append(1)
+        if len(probes) == 1:
+            raise OperationFailure("auth failed while the server restarts")
+        if len(probes) == 2:
+            raise AutoReconnect("still down")
+
+    breaker = CircuitBreaker(reset_seconds=0.01)
+    breaker.configure(failure_threshold=1, reset_seconds=0.01, probe=probe)
+    breaker.trip()
+    deadline = time.monotonic() + 5
+    while breaker.is_open and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not breaker.is_open
+    assert len(probes) == 3
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+import time
+
+import pytest
+
+import exporter
+import importer
+import repository
+
+
+def item(name, price=40.0, category="MAIN"):
+    return {"name": name, "price": price, "category": category}
+
+
+def csv_rows(since=None):
+    out = io.StringIO()
+    exporter.export_csv(out, since, batch_size=1)
+    return list(csv.DictReader(io.StringIO(out.getvalue())))
+
+
+def test_csv_joins_items_to_their_store_and_canteen(db, canteen_id, store_id):
+    for name in ("ข้าวผัด", "ข้าวมันไก่"):
+        repository.add_menu_item(str(canteen_id), str(store_id), item(name))
+    empty = repository.add_canteen({"name": "โรงอาหารเล็ก", "busyPeriods": [], "withAirConditioning": True})
+
+    rows = csv_rows()
+    assert [(r["canteen_name"], r["store_name"], r["item_name"]) for r in rows] == [
+        ("โรงอาหารกลาง", "ร้านป้าแดง", "ข้าวผัด"),
+        ("โรงอาหารกลาง", "ร้านป้าแดง", "ข้าวมันไก่"),
+        # A canteen without stores still gets its row
+        ("โรงอาหารเล็ก", "", ""),
+    ]
+    assert rows[0]["store_opening_hours"] == "MONDAY 08:00-14:00"
+    assert rows[2]["canteen_id"] == str(empty)
+
+
+def test_incremental_exports_only_what_changed(db, canteen_id, store_id):
+    repository.add_menu_item(str(canteen_id), str(store_id), item("ข้าวผัด"))
+    other = repository.add_canteen({"name": "โรงอาหารเล็ก", "busyPeriods": [], "withAirConditioning": False})
+    since = repository.now()
+    # updatedAt is stored to the millisecond, so the next write must land in a later one
+    time.sleep(0.01)
+    assert csv_rows(since) == []
+
+    canteen = repository.load_canteen(str(other))
+    repository.update_canteen(str(other), {"withAirConditioning": True}, canteen["version"])
+    assert [r["canteen_name"] for r in csv_rows(since)] == ["โรงอาหารเล็ก"]
+
+    out = io.StringIO()
+    assert exporter.export_jsonl(out, since) == 1
+    assert json.loads(out.getvalue())["collection"] == "canteens"
+
+
+def test_jsonl_writes_every_document_as_plain_json(db, canteen_id, store_id):
+    repository.add_menu_item(str(canteen_id), str(store_id), item("ข้าวผัด"))
+    out = io.StringIO()
+    assert exporter.export_jsonl(out, batch_size=1) == 3
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [line["collection"] for line in lines] == ["canteens", "stores", "food_items"]
+    assert lines[2]["storeId"] == str(store_id)
+    assert isinstance(lines[1]["updatedAt"], str)
+
+
+def test_snapshot_reads_back_with_the_importer(db, canteen_id, store_id, tmp_path):
+    repository.add_menu_item(str(canteen_id), str(store_id), item("ข้าวผัด"))
+    path = tmp_path / "canteen_data.json"
+    with open(path, "w", encoding="utf-8") as out:
+        assert exporter.export_snapshot(out, batch_size=1) == 1
+    with open(path, encoding="utf-8") as f:
+        [(_, canteen, store, menu_item)] = importer.read_json(f)
+    assert (canteen["name"], store["name"], menu_item) == ("โรงอาหารกลาง", "ร้านป้าแดง", item("ข้าวผัด"))
+
+
+def test_parquet_has_the_csv_rows(db, canteen_id, store_id, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    repository.add_menu_item(str(canteen_id), str(store_id), item("ข้าวผัด", 45.5))
+    assert exporter.export_parquet(str(tmp_path / "menus.parquet")) == 1
+    table = pq.read_table(tmp_path / "menus.parquet")
+    assert table.column("item_price").to_pylist() == [45.5]
+
+
+def test_last_export_time_round_trips(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    assert exporter.load_last_export(state_file) is None
+    started_at = repository.now()
+    exporter.save_last_export(started_at, state_file)
+    assert exporter.load_last_export(state_file) == started_at
@@ -0,0 +1,95 @@
+import io
+import json
+
+import importer
+
+STORE = {
+    "name": "ร้านป้าแดง",
+    "description": "ข้าวแกง",
+    "openingHours": [{"dayOfWeek": "MONDAY", "start": "08:00", "end": "14:00"}],
+    "menu": [{"name": "ข้าวมันไก่", "price": 40, "category": "MAIN"}],
+}
+CANTEEN = {"name": "กลาง", "busyPeriods": [], "withAirConditioning": True, "stores": [STORE]}
+
+
+def import_json(data, file_format="json"):
+    return importer.import_stream(io.StringIO(data if isinstance(data, str) else json.dumps(data)), file_format)
+
+
+def test_import_writes_canteens_stores_and_menus(db):
+    report = import_json([CANTEEN])
+    assert (report.canteens, report.stores, report.menu_items, report.rejected) == (1, 1, 1, [])
+    store = db.stores.find_one()
+    assert (store["menuCount"], store["nameKey"]) == (1, "รานปาแดง")
+    assert db.food_items.find_one()["name"] == "ข้าวมันไก่"
+
+
+def snapshot(db):
+    return [list(db[c].find()) for c in ("canteens", "stores", "food_items")]
+
+
+def test_importing_twice_leaves_the_data_unchanged(db):
+    import_json([CANTEEN])
+    before = snapshot(db)
+    report = import_json([CANTEEN])
+    assert (report.stores, report.menu_items, report.rejected) == (0, 0, [])
+    # Not even version or updatedAt, so open editors see no conflict
+    assert snapshot(db) == before
+
+
+def test_reimporting_a_changed_row_updates_only_that_document(db):
+    import_json([CANTEEN])
+    canteen, store, item = (db[c].find_one() for c in ("canteens", "stores", "food_items"))
+    changed = {**CANTEEN, "stores": [{**STORE, "description": "ข้าวแกง ข้าวผัด"}]}
+    report = import_json([changed])
+    assert (report.stores, report.menu_items) == (1, 0)
+    assert db.canteens.find_one() == canteen
+    assert db.food_items.find_one() == item
+    updated = db.stores.find_one()
+    assert (updated["description"], updated["version"]) == ("ข้าวแกง ข้าวผัด", store["version"] + 1)
+    assert updated["updatedAt"] > store["updatedAt"]
+
+
+def test_bad_rows_are_reported_with_their_row_number(db):
+    rows = [
+        "oops",
+        {"name": "C", "stores": ["bad"]},
+        {**CANTEEN, "stores": [{**STORE, "menu": [1]}]},
+        {"name": "D", "withAirConditioning": "yes"},
+        {"name": "E"},
+    ]
+    report = import_json(rows)
+    assert [(r["row"], r["reason"]) for r in report.rejected] == [
+        (1, "canteen: expected an object, got str"),
+        (2, "store: expected an object, got str"),
+        (3, "menu item: expected an object, got int"),
+        (4, "canteen D: withAirConditioning must be true or false"),
+    ]
+    # A rejected menu item takes its whole row with it
+    assert [c["name"] for c in db.canteens.find()] == ["E"]
+
+
+def test_jsonl_rows_are_numbered_by_line(db):
+    report = import_json('"x"\n\n' + json.dumps(CANTEEN) + "\n", "jsonl")
+    assert [r["row"] for r in report.rejected] == [1]
+    assert report.menu_items == 1
+
+
+def test_unreadable_files_are_reported(db):
+    assert import_json({"name": "กลาง"}).rejected == [
+        {"row": None, "reason": "could not read file: expected an array of canteens, got dict"}
+    ]
+    assert import_json("[{").rejected[0]["reason"].startswith("could not read file")
+
+
+def test_csv_rows(db):
+    data = (
+        "canteen_name,canteen_with_air_conditioning,canteen_busy_periods,store_name,store_description,"
+        "store_opening_hours,item_name,item_price,item_category\n"
+        "กลาง,ใช่,11:00-13:00,ร้านป้าแดง,ข้าวแกง,MONDAY 08:00-14:00,ข้าวมันไก่,40,MAIN\n"
+        "กลาง,ใช่,11:00-13:00,ร้านป้าแดง,ข้าวแกง,MONDAY 08:00-14:00,ชาเย็น,free,DRINK\n"
+    )
+    report = importer.import_stream(io.StringIO(data), "csv")
+    assert report.menu_items == 1
+    assert [r["row"] for r in report.rejected] == [3]
+    assert db.canteens.find_one()["withAirConditioning"] is True
@@ -0,0 +1,74 @@
+import contextvars
+import json
+import threading
+from types import SimpleNamespace
+
+from instrumentation import CommandMonitor
+
+REPLY = {"cursor": {"firstBatch": [{"_id": 1}, {"_id": 2}]}, "ok": 1}
+
+
+def send(monitor, request_id, ms, command_name="find", reply=REPLY):
+    command = {command_name: "stores"}
+    monitor.started(SimpleNamespace(command=command, command_name=command_name, request_id=request_id))
+    monitor.succeeded(SimpleNamespace(request_id=request_id, duration_micros=ms * 1000, reply=reply))
+
+
+def in_new_context(fn):
+    # Each test is its own script run, so runs never leak between tests
+    return contextvars.copy_context().run(fn)
+
+
+def test_commands_are_recorded_per_run_and_slow_ones_logged(tmp_path):
+    log_path = tmp_path / "commands.jsonl"
+    monitor = CommandMonitor(slow_ms=100, log_path=str(log_path))
+
+    def script_run():
+        run = monitor.start_run("stores")
+        send(monitor, 1, 5)
+        send(monitor, 2, 150)
+        monitor.failed(SimpleNamespace(request_id=3))  # never started: ignored
+        monitor.started(SimpleNamespace(command={"update": "stores"}, command_name="update", request_id=4))
+        monitor.failed(SimpleNamespace(request_id=4))
+        monitor.finish_run(run)
+        monitor.finish_run(run)
+        return run
+
+    run = in_new_context(script_run)
+    assert [(c.name, c.collection, c.documents) for c in run.commands] == [("find", "stores", 2)] * 2
+    assert run.totals()["failures"] == 1
+    records = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [r["type"] for r in records] == ["slow_command", "run"]
+    assert (records[0]["ms"], records[1]["commands"], records[1]["documents"]) == (150, 2, 4)
+    assert monitor.percentiles()["command_ms"] == {"p50": 5, "p90": 150, "p99": 150}
+
+
+def test_prefetch_workers_count_toward_the_run_other_threads_do_not():
+    monitor = CommandMonitor()
+
+    def script_run():
+        run = monitor.start_run("canteens")
+        # Like run_reads.py, which runs each prefetch in a copy of the run's context
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(send, monitor, 1, 3))
+        background = threading.Thread(target=send, args=(monitor, 2, 3))
+        for thread in (worker, background):
+            thread.start()
+            thread.join()
+        return run
+
+    run = in_new_context(script_run)
+    assert len(run.commands) == 1
+
+
+def test_percentiles_cover_only_the_recent_window():
+    monitor = CommandMonitor(window=2)
+
+    def script_run(commands):
+        run = monitor.start_run("stores")
+        for request_id in range(commands):
+            send(monitor, request_id, 1)
+        monitor.finish_run(run)
+
+    for commands in (10, 1, 3):
+        in_new_context(lambda: script_run(commands))
+    assert monitor.percentiles()["commands"] == {"p50": 1, "p90": 3, "p99": 3}
@@ -0,0 +1,64 @@
+import pytest
+from bson.objectid import ObjectId
+
+import maintenance
+import repository
+from conftest import connect_memory
+
+
+def test_duplicate_names_stop_the_index_build_with_a_way_out():
+    db = connect_memory(build_indexes=False)
+    db.canteens.insert_many([{"name": "กลาง"}, {"name": "กลาง"}])
+    with pytest.raises(repository.DatabaseNotReady, match="dedupe-names"):
+        repository.use_client(db.client, backend="memory", database_name=db.name)
+
+
+def test_dedupe_names_renames_all_but_the_oldest():
+    db = connect_memory(build_indexes=False)
+    canteen_id = ObjectId()
+    ids = db.stores.insert_many([
+        {"name": "ร้านA", "canteenId": canteen_id, "version": 1},
+        {"name": "ร้านA", "canteenId": canteen_id, "version": 1},
+        {"name": "ร้านA (2)", "canteenId": canteen_id, "version": 1},
+        # Same name in another canteen is allowed
+        {"name": "ร้านA", "canteenId": ObjectId(), "version": 1},
+    ]).inserted_ids
+
+    planned = maintenance.dedupe_names(dry_run=True)
+    assert [(d.collection, d.kept_id, d.renames) for d in planned] == [("stores", ids[0], [(ids[1], "ร้านA (3)")])]
+    assert db.stores.count_documents({"name": "ร้านA"}) == 3
+
+    maintenance.dedupe_names()
+    renamed = db.stores.find_one({"_id": ids[1]})
+    assert (renamed["name"], renamed["version"], renamed["nameKey"]) == ("ร้านA (3)", 2, "รานa3")
+    assert maintenance.find_duplicate_names(db) == []
+    # The unique indexes are in place afterwards
+    repository.use_client(db.client, backend="memory", database_name=db.name)
+
+
+def test_purge_orphans(db, canteen_id, store_id):
+    orphan = {"name": "ร้านร้าง", "description": "-", "canteenId": ObjectId(), "openingHours": []}
+    orphan_id = repository.add_store(orphan)
+    food = {"name": "ข้าวผัด", "price": 40.0, "category": "อาหาร"}
+    repository.add_menu_item(str(orphan["canteenId"]), str(orphan_id), food)
+    # A menu item left behind by a store delete that was interrupted
+    gone_store = ObjectId()
+    db.food_items.insert_one({**food, "canteenId": canteen_id, "storeId": gone_store})
+    repository.add_menu_item(str(canteen_id), str(store_id), {**food, "name": "ข้าวมันไก่"})
+
+    report = maintenance.purge_orphans(dry_run=True)
+    assert (report.orphaned_canteen_ids, report.orphaned_store_ids, report.documents) == (1, 1, 3)
+    assert report.bytes > 0
+    assert db.food_items.count_documents({}) == 3
+
+    maintenance.purge_orphans()
+    assert [s["_id"] for s in db.stores.find()] == [store_id]
+    assert [f["storeId"] for f in db.food_items.find()] == [store_id]
+    assert db.menu_search.count_documents({"storeId": {"$ne": store_id}}) == 0
+
+
+def test_delete_store_takes_its_menu_with_it(db, canteen_id, store_id):
+    repository.add_menu_item(str(canteen_id), str(store_id), {"name": "ข้าวผัด", "price": 40.0, "category": "อาหาร"})
+    repository.delete_store(str(store_id))
+    assert db.food_items.count_documents({}) == db.menu_search.count_documents({}) == 0
+    assert maintenance.purge_orphans(dry_run=True).documents == 0
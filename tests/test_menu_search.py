@@ -0,0 +1,41 @@
+import repository
+from menu_search import ngrams, normalize, rank
+
+
+def entry(name):
+    return {"_id": name, "storeId": None, "canteenId": None, "price": 40.0, "category": "MAIN",
+            "key": normalize(name), "grams": ngrams(name), "name": name}
+
+
+def test_normalize_drops_spaces_case_and_zero_width_characters():
+    assert normalize(" ข้าว\u200bมัน ไก่ ") == "ข้าวมันไก่"
+    assert normalize("Cafe LATTE") == "cafelatte"
+
+
+def test_rank_puts_exact_then_prefix_then_substring_then_partial():
+    names = ["ข้าวมันไก่ทอด", "ข้าวมันไก่", "ไก่ทอด", "ข้าวมันไก่ต้ม", "ข้าวหมูแดงมันไก่"]
+    ranked = rank("ข้าวมันไก่", [entry(name) for name in names], limit=10)
+    assert [r["name"] for r in ranked] == [
+        "ข้าวมันไก่",
+        # Equally close prefix matches by name
+        "ข้าวมันไก่ต้ม",
+        "ข้าวมันไก่ทอด",
+        # Shares most bigrams without containing the query; ไก่ทอด shares too few
+        "ข้าวหมูแดงมันไก่",
+    ]
+    assert ranked[0]["score"] == 1.0
+    assert all("grams" not in r and "key" not in r for r in ranked)
+
+
+def test_rank_drops_weak_partial_matches_and_keeps_the_limit():
+    ranked = rank("ชาเย็น", [entry("ชาเขียว"), entry("ชาเย็นปั่น"), entry("โกโก้เย็น")], limit=1)
+    assert [r["name"] for r in ranked] == ["ชาเย็นปั่น"]
+
+
+def test_search_menu_finds_items_across_stores_with_their_names(db, canteen_id, store_id):
+    for name in ("ข้าวมันไก่", "ข้าวผัด", "ชาเย็น"):
+        repository.add_menu_item(str(canteen_id), str(store_id), {"name": name, "price": 40.0, "category": "MAIN"})
+    results = repository.search_menu("ข้าว")
+    assert sorted(r["name"] for r in results) == ["ข้าวผัด", "ข้าวมันไก่"]
+    assert {(r["storeName"], r["canteenName"]) for r in results} == {("ร้านป้าแดง", "โรงอาหารกลาง")}
+    assert repository.search_menu("ข") == []
@@ -0,0 +1,74 @@
+from bson.objectid import ObjectId
+
+import migrations
+import repository
+
+
+def legacy_data(db):
+    canteen_id = db.canteens.insert_one({"name": "กลาง", "busyPeriods": [{"start": "11:00", "end": "13:00"}], "stores": []}).inserted_id
+    store_id = db.stores.insert_one({
+        "name": "ร้านป้าแดง",
+        "canteenId": canteen_id,
+        "openingHours": [{"dayOfWeek": "MONDAY", "start": "08:00", "end": "14:00"}],
+        "menu": [{"name": "ข้าวมันไก่", "price": 40, "category": "MAIN"}, {"name": "ชาเย็น", "price": 20, "category": "DRINK"}],
+    }).inserted_id
+    return canteen_id, store_id
+
+
+def test_migrate_brings_legacy_documents_to_the_current_schema(db):
+    canteen_id, store_id = legacy_data(db)
+    assert repository.outdated_collections(db) == ["canteens", "stores"]
+
+    migrations.migrate()
+
+    assert repository.outdated_collections(db) == []
+    canteen = db.canteens.find_one({"_id": canteen_id})
+    assert "stores" not in canteen
+    assert (canteen["busyMinutes"], canteen["withAirConditioning"], canteen["version"]) == ([{"start": 660, "end": 780}], False, 1)
+    store = db.stores.find_one({"_id": store_id})
+    assert "menu" not in store
+    assert (store["description"], store["menuCount"], store["nameKey"]) == ("", 2, "รานปาแดง")
+    assert store["openingMinutes"] == [{"start": 480, "end": 840}]
+    items = {item["name"]: item for item in db.food_items.find()}
+    assert set(items) == {"ข้าวมันไก่", "ชาเย็น"}
+    assert all(item["storeId"] == store_id and item["canteenId"] == canteen_id for item in items.values())
+    assert items["ข้าวมันไก่"]["nameKey"] == "ขาวมันไก"
+
+
+def test_a_second_run_changes_nothing(db):
+    legacy_data(db)
+    migrations.migrate()
+    assert all(result.pending == 0 for result in migrations.migrate())
+
+
+def test_dry_run_only_counts(db):
+    legacy_data(db)
+    results = {result.migration: result for result in migrations.migrate(dry_run=True)}
+    assert (results["stores:1"].pending, results["stores:1"].migrated) == (1, 0)
+    assert repository.outdated_collections(db) == ["canteens", "stores"]
+
+
+def test_an_interrupted_run_resumes_after_its_checkpoint(db):
+    first, second = ObjectId(), ObjectId()
+    db.canteens.insert_many([{"_id": first, "name": "a"}, {"_id": second, "name": "b"}])
+    # As if a run had finished the batch with `first` and stopped
+    db.migrations.insert_one({"_id": "canteens:1", "lastId": first})
+    step = migrations.MIGRATIONS[0]
+
+    result = migrations.run_migration(db, step, batch_size=1)
+
+    assert (result.resumed_after, result.migrated) == (first, 1)
+    assert "schemaVersion" not in db.canteens.find_one({"_id": first})
+    assert "lastId" not in db.migrations.find_one({"_id": "canteens:1"})
+    # The finished pass forgot its position, so the skipped document is picked up next time
+    assert migrations.run_migration(db, step).migrated == 1
+
+
+def test_name_keys_from_before_digits_were_kept_are_recomputed(db, canteen_id, store_id):
+    # Keyed while repeated digits still collapsed
+    db.food_items.insert_one({
+        "name": "โค้ก 500ml", "nameKey": "โค้ก50ml", "storeId": store_id, "canteenId": canteen_id, "schemaVersion": 1,
+    })
+    assert repository.outdated_collections(db) == ["food_items"]
+    migrations.migrate()
+    assert db.food_items.find_one()["nameKey"] == "โคก500ml"
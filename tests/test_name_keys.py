@@ -0,0 +1,32 @@
+from name_keys import name_key, similar_name_groups
+
+
+def test_tone_marks_spacing_and_repeats_share_a_key():
+    assert name_key("ข้าวมันไก่") == name_key("ข้าวมันไก") == name_key(" ข้าว มันไก่่ ")
+
+
+def test_latin_case_accents_and_punctuation_share_a_key():
+    assert name_key("Café Latte") == name_key("cafe-latte")
+
+
+def test_thai_digits_become_ascii():
+    assert name_key("ชาเย็น ๒ แก้ว") == name_key("ชาเย็น 2 แก้ว")
+
+
+def test_repeated_digits_are_kept():
+    assert name_key("โค้ก 500ml") != name_key("โค้ก 50ml")
+    assert name_key("น้ำ 1 ลิตร") != name_key("น้ำ 11 ลิตร")
+    assert name_key("น้ำ ๑๑ ลิตร") == name_key("น้ำ 11 ลิตร")
+
+
+def test_different_names_keep_different_keys():
+    assert name_key("ข้าวผัด") != name_key("ข้าวมันไก่")
+
+
+def test_punctuation_only_has_an_empty_key():
+    assert name_key("!!! ...") == ""
+
+
+def test_similar_name_groups_lists_distinct_names_sharing_a_key():
+    groups = similar_name_groups(["ข้าวมันไก่", "ชาเย็น", "ข้าวมันไก", "ข้าวมันไก่", "!!"])
+    assert groups == [["ข้าวมันไก่", "ข้าวมันไก"]]
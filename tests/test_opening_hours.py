@@ -0,0 +1,37 @@
+import datetime
+
+import repository
+from opening_hours import busy_minutes, current_day_and_time, opening_minutes
+
+
+def test_opening_minutes_are_minutes_of_the_week():
+    hours = [
+        {"dayOfWeek": "MONDAY", "start": "08:00", "end": "17:00"},
+        {"dayOfWeek": "TUESDAY", "start": "08:30", "end": "09:00"},
+    ]
+    assert opening_minutes(hours) == [{"start": 480, "end": 1020}, {"start": 1440 + 510, "end": 1440 + 540}]
+
+
+def test_opening_hours_past_midnight_run_into_the_next_day():
+    assert opening_minutes([{"dayOfWeek": "MONDAY", "start": "22:00", "end": "02:00"}]) == [{"start": 1320, "end": 1560}]
+
+
+def test_unknown_days_are_skipped():
+    assert opening_minutes([{"dayOfWeek": "SUNDAY", "start": "08:00", "end": "17:00"}]) == []
+
+
+def test_busy_minutes_drop_empty_periods():
+    assert busy_minutes([{"start": "11:00", "end": "13:00"}, {"start": "13:00", "end": "12:00"}]) == [{"start": 660, "end": 780}]
+
+
+def test_current_day_and_time():
+    assert current_day_and_time(datetime.datetime(2024, 1, 1, 9, 30)) == ("MONDAY", datetime.time(9, 30))
+    assert current_day_and_time(datetime.datetime(2024, 1, 6, 9, 30)) is None
+
+
+def test_find_open_stores(db, canteen_id, store_id):
+    open_ids = [s["_id"] for s in repository.find_open_stores("MONDAY", datetime.time(9, 0))]
+    assert open_ids == [store_id]
+    assert repository.find_open_stores("MONDAY", datetime.time(14, 0)) == []
+    assert repository.find_open_stores("MONDAY", "13:00", "15:00") == []
+    assert repository.find_open_stores("TUESDAY", datetime.time(9, 0)) == []
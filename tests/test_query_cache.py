@@ -0,0 +1,80 @@
+from query_cache import QueryCache
+
+
+def test_hits_return_copies():
+    cache = QueryCache()
+    first = cache.get_or_load(("stores", "a"), lambda: [{"name": "x"}])
+    first.append("mutated")
+    assert cache.get_or_load(("stores", "a"), lambda: []) == [{"name": "x"}]
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_invalidating_a_prefix_drops_longer_keys():
+    cache = QueryCache()
+    cache.get_or_load(("stores", "a", "page", 1), lambda: 1)
+    cache.get_or_load(("stores", "b"), lambda: 2)
+    cache.invalidate(("stores", "a"))
+    assert cache.get_or_load(("stores", "a", "page", 1), lambda: "fresh") == "fresh"
+    assert cache.get_or_load(("stores", "b"), lambda: "fresh") == 2
+
+
+def test_a_load_invalidated_while_running_is_not_stored():
+    cache = QueryCache()
+
+    def load():
+        # A write finishes while the query is still reading
+        cache.invalidate(("stores",))
+        return "stale"
+
+    assert cache.get_or_load(("stores", "a"), load) == "stale"
+    assert cache.get_or_load(("stores", "a"), lambda: "fresh") == "fresh"
+
+
+def test_entries_expire_and_the_least_recent_is_dropped():
+    cache = QueryCache(ttl_seconds=0)
+    cache.get_or_load(("a",), lambda: 1)
+    assert cache.get_or_load(("a",), lambda: 2) == 2
+
+    cache = QueryCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.get_or_load((key,), lambda: key)
+    # Reading "a" makes "b" the least recently used, so "c" pushes "b" out
+    cache.get_or_load(("a",), lambda: "miss")
+    cache.get_or_load(("c",), lambda: "c")
+    assert cache.get_or_load(("a",), lambda: "miss") == "a"
+    assert cache.stats()["entries"] == 2
+    assert cache.get_or_load(("b",), lambda: "reloaded") == "reloaded"
+
+
+def test_clear_drops_everything():
+    cache = QueryCache()
+    cache.get_or_load(("a",), lambda: 1)
+    cache.clear()
+    assert cache.get_or_load(("a",), lambda: 2) == 2
+
+
+def test_invalidation_counters_do_not_outlive_the_loads_they_guard():
+    cache = QueryCache()
+    for i in range(100):
+        cache.get_or_load(("store", str(i)), lambda: i)
+        cache.invalidate(("store", str(i)), ("menu", str(i)))
+
+    def load():
+        cache.invalidate(("store",))
+        return "stale"
+
+    cache.get_or_load(("store", "x"), load)
+    assert cache._generations == {} and cache._loading == {}
+
+
+def test_a_failed_load_is_not_left_in_flight():
+    cache = QueryCache()
+
+    def fail():
+        raise RuntimeError("down")
+
+    try:
+        cache.get_or_load(("a",), fail)
+    except RuntimeError:
+        pass
+    assert cache._loading == {}
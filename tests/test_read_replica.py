@@ -0,0 +1,64 @@
+import pytest
+
+import repository
+from change_feed import Change
+from read_replica import ReadReplica
+
+
+@pytest.fixture
+def replica(tmp_path):
+    replica = ReadReplica()
+    replica.open(str(tmp_path / "replica.sqlite3"), source="test")
+    return replica
+
+
+def names(docs):
+    return sorted(doc["name"] for doc in docs)
+
+
+def test_sync_copies_new_and_changed_documents(db, replica, canteen_id, store_id):
+    assert not replica.is_fresh()
+    assert replica.sync(db) == 2
+    assert replica.is_fresh()
+    assert names(replica.stores(str(canteen_id))) == ["ร้านป้าแดง"]
+
+    canteen = repository.load_canteen(str(canteen_id))
+    repository.update_canteen(str(canteen_id), {"name": "โรงอาหารใหม่"}, canteen["version"])
+    replica.sync(db)
+    assert names(replica.canteens()) == ["โรงอาหารใหม่"]
+    page = replica.canteens_page(None, 10, "ใหม่")
+    assert [(c["name"], c["storeCount"]) for c in page] == [("โรงอาหารใหม่", 1)]
+
+
+def test_reconcile_drops_deleted_and_copies_missed_documents(db, replica, canteen_id, store_id):
+    replica.sync(db)
+    db.stores.delete_one({"_id": store_id})
+    # Written without updatedAt, which sync never sees
+    missed = db.stores.insert_one({"name": "ร้านเก่า", "canteenId": canteen_id, "menuCount": 0}).inserted_id
+    assert replica.reconcile(db) == 2
+    assert [s["_id"] for s in replica.stores(str(canteen_id))] == [missed]
+
+
+def test_request_sync_applies_deletes(db, replica, canteen_id, store_id):
+    other = repository.add_store({
+        "name": "ร้านลุงชัย",
+        "description": "ก๋วยเตี๋ยว",
+        "canteenId": canteen_id,
+        "openingHours": [{"dayOfWeek": "MONDAY", "start": "08:00", "end": "14:00"}],
+    })
+    replica.sync(db)
+    replica.request_sync(Change(1, "stores", store_id, canteen_id, "delete"))
+    assert [s["_id"] for s in replica.stores(str(canteen_id))] == [other]
+    # An update leaves the copy to the sync it wakes
+    replica.request_sync(Change(2, "stores", other, canteen_id, "update"))
+    assert len(replica.stores(str(canteen_id))) == 1
+
+    replica.request_sync(Change(3, "canteens", canteen_id, None, "delete"))
+    assert replica.canteens() == [] and replica.stores(str(canteen_id)) == []
+
+
+def test_open_empties_a_file_from_another_source(db, replica, canteen_id):
+    replica.sync(db)
+    reopened = ReadReplica()
+    reopened.open(replica.path, source="another database")
+    assert reopened.canteens() == []
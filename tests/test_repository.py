@@ -0,0 +1,141 @@
+import datetime
+
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+import repository
+
+
+def item(name, price=40.0, category="MAIN"):
+    return {"name": name, "price": price, "category": category}
+
+
+def test_diff_menu():
+    kept, renamed, removed = ObjectId(), ObjectId(), ObjectId()
+    original = [{"_id": kept, **item("a")}, {"_id": renamed, **item("b")}, {"_id": removed, **item("c")}]
+    edited = [{"_id": str(kept), **item("a")}, {"_id": str(renamed), **item("bb")}, {"_id": None, **item("d")}]
+    added, updated, deleted = repository.diff_menu(original, edited)
+    assert added == [item("d")]
+    assert updated == [{"_id": renamed, **item("bb")}]
+    assert deleted == [removed]
+
+
+def test_add_menu_item_rejects_a_taken_name(db, canteen_id, store_id):
+    assert repository.add_menu_item(str(canteen_id), str(store_id), item("ข้าวผัด"))
+    assert not repository.add_menu_item(str(canteen_id), str(store_id), item("ข้าวผัด", 50.0))
+    assert db.stores.find_one({"_id": store_id})["menuCount"] == 1
+
+
+def test_update_menu_item_tells_taken_names_from_deleted_items(db, canteen_id, store_id):
+    for name in ("a", "b"):
+        repository.add_menu_item(str(canteen_id), str(store_id), item(name))
+    a = db.food_items.find_one({"name": "a"})
+    with pytest.raises(DuplicateKeyError):
+        repository.update_menu_item(str(canteen_id), str(store_id), str(a["_id"]), item("b"))
+    assert repository.update_menu_item(str(canteen_id), str(store_id), str(a["_id"]), item("a", 45.0))
+    repository.delete_menu_item(str(canteen_id), str(store_id), str(a["_id"]))
+    assert not repository.update_menu_item(str(canteen_id), str(store_id), str(a["_id"]), item("a"))
+
+
+def test_single_item_writes_move_the_menu_count(db, canteen_id, store_id):
+    def store():
+        return db.stores.find_one({"_id": store_id}, {"menuCount": True, "updatedAt": True})
+
+    repository.add_menu_item(str(canteen_id), str(store_id), item("a"))
+    repository.add_menu_item(str(canteen_id), str(store_id), item("b"))
+    a = db.food_items.find_one({"name": "a"})
+    before = store()
+    assert before["menuCount"] == 2
+    repository.update_menu_item(str(canteen_id), str(store_id), str(a["_id"]), item("a", 45.0))
+    after = store()
+    # An edit is still a store change for the listings, the replica and the change feed
+    assert after["menuCount"] == 2 and after["updatedAt"] >= before["updatedAt"]
+    for _ in range(2):
+        repository.delete_menu_item(str(canteen_id), str(store_id), str(a["_id"]))
+    assert store()["menuCount"] == 1
+
+
+def test_save_menu_changes(db, canteen_id, store_id):
+    for name in ("a", "b"):
+        repository.add_menu_item(str(canteen_id), str(store_id), item(name))
+    original = repository.load_menu(str(store_id))
+    a, b = original
+    edited = [
+        # a takes b's name in the same save that deletes b
+        {"_id": str(a["_id"]), **item("b", 60.0)},
+        {"_id": None, **item("c")},
+        {"_id": None, **item("b")},
+    ]
+    rejected = repository.save_menu_changes(str(canteen_id), str(store_id), original, edited)
+    assert rejected == ["b"]
+    menu = {i["name"]: i for i in repository.load_menu(str(store_id))}
+    assert set(menu) == {"b", "c"}
+    assert menu["b"]["_id"] == a["_id"] and menu["b"]["price"] == 60.0
+    assert menu["c"]["nameKey"] == "c"
+    assert db.stores.find_one({"_id": store_id})["menuCount"] == 2
+    assert {e["name"] for e in db.menu_search.find()} == {"b", "c"}
+
+
+def test_update_store_is_conditional_on_the_version(db, canteen_id, store_id):
+    assert repository.update_store(str(store_id), {"name": "ร้านลุงดำ"}, 1)
+    assert not repository.update_store(str(store_id), {"description": "ก๋วยเตี๋ยว"}, 1)
+    store = db.stores.find_one({"_id": store_id})
+    assert (store["name"], store["version"], store["nameKey"]) == ("ร้านลุงดำ", 2, "รานลุงดํา")
+
+
+def test_canteen_page_counts_stores_and_menu_items(db, canteen_id, store_id):
+    empty = repository.add_canteen({"name": "โรงอาหารใหม่", "busyPeriods": [], "withAirConditioning": True})
+    repository.add_store({"name": "ร้านว่าง", "description": "-", "canteenId": canteen_id, "openingHours": []})
+    for name in ("a", "b", "c"):
+        repository.add_menu_item(str(canteen_id), str(store_id), item(name))
+    page = {c["_id"]: c for c in repository.load_canteens_page()}
+    assert (page[canteen_id]["storeCount"], page[canteen_id]["menuItemCount"]) == (2, 3)
+    assert (page[empty]["storeCount"], page[empty]["menuItemCount"]) == (0, 0)
+
+
+def test_menu_pages_follow_the_sort_order(db, canteen_id, store_id):
+    for i, price in enumerate([30.0, 10.0, 20.0, 10.0]):
+        repository.add_menu_item(str(canteen_id), str(store_id), item(f"m{i}", price))
+    first = repository.load_menu_page(str(store_id), sort="price", limit=3)
+    after = (first[-1]["price"], str(first[-1]["_id"]))
+    rest = repository.load_menu_page(str(store_id), sort="price", after=after, limit=3)
+    assert [i["price"] for i in first + rest] == [10.0, 10.0, 20.0, 30.0]
+    with pytest.raises(ValueError):
+        repository.load_menu_page(str(store_id), sort="name")
+
+
+def test_price_summary_follows_menu_writes(db, canteen_id, store_id):
+    for name, price in (("a", 10.0), ("b", 30.0)):
+        repository.add_menu_item(str(canteen_id), str(store_id), item(name, price))
+    repository.add_menu_item(str(canteen_id), str(store_id), item("tea", 15.0, "DRINK"))
+    rows = {r["category"]: r for r in repository.load_price_summary()}
+    assert (rows["MAIN"]["count"], rows["MAIN"]["medianPrice"]) == (2, 20.0)
+    tea = db.food_items.find_one({"name": "tea"})
+    repository.delete_menu_item(str(canteen_id), str(store_id), str(tea["_id"]))
+    assert [r["category"] for r in repository.load_price_summary()] == ["MAIN"]
+
+
+def test_price_summary_keeps_rows_a_newer_refresh_wrote(db, canteen_id, store_id):
+    repository.add_menu_item(str(canteen_id), str(store_id), item("a"))
+    later = datetime.datetime(2100, 1, 1)
+    db.price_summary.update_one({"category": "MAIN"}, {"$set": {"refreshedAt": later, "count": 99}})
+    db.price_summary.insert_one({"canteenId": canteen_id, "category": "SIDE", "count": 1, "refreshedAt": later})
+    db.price_summary.insert_one({"canteenId": canteen_id, "category": "DRINK", "count": 1, "refreshedAt": datetime.datetime(2000, 1, 1)})
+    repository.refresh_price_summary([canteen_id])
+    rows = {r["category"]: r["count"] for r in db.price_summary.find()}
+    assert rows == {"MAIN": 99, "SIDE": 1}
+
+
+def test_find_similar_names(db, canteen_id, store_id):
+    assert repository.find_similar_stores(str(canteen_id), "ร้าน ป้าแดง") == ["ร้านป้าแดง"]
+    assert repository.find_similar_stores(str(canteen_id), "ร้านป้าแดง", exclude_id=str(store_id)) == []
+    assert repository.find_similar_stores(str(canteen_id), "...") == []
+    repository.add_menu_item(str(canteen_id), str(store_id), item("ข้าวมันไก่"))
+    assert repository.find_similar_menu_items(str(store_id), "ข้าวมันไก") == ["ข้าวมันไก่"]
+
+
+def test_delete_canteen_removes_its_stores_and_menus(db, canteen_id, store_id):
+    repository.add_menu_item(str(canteen_id), str(store_id), item("a"))
+    assert repository.delete_canteen(str(canteen_id)) == 1
+    assert db.stores.count_documents({}) == db.food_items.count_documents({}) == db.menu_search.count_documents({}) == 0
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from run_reads import RunReads
+
+
+def test_calls_outside_a_run_go_straight_through():
+    reads = RunReads(max_workers=1)
+    calls = []
+    read = reads.memoized(lambda x: calls.append(x) or x)
+    assert read(1) == read(1) == 1
+    assert calls == [1, 1]
+
+
+def test_one_call_per_run_and_arguments_until_a_write():
+    reads = RunReads(max_workers=1)
+    calls = []
+    read = reads.memoized(lambda x: calls.append(x) or [x])
+    reads.start_run()
+    result = read(1)
+    result.append("mutated")
+    assert read(1) == [1] and read(2) == [2]
+    assert calls == [1, 2]
+    reads.invalidate()
+    read(1)
+    assert calls == [1, 2, 1]
+
+
+def test_a_queued_prefetch_runs_on_the_calling_thread():
+    reads = RunReads(max_workers=1)
+    release = threading.Event()
+
+    def thread_name(x):
+        if x == "block":
+            release.wait(5)
+        return threading.current_thread().name
+
+    read = reads.memoized(thread_name)
+    reads.start_run()
+    read.prefetch("block")  # holds the only worker
+    read.prefetch("queued")
+    started = time.monotonic()
+    assert read("queued") == threading.current_thread().name
+    assert time.monotonic() - started < 1
+    release.set()
+    assert read("block") == "page-read_0"
+
+
+def test_failures_are_not_remembered():
+    reads = RunReads(max_workers=1)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("first try")
+        return "ok"
+
+    read = reads.memoized(flaky)
+    reads.start_run()
+    try:
+        read()
+    except ValueError:
+        pass
+    assert read() == "ok"
@@ -0,0 +1,87 @@
+import pytest
+
+from schema import (
+    ValidationError,
+    format_busy_periods,
+    format_opening_hours,
+    parse_busy_periods,
+    parse_opening_hours,
+    validate_canteen,
+    validate_menu_item,
+    validate_store,
+)
+
+STORE = {
+    "name": " ร้านป้าแดง ",
+    "description": "ข้าวแกง",
+    "openingHours": [{"dayOfWeek": "MONDAY", "start": "08:00", "end": "14:00"}],
+}
+
+
+def test_validate_canteen_returns_the_form_fields():
+    canteen = validate_canteen({"name": " กลาง ", "busyPeriods": [{"start": "11:00", "end": "13:00"}], "extra": 1})
+    assert canteen == {"name": "กลาง", "busyPeriods": [{"start": "11:00", "end": "13:00"}], "withAirConditioning": False}
+
+
+@pytest.mark.parametrize("canteen", [
+    "oops",
+    {"name": ""},
+    {"name": "กลาง", "withAirConditioning": "yes"},
+    {"name": "กลาง", "busyPeriods": [{"start": "13:00", "end": "11:00"}]},
+    {"name": "กลาง", "busyPeriods": [{"start": "11:00", "end": "11:00"}]},
+    {"name": "กลาง", "busyPeriods": [{"start": "25:00", "end": "26:00"}]},
+])
+def test_validate_canteen_rejects(canteen):
+    with pytest.raises(ValidationError):
+        validate_canteen(canteen)
+
+
+def test_validate_store_strips_and_keeps_opening_hours():
+    assert validate_store(STORE) == {**STORE, "name": "ร้านป้าแดง"}
+
+
+@pytest.mark.parametrize("changes", [
+    {"description": " "},
+    {"openingHours": []},
+    {"openingHours": [{"dayOfWeek": "SUNDAY", "start": "08:00", "end": "14:00"}]},
+    {"openingHours": [{"dayOfWeek": "MONDAY", "start": "08:00", "end": "08:00"}]},
+])
+def test_validate_store_rejects(changes):
+    with pytest.raises(ValidationError):
+        validate_store({**STORE, **changes})
+
+
+def test_validate_store_keeps_hours_that_close_after_midnight():
+    # opening_minutes runs such an entry into the next day, as the form saves it
+    overnight = {**STORE, "openingHours": [{"dayOfWeek": "FRIDAY", "start": "18:00", "end": "02:00"}]}
+    assert validate_store(overnight)["openingHours"] == overnight["openingHours"]
+
+
+def test_validate_store_rejects_non_objects():
+    with pytest.raises(ValidationError, match="expected an object"):
+        validate_store(["ร้าน"])
+
+
+def test_validate_menu_item_parses_the_price():
+    assert validate_menu_item({"name": "ข้าวผัด", "price": "45", "category": "MAIN"}) == {
+        "name": "ข้าวผัด", "price": 45.0, "category": "MAIN",
+    }
+
+
+@pytest.mark.parametrize("item", [
+    {"name": "ข้าวผัด", "price": "free", "category": "MAIN"},
+    {"name": "ข้าวผัด", "price": 0, "category": "MAIN"},
+    {"name": "ข้าวผัด", "price": 45, "category": "DESSERT"},
+    1,
+])
+def test_validate_menu_item_rejects(item):
+    with pytest.raises(ValidationError):
+        validate_menu_item(item)
+
+
+def test_csv_encodings_round_trip():
+    periods = [{"start": "11:00", "end": "13:00"}, {"start": "17:00", "end": "18:00"}]
+    hours = [{"dayOfWeek": "MONDAY", "start": "08:00", "end": "17:00"}]
+    assert parse_busy_periods(format_busy_periods(periods)) == periods
+    assert parse_opening_hours(format_opening_hours(hours)) == hours
+    assert parse_busy_periods("") == [] and parse_opening_hours(None) == []
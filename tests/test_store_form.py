@@ -0,0 +1,25 @@
+import datetime
+
+from streamlit.testing.v1 import AppTest
+
+
+def store_form():
+    app = AppTest.from_file("../canteen.py", default_timeout=30)
+    app.switch_page("pages/stores.py")
+    app.secrets["password"] = "pw"
+    app.session_state["password_correct"] = True
+    return app
+
+
+def test_add_store_keeps_per_day_hours(db, canteen_id):
+    app = store_form().run()
+    app.text_input[0].input("ร้านลุงชัย").run()
+    app.text_area[0].input("ก๋วยเตี๋ยว").run()
+    app.radio[0].set_value("per_day").run()
+    app.time_input(key="new_end_TUESDAY_None").set_value(datetime.time(15, 30)).run()
+    next(b for b in app.button if b.label == "เพิ่มร้านค้า").click().run()
+
+    assert not app.exception
+    hours = db.stores.find_one({"name": "ร้านลุงชัย"})["openingHours"]
+    assert {"dayOfWeek": "TUESDAY", "start": "08:00", "end": "15:30"} in hours
+    assert {"dayOfWeek": "MONDAY", "start": "08:00", "end": "17:00"} in hours